@@ -0,0 +1,22 @@
+"""
+API公共依赖
+"""
+
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.services.model_registry import get_model_registry
+
+settings = get_settings()
+
+
+def require_model_ready() -> None:
+    """要求嵌入模型已加载并完成预热，否则返回503并通过Retry-After提示重试时间"""
+    registry = get_model_registry()
+    if not registry.is_ready():
+        state = registry.get_readiness()['state']
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service is warming up (model state: {state}), please retry later",
+            headers={"Retry-After": str(settings.STARTUP_RETRY_AFTER_SECONDS)},
+        )
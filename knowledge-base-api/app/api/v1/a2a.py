@@ -6,11 +6,14 @@ import logging
 import time
 from typing import Any, Dict
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 
-from app.models.a2a import A2ARequest, A2AResponse, A2AMessage, KnowledgeSearchRequest
+from app.api.deps import require_model_ready
+from app.core.executors import ExecutorBusyError
+from app.models.a2a import A2ARequest, A2AResponse, A2AMessage, KnowledgeBatchSearchRequest, KnowledgeSearchRequest
 from app.services.a2a_service import A2AService
+from app.services.model_registry import get_model_registry
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -55,6 +58,7 @@ async def a2a_protocol_endpoint(message: A2AMessage) -> A2AMessage:
     支持的方法:
     - **get_agent_card**: 获取Agent能力信息
     - **search_knowledge**: 知识库检索
+    - **search_knowledge_batch**: 批量知识库检索（params: {"queries": [...]}）
     - **health_check**: 健康检查
     
     请求示例:
@@ -72,7 +76,7 @@ async def a2a_protocol_endpoint(message: A2AMessage) -> A2AMessage:
     ```
     """
     try:
-        response = a2a_service.handle_a2a_message(message)
+        response = await a2a_service.handle_a2a_message(message)
         return response
         
     except Exception as e:
@@ -112,8 +116,11 @@ async def a2a_endpoint(request: A2ARequest) -> A2AResponse:
     }
     ```
     """
+    if request.action == "knowledge_search":
+        require_model_ready()
+
     try:
-        response = a2a_service.handle_request(request)
+        response = await a2a_service.handle_request(request)
         
         # 如果请求失败，返回HTTP错误状态
         if not response.success:
@@ -130,7 +137,7 @@ async def a2a_endpoint(request: A2ARequest) -> A2AResponse:
         
         return response
         
-    except HTTPException:
+    except (HTTPException, ExecutorBusyError):
         raise
     except Exception as e:
         logger.error(f"A2A request failed: {str(e)}")
@@ -140,7 +147,7 @@ async def a2a_endpoint(request: A2ARequest) -> A2AResponse:
         )
 
 
-@router.post("/search", summary="知识库检索")
+@router.post("/search", summary="知识库检索", dependencies=[Depends(require_model_ready)])
 async def search_knowledge(request: KnowledgeSearchRequest) -> Dict[str, Any]:
     """
     直接的知识库检索接口
@@ -154,7 +161,7 @@ async def search_knowledge(request: KnowledgeSearchRequest) -> Dict[str, Any]:
     - **min_score**: 最小相似度阈值 (0.0-1.0)
     """
     try:
-        result = a2a_service.search_knowledge(request)
+        result = await a2a_service.search_knowledge(request)
         
         if not result["success"]:
             raise HTTPException(
@@ -164,7 +171,7 @@ async def search_knowledge(request: KnowledgeSearchRequest) -> Dict[str, Any]:
         
         return result
         
-    except HTTPException:
+    except (HTTPException, ExecutorBusyError):
         raise
     except Exception as e:
         logger.error(f"Knowledge search failed: {str(e)}")
@@ -174,6 +181,37 @@ async def search_knowledge(request: KnowledgeSearchRequest) -> Dict[str, Any]:
         )
 
 
+@router.post("/search/batch", summary="批量知识库检索", dependencies=[Depends(require_model_ready)])
+async def search_knowledge_batch(request: KnowledgeBatchSearchRequest) -> Dict[str, Any]:
+    """
+    批量知识库检索接口
+    
+    一次请求提交多个检索（如每个提供商×产品一个查询），所有查询在一次模型调用中编码，
+    过滤条件相同的查询合并为一次向量库查询。results与queries一一对应
+    
+    - **queries**: 检索请求列表，每项字段与 /a2a/search 相同 (query/limit/provider/category/min_score)
+    """
+    try:
+        result = await a2a_service.search_knowledge_batch(request)
+        
+        if not result["success"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=result.get("error_message", "Batch search failed")
+            )
+        
+        return result
+        
+    except (HTTPException, ExecutorBusyError):
+        raise
+    except Exception as e:
+        logger.error(f"Batch knowledge search failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch knowledge search failed: {str(e)}"
+        )
+
+
 @router.get("/config", summary="获取A2A配置信息")
 async def get_a2a_config() -> Dict[str, Any]:
     """
@@ -214,10 +252,20 @@ async def a2a_health_check() -> Dict[str, Any]:
     try:
         # 测试Agent卡片获取
         agent_card_result = a2a_service.get_agent_card()
+
+        # 模型未就绪时不执行测试搜索
+        if not get_model_registry().is_ready():
+            return {
+                "status": "starting",
+                "agent_card_available": agent_card_result["success"],
+                "search_available": False,
+                "readiness": get_model_registry().get_readiness(),
+                "timestamp": time.time()
+            }
         
         # 测试搜索功能
         test_search = KnowledgeSearchRequest(query="测试", limit=1)
-        search_result = a2a_service.search_knowledge(test_search)
+        search_result = await a2a_service.search_knowledge(test_search)
         
         return {
             "status": "healthy",
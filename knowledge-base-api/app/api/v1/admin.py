@@ -2,38 +2,229 @@
 管理API端点
 """
 
+import asyncio
+import hashlib
 import logging
-import shutil
+import os
+import uuid
 from pathlib import Path
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
 
+from app.api.deps import require_model_ready
 from app.core.config import get_settings
-from app.core.database import get_db
+from app.core.database import get_db, get_db_context
+from app.core.executors import ExecutorBusyError, get_executor_pools
 from app.models.document import Document, DocumentResponse, DocumentStatus
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import SUPPORTED_EXTENSIONS
+from app.services.document_records import build_vector_metadata, document_path_key
 from app.services.health_service import HealthService
-from app.services.search_engine import SearchEngine
-from app.services.vector_store import VectorStore
+from app.services.ingest_jobs import get_ingest_job_queue, get_ingest_worker
+from app.services.model_registry import get_model_registry
+from app.services.reindex import STATUS_FAILED as REINDEX_FAILED, get_reindex_runner
+from app.services.search_cache import get_search_response_cache
+from app.services.search_cursor import get_search_result_cache
+from app.services.vector_store import get_vector_store
 
 router = APIRouter()
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# 初始化服务
-document_processor = DocumentProcessor()
+def get_health_service():
+    # 模型未就绪时不触发加载，健康检查直接报告降级状态
+    registry = get_model_registry()
+    return HealthService(get_vector_store() if registry.is_ready() else None)
 
-# 懒加载vector_store，避免模块加载时的集合ID缓存问题
-def get_vector_store():
-    return VectorStore()
 
-def get_search_engine():
-    return SearchEngine()
+# 以下辅助函数包含阻塞的数据库/文件操作，均在I/O池中执行
+
+def _query_documents(
+    db: Session,
+    skip: int,
+    limit: int,
+    provider: Optional[str],
+    category: Optional[str],
+    doc_status: Optional[DocumentStatus],
+) -> dict[str, Any]:
+    """分页查询文档列表"""
+    # 构建查询
+    query = db.query(Document)
+
+    # 应用过滤条件
+    if provider:
+        query = query.filter(Document.provider == provider)
+    if category:
+        query = query.filter(Document.category == category)
+    if doc_status:
+        query = query.filter(Document.status == doc_status)
+
+    # 应用分页
+    total = query.count()
+    documents = query.offset(skip).limit(limit).all()
+
+    # 转换为响应模型
+    document_responses = [DocumentResponse.from_orm(doc) for doc in documents]
+
+    return {
+        "documents": document_responses,
+        "total": total,
+        "skip": skip,
+        "limit": limit
+    }
+
+
+def _stream_upload_file(source: Any, file_path: Path) -> tuple[Path, int, str]:
+    """
+    将上传内容分块写入目标目录下的临时文件，同时计算原始字节的sha256
+
+    写入过程中超过 UPLOAD_MAX_BYTES 时立即停止并删除临时文件（未带 Content-Length 的请求只能在这里检查）。
+    调用方确认不是重复文件后再将临时文件替换到目标路径
+
+    Returns:
+        (临时文件路径, 字节数, sha256)
+    """
+    # 确保目录存在（在文件路径的父目录上调用）
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as buffer:
+            for block in iter(lambda: source.read(settings.UPLOAD_STREAM_CHUNK_BYTES), b""):
+                size += len(block)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds the upload limit of {settings.UPLOAD_MAX_BYTES} bytes",
+                    )
+                digest.update(block)
+                buffer.write(block)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return temp_path, size, digest.hexdigest()
+
+
+def _find_duplicate_document(file_sha256: str, path_key: str) -> Optional[tuple[int, bool]]:
+    """
+    查找原始字节完全相同、已建立索引且文件仍存在的文档（优先同一路径的记录）
+
+    Returns:
+        (文档ID, 是否为同一路径)，没有重复时返回None
+    """
+    with get_db_context() as db:
+        candidates = (
+            db.query(Document.id, Document.file_path)
+            .filter(Document.file_sha256 == file_sha256, Document.vector_indexed.is_(True))
+            .order_by(Document.id)
+            .all()
+        )
+    candidates = [candidate for candidate in candidates if Path(candidate.file_path).is_file()]
+    for candidate in candidates:
+        if candidate.file_path == path_key:
+            return int(candidate.id), True
+    if candidates:
+        return int(candidates[0].id), False
+    return None
+
+
+def _update_duplicate_document(
+    document_id: int, title: Optional[str], provider: str, category: str
+) -> None:
+    """
+    同一路径的重复上传: 只更新文档级元数据（标题、云厂商、分类）
+
+    元数据变化时以原有向量更新分块元数据，不重新解析和编码
+    """
+    with get_db_context() as db:
+        duplicate = _get_document(db, document_id)
+        if duplicate is None:
+            raise RuntimeError(f"Document {document_id} not found")
+
+        previous_metadata = build_vector_metadata(duplicate)
+        duplicate.title = title or duplicate.title
+        duplicate.provider = provider
+        duplicate.category = category
+        metadata = build_vector_metadata(duplicate)
+        if metadata != previous_metadata and not get_vector_store().update_document_metadata(document_id, metadata):
+            raise RuntimeError(f"Failed to update vector metadata of document {document_id}")
+
+
+def _register_duplicate_document(
+    source_id: int, path_key: str, title: Optional[str], provider: str, category: str, filename: str
+) -> int:
+    """
+    其他路径的重复上传: 为新路径登记文档记录，复用源文档已存储的分块和向量
+
+    源文档的记录和分块保持不变；新路径已有记录时按文件路径原地更新
+
+    Returns:
+        新路径的文档ID
+    """
+    from app.services.document_records import upsert_document_record
+
+    # 先提交记录再写入向量（向量写入与记录使用同一个SQLite文件）
+    with get_db_context() as db:
+        source = _get_document(db, source_id)
+        if source is None:
+            raise RuntimeError(f"Document {source_id} not found")
+        processed_doc = {
+            'title': source.title,
+            'content': source.content,
+            'content_hash': source.content_hash,
+            'file_sha256': source.file_sha256,
+            'file_size': source.file_size,
+            'metadata': dict(source.doc_metadata or {}),
+        }
+        document = upsert_document_record(
+            db, path_key, processed_doc, title=title, provider=provider, category=category, filename=filename
+        )
+        document_id = int(document.id)
+        metadata = build_vector_metadata(document)
+
+    get_vector_store().copy_document(source_id, document_id, metadata)
+
+    with get_db_context() as db:
+        db.query(Document).filter(Document.id == document_id).update(
+            {'vector_indexed': True, 'search_indexed': True}, synchronize_session=False
+        )
+    return document_id
+
+
+def _find_document_id(file_path: str) -> Optional[int]:
+    """按文件路径查找已有的文档记录ID"""
+    with get_db_context() as db:
+        row = db.query(Document.id).filter(Document.file_path == file_path).first()
+        return int(row.id) if row is not None else None
 
-def get_health_service():
-    return HealthService(get_vector_store())
+
+def _get_document(db: Session, document_id: int) -> Optional[Document]:
+    return db.query(Document).filter(Document.id == document_id).first()
+
+
+def _delete_document_record(db: Session, document: Document, file_path: Optional[str]) -> None:
+    """从数据库删除文档并删除实际文件"""
+    db.delete(document)
+    db.commit()
+
+    if file_path:
+        file_path_obj = Path(file_path)
+        if file_path_obj.exists() and file_path_obj.is_file():
+            try:
+                file_path_obj.unlink()
+            except Exception as e:
+                # 文件删除失败不影响整体删除操作，只记录警告
+                print(f"Warning: Failed to delete file {file_path}: {str(e)}")
+
+
+def _documents_directory_stats(documents_path: Path) -> tuple[int, int]:
+    """统计文档目录中的文件数量和总大小"""
+    if not documents_path.exists():
+        return 0, 0
+    md_files = list(documents_path.glob("*.md"))
+    return len(md_files), sum(f.stat().st_size for f in md_files)
 
 
 @router.get("/documents", summary="获取文档列表")
@@ -55,30 +246,9 @@ async def list_documents(
     - **status**: 按状态过滤
     """
     try:
-        # 构建查询
-        query = db.query(Document)
-        
-        # 应用过滤条件
-        if provider:
-            query = query.filter(Document.provider == provider)
-        if category:
-            query = query.filter(Document.category == category)
-        if doc_status:
-            query = query.filter(Document.status == doc_status)
-        
-        # 应用分页
-        total = query.count()
-        documents = query.offset(skip).limit(limit).all()
-        
-        # 转换为响应模型
-        document_responses = [DocumentResponse.from_orm(doc) for doc in documents]
-        
-        return {
-            "documents": document_responses,
-            "total": total,
-            "skip": skip,
-            "limit": limit
-        }
+        return await get_executor_pools().io.run(
+            _query_documents, db, skip, limit, provider, category, doc_status
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -93,11 +263,15 @@ async def upload_document(
     category: Optional[str] = Form(None),
     title: Optional[str] = Form(None),
     relative_path: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
-) -> dict[str, str]:
+) -> dict[str, Any]:
     """
     上传新文档到知识库
 
+    文件写入磁盘后立即返回入库任务ID，解析、分块、嵌入和写入索引由后台工作者完成，
+    进度通过 GET /admin/jobs/{job_id} 查询。
+    文件分块写入磁盘时计算原始字节的sha256，与已入库文档完全相同时跳过解析和嵌入（status 为 duplicate）:
+    同一路径只更新元数据，其他路径的文档保持不变，新路径的记录复用其已存储的向量
+
     - **file**: 要上传的Markdown文件
     - **provider**: 云服务商 (腾讯云、阿里云、火山云、华为云、AWS、Azure、GCP) - 必需
     - **category**: 产品分类 (负载均衡、私有网络、弹性IP、NAT网关、专线、云联网、VPN) - 必需
@@ -107,9 +281,6 @@ async def upload_document(
     文档将按照 /云厂商/产品分类/[相对路径]/ 的目录结构保存
     """
     try:
-        # 支持的文件格式
-        supported_extensions = ['.md', '.markdown', '.doc', '.docx', '.pdf', '.txt', '.xlsx', '.xls', '.pptx', '.ppt']
-        
         # 检查文件类型
         if not file.filename:
             raise HTTPException(
@@ -118,10 +289,10 @@ async def upload_document(
             )
         
         file_ext = file.filename.lower().split('.')[-1] if '.' in file.filename else ''
-        if f'.{file_ext}' not in supported_extensions:
+        if f'.{file_ext}' not in SUPPORTED_EXTENSIONS:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported file format. Supported formats: {', '.join(supported_extensions)}",
+                detail=f"Unsupported file format. Supported formats: {', '.join(SUPPORTED_EXTENSIONS)}",
             )
 
         # 验证必需参数
@@ -153,41 +324,11 @@ async def upload_document(
         
         # 保存文件到对应目录
         file_path = category_dir / file.filename
-        
-        # 确保目录存在（在文件路径的父目录上调用）
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 写入文件
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        pools = get_executor_pools()
+
+        # 分块写入临时文件并计算sha256（超过大小上限时在写入过程中中止）
+        temp_path, file_size, file_sha256 = await pools.io.run(_stream_upload_file, file.file, file_path)
 
-        # 处理文档
-        processed_doc = document_processor.process_file(str(file_path))
-        
-        # 添加元数据
-        if provider:
-            processed_doc['provider'] = provider
-        if category:
-            processed_doc['category'] = category
-        if title:
-            processed_doc['title'] = title
-        elif not processed_doc.get('title'):
-            # 如果没有提供标题，使用文件名（去掉扩展名）
-            processed_doc['title'] = file.filename.rsplit('.', 1)[0]
-
-        # 保存到数据库
-        # 从metadata中提取必要字段
-        metadata = processed_doc.get('metadata', {})
-        
-        # 准备标签
-        tags_value = None
-        if 'tags' in metadata:
-            tags_str = metadata.get('tags', '')
-            if isinstance(tags_str, str) and tags_str:
-                tags_value = tags_str.split(',')
-            elif isinstance(tags_str, list):
-                tags_value = tags_str
-        
         # 生成文档标题（优先使用传入的title，否则使用文件名）
         document_title = title if title else file.filename
         if document_title and '.' in document_title:
@@ -202,202 +343,159 @@ async def upload_document(
             if clean_relative_path:
                 # 使用相对路径作为唯一文件名（替换斜杠为下划线）
                 unique_filename = clean_relative_path.replace('/', '_')
-        
-        # 检查是否已存在相同的文件路径（用 file_path 作为唯一标识）
-        existing_doc = db.query(Document).filter(Document.file_path == str(file_path)).first()
-        if existing_doc:
-            # 如果文件已存在，更新而不是创建新记录
-            existing_doc.title = document_title
-            existing_doc.content = processed_doc.get('content')
-            existing_doc.content_hash = processed_doc.get('content_hash')
-            existing_doc.source_url = metadata.get('source_url')
-            existing_doc.provider = processed_doc.get('provider')
-            existing_doc.category = processed_doc.get('category')
-            existing_doc.tags = tags_value
-            existing_doc.doc_metadata = metadata
-            existing_doc.status = DocumentStatus.PROCESSED
-            existing_doc.file_size = processed_doc.get('file_size', 0)
-            existing_doc.word_count = int(metadata.get('word_count', 0)) if metadata.get('word_count') else None
-            existing_doc.vector_indexed = False
-            existing_doc.search_indexed = False
-            document = existing_doc
-        else:
-            # 检查是否存在相同文件名的记录（避免唯一性冲突）
-            existing_by_filename = db.query(Document).filter(Document.filename == unique_filename).first()
-            if existing_by_filename:
-                # 如果存在同名文件，在文件名后添加文件路径哈希来确保唯一性
-                import hashlib
-                path_hash = hashlib.md5(str(file_path).encode()).hexdigest()[:8]
-                unique_filename = f"{unique_filename}_{path_hash}"
-            
-            # 创建新文档记录
-            document = Document(
-                title=document_title,
-                filename=unique_filename,
-                file_path=str(file_path),
-                content=processed_doc.get('content'),
-                content_hash=processed_doc.get('content_hash'),
-                source_url=metadata.get('source_url'),
-                provider=processed_doc.get('provider'),
-                category=processed_doc.get('category'),
-                tags=tags_value,
-                doc_metadata=metadata,  # 保存完整的元数据
-                status=DocumentStatus.PROCESSED,
-                file_size=processed_doc.get('file_size', 0),
-                word_count=int(metadata.get('word_count', 0)) if metadata.get('word_count') else None,
-                vector_indexed=False,
-                search_indexed=False,
-            )
-            db.add(document)
-        
-        db.commit()
-        db.refresh(document)
-        
-        # 创建索引
+
+        path_key = document_path_key(file_path)
+        response = {
+            "filename": file.filename,
+            "title": document_title,
+            "provider": provider,
+            "category": category,
+            "size": str(file_size),
+            "sha256": file_sha256,
+        }
+
+        # 原始字节完全相同的文档已入库时跳过解析和嵌入:
+        # 同一路径只更新元数据；其他路径的文档保持不变，新路径复用其已存储的向量
         try:
-            # 准备向量存储的元数据（直接使用数据库中已保存的值）
-            vector_metadata = {
-                'title': document.title,
-                'filename': document.filename,
-                'provider': document.provider or '',
-                'category': document.category or '',
-                'source_url': document.source_url or '',
+            previous_document_id = await pools.io.run(_find_document_id, path_key)
+            duplicate = await pools.io.run(_find_duplicate_document, file_sha256, path_key)
+            if duplicate is not None and duplicate[1]:
+                await pools.io.run(_update_duplicate_document, duplicate[0], document_title, provider, category)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        if duplicate is not None and duplicate[1]:
+            temp_path.unlink(missing_ok=True)
+            return {
+                "message": f"Document {file.filename} is identical to document {duplicate[0]}, metadata updated",
+                "document_id": duplicate[0],
+                "job_id": None,
+                "status": "duplicate",
+                **response,
             }
-            
-            logger.info(f"准备索引文档 {document.id}, 提供商: {document.provider}, 分类: {document.category}")
-            
-            # 添加到向量存储（同时支持语义搜索）
-            vector_store = get_vector_store()
-            vector_success = vector_store.add_document(
-                document_id=document.id,
-                chunks=processed_doc.get('chunks', []),
-                metadata=vector_metadata,
-            )
-            
-            # 更新索引状态
-            # 搜索基于向量存储，因此两个索引状态一致
-            if vector_success:
-                document.vector_indexed = True
-                document.search_indexed = True
-                db.commit()
-                db.refresh(document)
-            else:
-                # 索引创建失败，删除文档并抛出异常
-                db.delete(document)
-                db.commit()
-                
-                # 删除文件
-                if file_path and file_path.exists():
-                    file_path.unlink()
-                
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to create index for document. Please check if the vector store is properly initialized."
+
+        os.replace(temp_path, file_path)
+
+        if duplicate is not None:
+            try:
+                document_id = await pools.io.run(
+                    _register_duplicate_document,
+                    duplicate[0],
+                    path_key,
+                    document_title,
+                    provider,
+                    category,
+                    unique_filename,
                 )
-            
-        except HTTPException:
-            raise
-        except Exception as index_error:
-            # 索引创建失败，删除文档并抛出异常
-            logger.error(f"Failed to create index for document {document.id}: {str(index_error)}")
-            
-            # 回滚数据库
-            db.delete(document)
-            db.commit()
-            
-            # 删除文件
-            if file_path and file_path.exists():
-                file_path.unlink()
-            
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to create index: {str(index_error)}"
-            )
+                return {
+                    "message": f"Document {file.filename} is identical to document {duplicate[0]}, "
+                               f"indexed with its stored vectors",
+                    "document_id": document_id,
+                    "job_id": None,
+                    "status": "duplicate",
+                    **response,
+                }
+            except ExecutorBusyError:
+                raise
+            except Exception as e:
+                # 复用向量失败时按普通上传入库
+                logger.warning(f"Failed to reuse vectors of document {duplicate[0]}: {str(e)}")
+
+        # 登记入库任务（用 file_path 作为文档记录的唯一标识，已存在时更新而不是创建新记录；
+        # previous_document_id 记录被替换的文档，任务最终失败时保留其已有的索引）
+        job_id = await pools.io.run(
+            get_ingest_job_queue().enqueue,
+            path_key,
+            {
+                'title': document_title,
+                'provider': provider,
+                'category': category,
+                'filename': unique_filename,
+                'file_sha256': file_sha256,
+                'previous_document_id': previous_document_id,
+            },
+        )
+        if settings.INGEST_WORKER_ENABLED:
+            get_ingest_worker().notify()
 
         return {
-            "message": f"Document {file.filename} uploaded successfully",
-            "filename": file.filename,
-            "document_id": str(document.id),
-            "title": document.title,
-            "provider": document.provider or '',
-            "category": document.category or '',
-            "size": str(document.file_size or 0),
-            "word_count": str(document.word_count or 0),
+            "message": f"Document {file.filename} uploaded, ingestion queued",
+            "job_id": job_id,
+            "status": "queued",
+            **response,
         }
 
+    except (HTTPException, ExecutorBusyError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Upload failed: {str(e)}"
         )
 
 
-@router.post("/reindex", summary="重建索引")
-async def reindex_documents() -> dict[str, str]:
+@router.get("/jobs/{job_id}", summary="查询入库任务")
+async def get_ingest_job(job_id: str) -> dict[str, Any]:
     """
-    重新构建所有文档的搜索索引
+    查询上传产生的入库任务状态
 
-    这个操作会重新处理所有文档并更新向量索引和搜索索引
+    - **status**: queued / running / succeeded / failed
+    - **progress**: 各阶段（parsed、chunked、embedded、indexed）是否已完成
+    - **chunks_embedded** / **chunks_total**: 嵌入阶段进度
     """
-    try:
-        # 重置向量存储
-        vector_store = get_vector_store()
-        vector_store.reset_collection()
-
-        # 处理文档目录中的所有文件
-        documents_path = Path(settings.DOCUMENTS_PATH)
-        if not documents_path.exists():
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Documents directory not found"
-            )
-
-        # 批量处理文档
-        processed_docs = document_processor.batch_process_directory(str(documents_path), "*.md")
-
-        indexed_count = 0
-        failed_count = 0
+    job = await get_executor_pools().io.run(get_ingest_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+    return job
 
-        # 重建索引
-        for i, doc_data in enumerate(processed_docs):
-            document_id = i + 1  # 临时ID
 
-            try:
-                # 添加到向量存储
-                vector_store = get_vector_store()
-                vector_success = vector_store.add_document(
-                    document_id=document_id,
-                    chunks=doc_data['chunks'],
-                    metadata=doc_data.get('metadata', {}),
-                )
-
-                # 添加到搜索索引
-                search_engine = get_search_engine()
-                search_success = search_engine.index_document(
-                    document_id=document_id, document_data=doc_data
-                )
+@router.post("/reindex", summary="增量重建索引", dependencies=[Depends(require_model_ready)])
+async def reindex_documents(force: bool = False, wait: bool = True) -> dict[str, Any]:
+    """
+    增量重建文档索引
 
-                if vector_success and search_success:
-                    indexed_count += 1
-                else:
-                    failed_count += 1
+    对比文档目录中的文件、数据库记录和向量库中的分块，只重新入库新增和内容变化的文件，
+    并删除文件已不存在的文档和孤立分块。集合不会被清空，重建期间检索不受影响
 
-            except Exception as e:
-                failed_count += 1
-                print(f"Failed to index document {doc_data.get('filename', 'unknown')}: {str(e)}")
+    - **force**: 重新入库所有现存文档（如更换了嵌入模型）
+    - **wait**: 是否等待重建完成再返回；为false时立即返回，进度通过 GET /admin/reindex 查询
+    """
+    runner = get_reindex_runner()
+    if not runner.start(force=force):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reindex already running")
 
-        return {
-            "message": "Reindexing completed",
-            "total_documents": str(len(processed_docs)),
-            "indexed_successfully": str(indexed_count),
-            "failed": str(failed_count),
-        }
+    if wait:
+        while not runner.wait(0):
+            await asyncio.sleep(0.5)
 
-    except Exception as e:
+    result = runner.get_status()
+    if result['status'] == REINDEX_FAILED:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Reindexing failed: {str(e)}"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Reindexing failed: {result['error']}"
         )
+    progress = result['progress']
+    return {
+        "message": "Reindexing completed" if wait else "Reindexing started",
+        "total_documents": str(progress['total']),
+        "indexed_successfully": str(progress['indexed']),
+        "failed": str(progress['failed']),
+        **result,
+    }
+
+
+@router.get("/reindex", summary="查询重建索引进度")
+async def get_reindex_status() -> dict[str, Any]:
+    """
+    查询最近一次增量重建的状态
+
+    - **phase**: planning / indexing / deleting / done
+    - **plan**: 新增、更新、删除、孤立分块、未变化和跳过（有入库任务处理中）的文档数
+    - **progress**: 已写入、已删除、失败的文档数和总数
+    - **pipeline**: 入库流水线各阶段的 files/sec 和 chunks/sec
+    """
+    return get_reindex_runner().get_status()
 
 
-@router.delete("/documents/{document_id}", summary="删除文档")
+@router.delete("/documents/{document_id}", summary="删除文档", dependencies=[Depends(require_model_ready)])
 async def delete_document(
     document_id: int, db: Session = Depends(get_db)
 ) -> dict[str, str]:
@@ -407,8 +505,10 @@ async def delete_document(
     - **document_id**: 要删除的文档ID
     """
     try:
+        pools = get_executor_pools()
+
         # 先从数据库获取文档信息
-        document = db.query(Document).filter(Document.id == document_id).first()
+        document = await pools.io.run(_get_document, db, document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -421,26 +521,15 @@ async def delete_document(
         
         # 从向量存储中删除
         vector_store = get_vector_store()
-        vector_store.delete_document(document_id)
+        await vector_store.adelete_document(document_id)
 
-        # 从数据库中删除
-        db.delete(document)
-        db.commit()
-        
-        # 删除实际文件
-        if file_path:
-            file_path_obj = Path(file_path)
-            if file_path_obj.exists() and file_path_obj.is_file():
-                try:
-                    file_path_obj.unlink()
-                except Exception as e:
-                    # 文件删除失败不影响整体删除操作，只记录警告
-                    print(f"Warning: Failed to delete file {file_path}: {str(e)}")
+        # 从数据库中删除，并删除实际文件
+        await pools.io.run(_delete_document_record, db, document, file_path)
 
         return {"message": f"Document {document_id} deleted successfully", "filename": filename}
 
-    except HTTPException:
-        # 直接传递HTTP异常（如404）
+    except (HTTPException, ExecutorBusyError):
+        # 直接传递HTTP异常（如404）和执行器饱和异常
         raise
     except Exception as e:
         # 只包装非HTTP异常
@@ -459,7 +548,7 @@ async def health_check() -> dict[str, Any]:
     """
     try:
         health_service = get_health_service()
-        return health_service.get_health_status()
+        return await get_executor_pools().io.run(health_service.get_health_status)
 
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
@@ -473,19 +562,14 @@ async def get_metrics() -> dict[str, Any]:
     返回文档统计、搜索性能、系统资源使用等指标
     """
     try:
-        # 获取向量存储统计
-        vector_store = get_vector_store()
-        vector_stats = vector_store.get_collection_stats()
+        # 获取向量存储统计（模型未就绪时跳过，避免在请求中触发模型加载）
+        registry = get_model_registry()
+        pools = get_executor_pools()
+        vector_stats = await get_vector_store().aget_collection_stats() if registry.is_ready() else {}
 
         # 获取文档统计
         documents_path = Path(settings.DOCUMENTS_PATH)
-        file_count = 0
-        total_size = 0
-
-        if documents_path.exists():
-            md_files = list(documents_path.glob("*.md"))
-            file_count = len(md_files)
-            total_size = sum(f.stat().st_size for f in md_files)
+        file_count, total_size = await pools.io.run(_documents_directory_stats, documents_path)
 
         metrics = {
             "documents": {
@@ -496,6 +580,15 @@ async def get_metrics() -> dict[str, Any]:
             "providers": vector_stats.get("providers", []),
             "categories": vector_stats.get("categories", []),
             "embedding_model": vector_stats.get("embedding_model", ""),
+            "readiness": registry.get_readiness(),
+            **registry.get_component_stats(),
+            "search_response_cache": get_search_response_cache().get_stats(),
+            "search_result_sets": get_search_result_cache().get_stats(),
+            "ingest_jobs": {
+                **await pools.io.run(get_ingest_job_queue().get_stats),
+                "worker": get_ingest_worker().get_stats() if settings.INGEST_WORKER_ENABLED else None,
+            },
+            "executors": pools.get_stats(),
             "system": {
                 "documents_path": str(documents_path),
                 "vector_store_path": settings.CHROMA_PERSIST_DIRECTORY,
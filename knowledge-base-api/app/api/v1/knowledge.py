@@ -8,8 +8,12 @@ from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+from app.api.deps import require_model_ready
 from app.core.database import get_db
+from app.core.executors import ExecutorBusyError, get_executor_pools
 from app.models.search import (
+    BatchSearchRequest,
+    BatchSearchResponse,
     QuestionAnswerRequest,
     QuestionAnswerResponse,
     RecommendResponse,
@@ -18,22 +22,25 @@ from app.models.search import (
     SummarizeRequest,
     SummarizeResponse,
 )
+from app.services.grouping import GroupSpec
 from app.services.qa_service import QAService
+from app.services.search_cursor import InvalidCursorError
 from app.services.search_engine import SearchEngine
-from app.services.vector_store import VectorStore
+from app.services.vector_store import get_vector_store
 
 router = APIRouter()
 
 # 初始化服务
 search_engine = SearchEngine()
-qa_service = QAService()
+qa_service = QAService(search_engine)
 
-# 懒加载vector_store，避免模块加载时的集合ID缓存问题
-def get_vector_store():
-    return VectorStore()
 
-
-@router.get("/search", response_model=SearchResponse, summary="搜索知识库")
+@router.get(
+    "/search",
+    response_model=SearchResponse,
+    summary="搜索知识库",
+    dependencies=[Depends(require_model_ready)],
+)
 async def search_knowledge(
     query: str = Query(..., description="搜索查询"),
     limit: int = Query(10, ge=1, le=100, description="返回结果数量"),
@@ -42,59 +49,138 @@ async def search_knowledge(
     provider: Optional[str] = Query(None, description="指定云服务提供商"),
     category: Optional[str] = Query(None, description="指定文档分类"),
     min_score: float = Query(0.0, ge=0.0, le=1.0, description="最小相似度阈值"),
+    search_type: SearchType = Query(SearchType.SEMANTIC, description="搜索类型 (semantic/hybrid)"),
+    rerank: Optional[bool] = Query(None, description="是否使用交叉编码器重排（默认使用服务端配置）"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页响应中的next_cursor）"),
 ) -> SearchResponse:
     """
-    搜索知识库文档（语义搜索）
+    搜索知识库文档（语义搜索或混合搜索）
 
     - **query**: 搜索查询文本
     - **limit**: 返回结果数量
-    - **offset**: 结果偏移量
+    - **offset**: 结果偏移量（仅用于首页，后续页建议使用游标）
     - **source**: 过滤特定文档来源
     - **provider**: 过滤特定云服务提供商 (腾讯云、阿里云、火山云、华为云、AWS、Azure、GCP)
     - **category**: 过滤特定产品分类 (负载均衡、私有网络、弹性IP、NAT网关、专线、云联网、VPN)
     - **min_score**: 最小相似度阈值
+    - **search_type**: semantic 纯语义检索；hybrid 全文检索与语义检索并发执行后按倒数排名融合，
+      适合包含产品型号、API名称、缩写（ALB/CLB/NAT）的查询
+    - **rerank**: 对前若干个候选使用交叉编码器重新打分，超过截止时间时保持原顺序
+    - **cursor**: 携带上一页的 next_cursor 获取下一页，只按ID取回缓存的排序结果，
+      不重新检索，total 在翻页过程中保持一致；其余查询参数须与首页相同，否则返回400
     """
     try:
         # 构建过滤条件
-        filters = {}
-        if source:
-            filters['filename'] = source
-        if provider:
-            filters['provider'] = provider
-        if category:
-            filters['category'] = category
-
-        # 执行搜索
-        search_results = search_engine.search(
+        filters = _build_filters(source, provider, category)
+
+        # 执行搜索（编码和ChromaDB查询在执行器中完成，不阻塞事件循环）
+        search_results = await search_engine.asearch_page(
             query=query,
-            limit=limit + offset,  # 获取更多结果以支持偏移
+            limit=limit,
+            offset=offset,
             filters=filters if filters else None,
+            search_type=search_type,
+            rerank=rerank,
+            min_score=min_score,
+            cursor=cursor,
         )
 
-        # 应用偏移和分数过滤
-        filtered_results = []
-        for result in search_results['results']:
-            if result['score'] >= min_score:
-                filtered_results.append(result)
-
-        # 应用偏移
-        paginated_results = filtered_results[offset : offset + limit]
-
         return SearchResponse(
-            total=len(filtered_results),
-            results=paginated_results,
+            total=search_results['total'],
+            results=search_results['results'],
             query=query,
-            search_type=SearchType.SEMANTIC,
+            search_type=search_results['search_type'],
             processing_time=search_results['processing_time'],
+            reranked=search_results.get('reranked', False),
+            rerank_time=search_results.get('rerank_time'),
+            next_cursor=search_results.get('next_cursor'),
         )
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ExecutorBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Search failed: {str(e)}"
         )
 
 
-@router.post("/qa", response_model=QuestionAnswerResponse, summary="问答服务")
+@router.post(
+    "/search/batch",
+    response_model=BatchSearchResponse,
+    summary="批量搜索知识库",
+    dependencies=[Depends(require_model_ready)],
+)
+async def batch_search_knowledge(request: BatchSearchRequest) -> BatchSearchResponse:
+    """
+    批量搜索知识库文档（语义搜索）
+
+    所有查询在一次模型调用中编码，过滤条件相同的查询合并为一次向量库查询，
+    比逐条调用 /search 的单查询开销低得多。结果与请求中的queries一一对应
+
+    - **queries**: 查询列表，每项包含 query、filters(source/provider/category)、limit、min_score
+    """
+    try:
+        start_time = time.time()
+        search_results = await search_engine.asearch_many(
+            [
+                {
+                    'query': item.query,
+                    'limit': item.limit,
+                    'filters': _build_filters(item.filters.source, item.filters.provider, item.filters.category)
+                    or None,
+                }
+                for item in request.queries
+            ]
+        )
+
+        responses = []
+        for item, search_result in zip(request.queries, search_results):
+            # 应用分数过滤
+            filtered_results = [result for result in search_result['results'] if result['score'] >= item.min_score]
+            responses.append(
+                SearchResponse(
+                    total=len(filtered_results),
+                    results=filtered_results,
+                    query=item.query,
+                    search_type=SearchType.SEMANTIC,
+                    processing_time=search_result['processing_time'],
+                )
+            )
+
+        return BatchSearchResponse(
+            results=responses,
+            total_queries=len(responses),
+            processing_time=round(time.time() - start_time, 3),
+        )
+
+    except ExecutorBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Batch search failed: {str(e)}"
+        )
+
+
+def _build_filters(source: Optional[str], provider: Optional[str], category: Optional[str]) -> dict[str, Any]:
+    """将来源、提供商、分类转换为向量库过滤条件"""
+    filters = {}
+    if source:
+        filters['filename'] = source
+    if provider:
+        filters['provider'] = provider
+    if category:
+        filters['category'] = category
+    return filters
+
+
+@router.post(
+    "/qa",
+    response_model=QuestionAnswerResponse,
+    summary="问答服务",
+    dependencies=[Depends(require_model_ready)],
+)
 async def ask_question(request: QuestionAnswerRequest) -> QuestionAnswerResponse:
     """
     基于知识库回答问题
@@ -107,7 +193,7 @@ async def ask_question(request: QuestionAnswerRequest) -> QuestionAnswerResponse
     - **category**: 过滤特定产品分类 (负载均衡、私有网络、弹性IP、NAT网关、专线、云联网、VPN)
     """
     try:
-        result = qa_service.answer_question(
+        result = await qa_service.aanswer_question(
             question=request.question,
             context_limit=request.context_limit,
             include_sources=request.include_sources,
@@ -118,6 +204,8 @@ async def ask_question(request: QuestionAnswerRequest) -> QuestionAnswerResponse
 
         return QuestionAnswerResponse(**result)
 
+    except ExecutorBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -125,7 +213,12 @@ async def ask_question(request: QuestionAnswerRequest) -> QuestionAnswerResponse
         )
 
 
-@router.post("/summarize", response_model=SummarizeResponse, summary="文本摘要")
+@router.post(
+    "/summarize",
+    response_model=SummarizeResponse,
+    summary="文本摘要",
+    dependencies=[Depends(require_model_ready)],
+)
 async def summarize_content(
     request: SummarizeRequest, db: Session = Depends(get_db)
 ) -> SummarizeResponse:
@@ -150,7 +243,7 @@ async def summarize_content(
 
             # 暂时使用向量存储获取文档
             vector_store = get_vector_store()
-            chunks = vector_store.get_document_chunks(request.document_id)
+            chunks = await vector_store.aget_document_chunks(request.document_id)
             if not chunks:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
@@ -171,7 +264,7 @@ async def summarize_content(
 
         return SummarizeResponse(**result)
 
-    except HTTPException:
+    except (HTTPException, ExecutorBusyError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -180,7 +273,12 @@ async def summarize_content(
         )
 
 
-@router.get("/recommend", response_model=RecommendResponse, summary="文档推荐")
+@router.get(
+    "/recommend",
+    response_model=RecommendResponse,
+    summary="文档推荐",
+    dependencies=[Depends(require_model_ready)],
+)
 async def recommend_documents(
     document_id: Optional[int] = Query(None, description="基准文档ID"),
     query: Optional[str] = Query(None, description="查询文本"),
@@ -201,7 +299,7 @@ async def recommend_documents(
         if document_id:
             # 基于文档ID推荐
             vector_store = get_vector_store()
-            document_chunks = vector_store.get_document_chunks(document_id)
+            document_chunks = await vector_store.aget_document_chunks(document_id)
             if not document_chunks:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
@@ -222,10 +320,11 @@ async def recommend_documents(
                 detail="Either document_id or query must be provided",
             )
 
-        # 执行语义搜索推荐
-        search_results = search_engine.search(
+        # 执行按文档分组的语义搜索推荐（基准文档自身通常排第一，多取一个组）
+        search_results = await search_engine.asearch(
             query=query_text,
-            limit=limit * 2,  # 搜索更多结果以便过滤
+            limit=limit + 1 if document_id else limit,
+            group=GroupSpec(group_by='document_id', per_group=1),
         )
 
         # 过滤结果
@@ -251,7 +350,7 @@ async def recommend_documents(
             processing_time=round(processing_time, 3),
         )
 
-    except HTTPException:
+    except (HTTPException, ExecutorBusyError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -260,7 +359,7 @@ async def recommend_documents(
         )
 
 
-@router.get("/stats", summary="获取知识库统计信息")
+@router.get("/stats", summary="获取知识库统计信息", dependencies=[Depends(require_model_ready)])
 async def get_knowledge_stats() -> dict[str, Any]:
     """
     获取知识库统计信息
@@ -268,29 +367,36 @@ async def get_knowledge_stats() -> dict[str, Any]:
     返回文档数量、提供商分布、分类统计等信息
     """
     try:
-        # 获取向量存储统计
-        vector_store = get_vector_store()
-        vector_stats = vector_store.get_collection_stats()
-        
-        # 计算唯一文档数量
-        total_documents = 0
-        if vector_stats.get('total_chunks', 0) > 0:
-            # 获取所有文档ID来计算唯一文档数量
-            all_data = vector_store.collection.get(include=['metadatas'])
-            unique_doc_ids = set()
-            if all_data['metadatas']:
-                for metadata in all_data['metadatas']:
-                    if isinstance(metadata, dict) and 'document_id' in metadata:
-                        unique_doc_ids.add(metadata['document_id'])
-            total_documents = len(unique_doc_ids)
-        
-        # 添加文档总数到统计信息中
-        vector_stats['total_documents'] = total_documents
-
+        vector_stats = await get_executor_pools().io.run(_collect_knowledge_stats)
         return {"vector_store": vector_stats, "last_updated": time.time()}
 
+    except ExecutorBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get stats: {str(e)}",
         )
+
+
+def _collect_knowledge_stats() -> dict[str, Any]:
+    """统计向量存储中的分块、提供商、分类和文档数量（阻塞操作，在I/O池中执行）"""
+    # 获取向量存储统计
+    vector_store = get_vector_store()
+    vector_stats = vector_store.get_collection_stats()
+
+    # 计算唯一文档数量
+    total_documents = 0
+    if vector_stats.get('total_chunks', 0) > 0:
+        # 获取所有文档ID来计算唯一文档数量
+        all_data = vector_store.collection.get(include=['metadatas'])
+        unique_doc_ids = set()
+        if all_data['metadatas']:
+            for metadata in all_data['metadatas']:
+                if isinstance(metadata, dict) and 'document_id' in metadata:
+                    unique_doc_ids.add(metadata['document_id'])
+        total_documents = len(unique_doc_ids)
+
+    # 添加文档总数到统计信息中
+    vector_stats['total_documents'] = total_documents
+    return vector_stats
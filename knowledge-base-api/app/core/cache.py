@@ -0,0 +1,128 @@
+"""
+进程内缓存工具
+提供按字节预算淘汰的线程安全LRU缓存及命中率统计
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数"""
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """线程安全的LRU缓存，超出字节预算或条目上限时淘汰最久未使用的条目"""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: Optional[int] = None,
+        size_of: Callable[[Any], int] = estimate_size,
+        name: str = "cache",
+    ) -> None:
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 缓存值总字节预算
+            max_entries: 最大条目数，None表示不限制
+            size_of: 计算单个缓存值字节数的函数
+            name: 缓存名称（用于统计输出）
+        """
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._size_of = size_of
+
+        self._data: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，命中时将条目移动到最近使用位置"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """
+        写入缓存
+
+        Returns:
+            是否写入成功（单个值超过总预算时不缓存）
+        """
+        item_size = size if size is not None else self._size_of(value)
+        if item_size > self.max_bytes:
+            return False
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._current_bytes -= old[1]
+
+            self._data[key] = (value, item_size)
+            self._current_bytes += item_size
+            self._evict_locked()
+            return True
+
+    def pop(self, key: Hashable) -> Any:
+        """删除指定条目"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return None
+            self._current_bytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        """清空缓存（保留统计计数）"""
+        with self._lock:
+            self._data.clear()
+            self._current_bytes = 0
+
+    def _evict_locked(self) -> None:
+        """按LRU顺序淘汰直到满足预算"""
+        while self._data and (
+            self._current_bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._data) > self.max_entries)
+        ):
+            _, (_, item_size) = self._data.popitem(last=False)
+            self._current_bytes -= item_size
+            self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'entries': len(self._data),
+            'bytes': self._current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
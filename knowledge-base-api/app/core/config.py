@@ -21,19 +21,116 @@ class Settings:
     CHROMA_PERSIST_DIRECTORY: str = "./data/vectors"
     CHROMA_HOST: str = "localhost"
     CHROMA_PORT: int = 8000
+    EXACT_INDEX_ENABLED: bool = False               # 是否启用进程内精确向量索引（镜像knowledge_base集合）
+    EXACT_INDEX_DIR: str = "./data/exact_index"     # 精确索引内存映射文件目录
+    EXACT_INDEX_DTYPE: str = "float32"              # 精确索引矩阵精度 (float32/float16)
+    VECTOR_PARTITIONS_ENABLED: bool = False         # 是否按 (provider, category) 维护分区子索引
+    LEXICAL_INDEX_ENABLED: bool = True              # 是否维护SQLite FTS5全文索引（混合检索的词法通道）
+
+    # HNSW参数（None: 使用ChromaDB默认值；space/M/ef_construction只在创建集合时生效）
+    HNSW_SPACE: str = "l2"                  # 距离空间 (l2/cosine/ip)
+    HNSW_M: Optional[int] = None            # 每个节点的最大邻居数（ChromaDB默认16）
+    HNSW_EF_CONSTRUCTION: Optional[int] = None  # 构建时候选列表大小（ChromaDB默认100）
+    HNSW_EF_SEARCH: Optional[int] = None    # 检索时候选列表大小，越大召回越高、延迟越高（ChromaDB默认100）
+    HNSW_BATCH_SIZE: Optional[int] = None   # 写入内存暴力索引的批量大小（ChromaDB默认100）
+    HNSW_SYNC_THRESHOLD: Optional[int] = None  # 累积多少条写入后同步到HNSW图（ChromaDB默认1000）
+    # 按集合角色覆盖，如 {"partition": {"ef_search": 50}, "knowledge_base": {"M": 32}}
+    HNSW_COLLECTION_OVERRIDES: dict[str, dict[str, Any]] = {}
+
+    # 混合检索配置
+    HYBRID_CANDIDATE_POOL: int = 50  # 每个通道参与融合的候选数量（不少于limit）
+    HYBRID_RRF_K: int = 60           # 倒数排名融合常数 score = Σ 1 / (k + rank)
+
+    # 重排序配置（交叉编码器对前N个候选重新打分）
+    RERANK_ENABLED: bool = False                    # 是否默认启用重排序（请求可单独指定）
+    RERANK_MODEL: str = "BAAI/bge-reranker-base"    # 交叉编码器模型
+    RERANK_CANDIDATES: int = 20                     # 参与重排的候选数量（不少于limit）
+    RERANK_DEADLINE_MS: float = 300.0               # 重排截止时间（毫秒），超时保持向量检索顺序
+    RERANK_BATCH_SIZE: int = 8                      # 每批打分的 (查询, 分块) 对数量
+    RERANK_MAX_LENGTH: int = 512                    # 查询与分块拼接后的最大token长度
+    RERANK_CACHE_MAX_BYTES: int = 8 * 1024 * 1024   # 重排分数缓存字节预算
+
+    # 文档分组检索配置（按 document_id 等字段分组，逐步扩大召回直到组数足够）
+    GROUPED_SEARCH_INITIAL_FACTOR: int = 3      # 首轮召回分块数 = 组数 × 每组分块数 × 该系数
+    GROUPED_SEARCH_MAX_CANDIDATES: int = 400    # 单次分组检索最多召回的分块数（扩大召回的预算）
+    QA_CONTEXT_AGGREGATION: str = "max"         # 问答选择上下文文档时的分块分数聚合方式 (max/sum/mean)
+
+    # 游标分页配置
+    SEARCH_CURSOR_WINDOW: int = 200                          # 首页检索并缓存的排序结果数量上限
+    SEARCH_CURSOR_TTL_SECONDS: int = 300                     # 排序结果缓存有效期（秒）
+    SEARCH_CURSOR_CACHE_MAX_BYTES: int = 16 * 1024 * 1024    # 排序结果缓存字节预算
+
+    # 检索结果缓存配置（以索引代数精确失效）
+    SEARCH_RESPONSE_CACHE_ENABLED: bool = True                # 是否缓存相同请求的检索结果
+    SEARCH_RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024   # 检索结果缓存字节预算
+    SEMANTIC_CACHE_ENABLED: bool = False                      # 是否对措辞相近的查询复用检索结果
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95                    # 命中所需的最小查询向量余弦相似度
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2048                    # 语义缓存保存的最近查询数量
+
+    # 启动配置
+    STARTUP_RETRY_AFTER_SECONDS: int = 5  # 模型未就绪时建议客户端重试的秒数（Retry-After）
 
     # 文件配置
     DOCUMENTS_PATH: str = "./data/documents"
     PROCESSED_PATH: str = "./data/processed"
+    INGEST_MANIFEST_PATH: str = "./data/ingest_manifest.json"  # 文档入库清单（启动时增量对账）
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024       # 单个上传文件大小上限（写入过程中检查）
+    UPLOAD_STREAM_CHUNK_BYTES: int = 1024 * 1024    # 上传文件分块写入磁盘并计算sha256的块大小
+    UPLOAD_FORM_OVERHEAD_BYTES: int = 64 * 1024     # Content-Length 预检时允许的表单字段和分隔符字节数
 
     # 嵌入模型配置
     EMBEDDING_MODEL: str = "BAAI/bge-small-zh"
+    EMBEDDING_QUERY_INSTRUCTION: str = "为这个句子生成表示以用于检索相关文章："  # 检索查询指令
+    EMBEDDING_BACKEND: str = "flag"            # 嵌入推理后端 (flag: FlagEmbedding/PyTorch, onnx: ONNX Runtime)
+    EMBEDDING_ONNX_DIR: str = "./data/onnx"    # ONNX模型导出目录
+    EMBEDDING_ONNX_QUANTIZE: bool = True       # 是否使用动态int8量化
+    EMBEDDING_ONNX_THREADS: int = 0            # onnxruntime线程数（0: 自动）
+    EMBEDDING_MAX_SEQ_LENGTH: int = 512        # 单条文本最大token长度
+    EMBEDDING_BATCH_TOKEN_BUDGET: int = 8192   # 文档编码单批token预算（批大小 × 批内最大长度）
+    EMBEDDING_BATCHING_ENABLED: bool = True  # 是否启用查询向量动态微批处理
+    EMBEDDING_BATCH_MAX_SIZE: int = 32       # 单批最大查询数量
+    EMBEDDING_BATCH_WAIT_MS: float = 3.0     # 合并等待窗口（毫秒）
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = True               # 是否启用查询向量缓存
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 查询向量缓存字节预算
+    QUERY_EMBEDDING_CACHE_DTYPE: str = "float32"             # 缓存向量精度 (float32/float16)
+    CHUNK_EMBEDDING_CACHE_ENABLED: bool = True                # 是否启用分块向量持久化缓存
+    CHUNK_EMBEDDING_CACHE_DIR: str = "./data/embedding_cache" # 分块向量缓存目录
+    CHUNK_EMBEDDING_CACHE_DTYPE: str = "float32"              # 缓存向量精度 (float32/float16)
     
     # 文档处理配置
     DOCUMENT_CHUNK_SIZE: int = 1000       #文本块大小（默认：1000字符）
     DOCUMENT_CHUNK_OVERLAP: int = 200     #文本块重叠大小（默认：200字符）
     DOCUMENT_SEPARATORS: list[str] = ["\n\n", "\n", "。", "！", "？", "；", " ", ""] #文本分割符列表
 
+    # 入库任务队列配置（上传后由工作者异步解析、分块、嵌入、写入索引）
+    INGEST_WORKER_ENABLED: bool = True            # 是否在API进程内运行工作者（关闭时需运行 run_ingest_worker.py）
+    INGEST_WORKER_CONCURRENCY: int = 4            # 每个工作者同时处理的任务数
+    INGEST_PARSE_CONCURRENCY: int = 2             # 解析/分块阶段并发上限
+    INGEST_EMBED_CONCURRENCY: int = 1             # 嵌入阶段并发上限
+    INGEST_INDEX_CONCURRENCY: int = 2             # 写入索引阶段并发上限
+    INGEST_EMBED_BATCH_SIZE: int = 64             # 嵌入阶段每批分块数（每批更新一次进度）
+    INGEST_JOB_MAX_ATTEMPTS: int = 3              # 最大尝试次数，超过后执行补偿清理并标记失败
+    INGEST_RETRY_BASE_SECONDS: float = 2.0        # 重试退避基数（秒），每次失败翻倍
+    INGEST_RETRY_MAX_SECONDS: float = 120.0       # 重试退避上限（秒）
+    INGEST_JOB_LEASE_SECONDS: float = 120.0       # 任务租约时长（秒），工作者崩溃后超时的任务被重新领取
+    INGEST_POLL_INTERVAL_SECONDS: float = 1.0     # 队列为空时的轮询间隔（秒）
+
+    # 目录批量入库流水线配置（解析进程池 -> 有界队列 -> 批量嵌入 -> 批量写入）
+    INGEST_PIPELINE_PARSE_WORKERS: int = 0        # 解析进程数（0: CPU核数-1）
+    INGEST_PIPELINE_QUEUE_SIZE: int = 32          # 阶段之间队列容纳的文档数（背压）
+    INGEST_PIPELINE_EMBED_BATCH: int = 256        # 嵌入阶段跨文档合并的分块数
+    INGEST_PIPELINE_WRITE_BATCH: int = 16         # 写入阶段每个事务写入的文档数
+    REINDEX_DELETE_BATCH: int = 256               # 增量重建时每批删除的文档数
+
+    # 执行器配置（阻塞工作移出事件循环）
+    CPU_POOL_WORKERS: int = 0              # 文档解析进程数（0: CPU核数-1）
+    CPU_POOL_MAX_PENDING: int = 64         # 解析池最大在途任务数
+    INFERENCE_POOL_WORKERS: int = 2        # 嵌入推理线程数（模型内部已多线程）
+    INFERENCE_POOL_MAX_PENDING: int = 256  # 推理池最大在途任务数
+    IO_POOL_WORKERS: int = 8               # 数据库/ChromaDB/文件读写线程数
+    IO_POOL_MAX_PENDING: int = 512         # I/O池最大在途任务数
+    EXECUTOR_BUSY_RETRY_AFTER_SECONDS: int = 1  # 执行器饱和时建议客户端重试的秒数
+
     # 监控配置
     PROMETHEUS_PORT: int = 8001
 
@@ -5,7 +5,7 @@
 from contextlib import contextmanager
 from typing import Generator
 
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -35,10 +35,50 @@ def create_tables() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+# 已有数据库需要补充的列: (表名, 列名, 列定义, 索引名)。create_all 不会修改已存在的表
+_COLUMN_MIGRATIONS = [
+    ("documents", "file_sha256", "VARCHAR(64)", "ix_documents_file_sha256"),
+]
+
+
+def migrate_columns() -> None:
+    """为已存在的表补充新增的列和索引"""
+    with engine.begin() as conn:
+        for table, column, definition, index in _COLUMN_MIGRATIONS:
+            columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+            if not columns:
+                continue
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})"))
+
+
+def normalize_document_paths() -> None:
+    """将早期记录中的相对文件路径统一为 document_path_key（上传和重建索引都按该路径查找记录）"""
+    from app.services.document_records import document_path_key
+
+    with engine.begin() as conn:
+        if not list(conn.execute(text("PRAGMA table_info(documents)"))):
+            return
+        rows = conn.execute(text("SELECT id, file_path FROM documents")).all()
+        renamed = [
+            {'id': row.id, 'file_path': document_path_key(row.file_path)}
+            for row in rows
+            if row.file_path != document_path_key(row.file_path)
+        ]
+        if renamed:
+            conn.execute(text("UPDATE documents SET file_path = :file_path WHERE id = :id"), renamed)
+            print(f"✅ Normalized file paths of {len(renamed)} documents")
+
+
 def init_database() -> None:
     """初始化数据库"""
+    import app.models  # noqa: F401  注册模型，确保 create_all 能创建所有表
+
     try:
         create_tables()
+        migrate_columns()
+        normalize_document_paths()
         print("✅ Database tables created successfully")
     except Exception as e:
         print(f"❌ Failed to create database tables: {str(e)}")
@@ -0,0 +1,196 @@
+"""
+有界执行器
+
+将阻塞工作从事件循环中移出，按负载类型划分为三个独立的池：
+- cpu: 文档解析/分块（进程池，绕开GIL）
+- inference: 嵌入模型推理（线程池，模型内部已多线程，线程数保持较小）
+- io: SQLite、ChromaDB、文件读写（线程池）
+
+每个池限制排队任务数，排队已满时立即拒绝（ExecutorBusyError），避免请求无限堆积
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class ExecutorBusyError(RuntimeError):
+    """执行器排队任务已满"""
+
+    def __init__(self, pool_name: str, max_pending: int) -> None:
+        super().__init__(f"Executor pool '{pool_name}' is saturated ({max_pending} pending tasks)")
+        self.pool_name = pool_name
+        self.max_pending = max_pending
+
+
+class BoundedExecutor:
+    """限制并发数和排队数的执行器"""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Executor],
+        max_workers: int,
+        max_pending: int,
+        kind: str = "thread",
+    ) -> None:
+        """
+        初始化执行器
+
+        Args:
+            name: 池名称
+            factory: 创建底层执行器的工厂函数（首次提交任务时才创建）
+            max_workers: 工作线程/进程数
+            max_pending: 最大在途任务数（执行中 + 排队中）
+            kind: 执行器类型 (thread/process)
+        """
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._pending = 0
+        self._peak_pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._factory()
+                    logger.info(f"Executor pool '{self.name}' started ({self.kind}, {self.max_workers} workers)")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在池中执行阻塞函数并等待结果
+
+        进程池中执行的函数及参数必须可pickle（模块级函数）
+
+        Raises:
+            ExecutorBusyError: 在途任务数已达上限
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise ExecutorBusyError(self.name, self.max_pending)
+            self._pending += 1
+            self._submitted += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+
+        start_time = time.perf_counter()
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+            succeeded = True
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._total_seconds += time.perf_counter() - start_time
+                if succeeded:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭底层执行器"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取队列深度等统计信息"""
+        with self._lock:
+            pending = self._pending
+            finished = self._completed + self._failed
+            return {
+                'kind': self.kind,
+                'started': self._executor is not None,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'active': min(pending, self.max_workers),
+                'queue_depth': max(0, pending - self.max_workers),
+                'peak_pending': self._peak_pending,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_latency_ms': round(self._total_seconds / finished * 1000, 2) if finished else 0.0,
+            }
+
+
+def _default_cpu_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class ExecutorPools:
+    """进程内共享的执行器集合"""
+
+    def __init__(self) -> None:
+        cpu_workers = settings.CPU_POOL_WORKERS or _default_cpu_workers()
+        inference_workers = max(1, settings.INFERENCE_POOL_WORKERS)
+        io_workers = max(1, settings.IO_POOL_WORKERS)
+
+        # 进程池使用spawn启动，避免fork时继承模型权重、Chroma连接和锁状态
+        self.cpu = BoundedExecutor(
+            "cpu",
+            lambda: ProcessPoolExecutor(max_workers=cpu_workers, mp_context=multiprocessing.get_context("spawn")),
+            max_workers=cpu_workers,
+            max_pending=settings.CPU_POOL_MAX_PENDING,
+            kind="process",
+        )
+        self.inference = BoundedExecutor(
+            "inference",
+            lambda: ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="inference"),
+            max_workers=inference_workers,
+            max_pending=settings.INFERENCE_POOL_MAX_PENDING,
+        )
+        self.io = BoundedExecutor(
+            "io",
+            lambda: ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io"),
+            max_workers=io_workers,
+            max_pending=settings.IO_POOL_MAX_PENDING,
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取各池统计信息"""
+        return {pool.name: pool.get_stats() for pool in (self.cpu, self.inference, self.io)}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭所有池（应用关闭时调用）"""
+        for pool in (self.cpu, self.inference, self.io):
+            pool.shutdown(wait=wait)
+        logger.info("Executor pools shut down")
+
+
+# 全局执行器实例
+executor_pools = ExecutorPools()
+
+
+def get_executor_pools() -> ExecutorPools:
+    """获取执行器集合"""
+    return executor_pools
@@ -0,0 +1,208 @@
+"""
+预派生(pre-fork)多进程服务
+
+主进程只加载一次嵌入模型，随后fork出N个uvicorn工作进程共享同一个监听套接字；
+模型权重在fork后以写时复制(copy-on-write)方式共享，不会按工作进程数成倍占用内存。
+
+fork安全约束：
+- 主进程在fork前不得启动任何线程（微批处理器、ChromaDB客户端、执行器均在工作进程内创建）
+- 主进程推理线程数固定为1，避免OpenMP线程池在fork后的子进程中死锁
+- 关闭HuggingFace tokenizers的并行（必须在导入tokenizers前设置环境变量）
+"""
+
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 当前工作进程编号（非pre-fork模式下为None）
+_worker_id: Optional[int] = None
+
+
+def configure_fork_safety() -> None:
+    """设置fork安全相关的环境变量（需在导入torch/tokenizers之前调用）"""
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    # 主进程只做一次维度探测，单线程即可
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+
+def get_worker_id() -> Optional[int]:
+    """当前工作进程编号"""
+    return _worker_id
+
+
+def is_primary_worker() -> bool:
+    """是否为主工作进程（负责补齐索引等只应执行一次的启动任务）"""
+    return _worker_id is None or _worker_id == 0
+
+
+def default_threads_per_worker(workers: int) -> int:
+    """按 工作进程数 × 线程数 ≈ CPU核数 计算每个工作进程的推理线程数"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def set_inference_threads(threads: int) -> None:
+    """设置当前进程的推理线程数"""
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    settings.EMBEDDING_ONNX_THREADS = threads
+
+    if settings.EMBEDDING_BACKEND == "flag":
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+class PreforkServer:
+    """预加载模型后fork多个uvicorn工作进程的服务启动器"""
+
+    def __init__(
+        self,
+        app_path: str,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 2,
+        threads_per_worker: Optional[int] = None,
+        backlog: int = 2048,
+        log_level: str = "info",
+    ) -> None:
+        """
+        初始化启动器
+
+        Args:
+            app_path: ASGI应用导入路径（如 app.main:app）
+            host: 监听地址
+            port: 监听端口
+            workers: 工作进程数
+            threads_per_worker: 每个工作进程的推理线程数（默认 CPU核数 / 工作进程数）
+            backlog: 监听队列长度
+            log_level: uvicorn日志级别
+        """
+        self.app_path = app_path
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.threads_per_worker = threads_per_worker or default_threads_per_worker(self.workers)
+        self.backlog = backlog
+        self.log_level = log_level
+
+        self._socket: Optional[socket.socket] = None
+        self._children: dict[int, int] = {}  # pid -> worker_id
+        self._stopping = False
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _preload(self) -> None:
+        """在主进程中加载共享的嵌入模型"""
+        from app.core.config import get_settings
+        from app.services.model_registry import get_model_registry
+
+        settings = get_settings()
+        start_time = time.time()
+
+        # 预先导入应用模块，代码和模块级对象同样由工作进程共享
+        importlib.import_module(self.app_path.split(":", 1)[0])
+
+        if settings.EMBEDDING_BACKEND == "flag":
+            import torch
+
+            torch.set_num_threads(1)
+            get_model_registry().get_embedding_model()
+            logger.info(f"Embedding model preloaded in master in {time.time() - start_time:.1f}s")
+        else:
+            # onnxruntime会话在创建时即启动线程池，无法安全fork，由各工作进程自行加载
+            logger.info(f"Backend '{settings.EMBEDDING_BACKEND}' is loaded per worker, skipping preload")
+
+        # 将已加载对象移入永久代，避免子进程中的GC遍历触发写时复制
+        gc.collect()
+        gc.freeze()
+
+    def _spawn_worker(self, worker_id: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker(worker_id)
+            except BaseException:
+                logger.exception(f"Worker {worker_id} crashed")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self._children[pid] = worker_id
+        logger.info(f"Started worker {worker_id} (pid {pid})")
+
+    def _run_worker(self, worker_id: int) -> None:
+        """工作进程入口"""
+        global _worker_id
+        _worker_id = worker_id
+
+        # 恢复默认信号处理，交由uvicorn安装自己的处理器
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        set_inference_threads(self.threads_per_worker)
+
+        import uvicorn
+
+        config = uvicorn.Config(self.app_path, log_level=self.log_level, lifespan="on")
+        server = uvicorn.Server(config)
+        assert self._socket is not None
+        server.run(sockets=[self._socket])
+
+    def _handle_stop(self, signum: int, frame: object) -> None:
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        """绑定端口、预加载模型、fork工作进程并监管其运行"""
+        self._socket = self._bind()
+        logger.info(
+            f"Pre-fork server listening on {self.host}:{self.port} "
+            f"({self.workers} workers × {self.threads_per_worker} threads)"
+        )
+        self._preload()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for worker_id in range(self.workers):
+            self._spawn_worker(worker_id)
+
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            worker_id = self._children.pop(pid, None)
+            if worker_id is None:
+                continue
+            if not self._stopping:
+                logger.warning(f"Worker {worker_id} (pid {pid}) exited with status {status}, restarting")
+                time.sleep(1)
+                self._spawn_worker(worker_id)
+
+        self._socket.close()
+        logger.info("Pre-fork server stopped")
@@ -13,7 +13,8 @@ from fastapi.responses import JSONResponse
 
 from app.api.v1 import admin, knowledge, a2a
 from app.core.config import get_settings
-from app.core.logging import get_logger, log_request, log_error, log_performance
+from app.core.executors import ExecutorBusyError, get_executor_pools
+from app.core.logging import get_logger, log_request, log_error
 
 # 获取日志记录器
 logger = get_logger("main")
@@ -29,7 +30,6 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     # 初始化数据目录
     import os
-    from pathlib import Path
 
     os.makedirs(settings.DOCUMENTS_PATH, exist_ok=True)
     os.makedirs(settings.PROCESSED_PATH, exist_ok=True)
@@ -44,48 +44,43 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.error(f"❌ Database initialization failed: {str(e)}")
         raise
 
-    # 初始化向量存储和处理文档
-    try:
-        from app.services.vector_store import VectorStore
-        from app.services.document_processor import DocumentProcessor
-        
-        start_time = time.time()
-        vector_store = VectorStore()
-        document_processor = DocumentProcessor()
-        
-        # 处理文档目录中的所有文件
-        documents_path = Path(settings.DOCUMENTS_PATH)
-        if documents_path.exists():
-            processed_count = 0
-            for md_file in documents_path.glob("*.md"):
-                try:
-                    processed_doc = document_processor.process_file(str(md_file))
-                    if processed_doc:
-                        # 添加到向量存储
-                        vector_store.add_document(
-                            document_id=processed_count,
-                            chunks=processed_doc["chunks"],
-                            metadata=processed_doc["metadata"]
-                        )
-                        processed_count += 1
-                        logger.info(f"✅ Processed: {md_file.name}")
-                except Exception as e:
-                    logger.error(f"❌ Failed to process {md_file.name}: {str(e)}")
-            
-            logger.info(f"📚 Processed {processed_count} documents")
-            log_performance("document_processing", time.time() - start_time, count=processed_count)
-        else:
-            logger.warning(f"Documents directory not found: {documents_path}")
-            
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize vector store: {str(e)}")
-
-    logger.info("✅ Knowledge Base API started successfully!")
+    # 在后台加载共享模型注册表（嵌入模型、ChromaDB客户端、VectorStore）并预热，
+    # 就绪后按入库清单对账文档目录；HTTP服务无需等待即可接受连接。
+    # pre-fork模式下嵌入模型已由主进程加载，对账只在主工作进程中执行一次
+    from app.core.prefork import is_primary_worker
+    from app.services.ingest_manifest import reconcile_documents_directory
+    from app.services.model_registry import get_model_registry
+
+    model_registry = get_model_registry()
+    post_ready_tasks = {"catch_up_indexing": reconcile_documents_directory} if is_primary_worker() else {}
+    if settings.LEXICAL_INDEX_ENABLED and is_primary_worker():
+        # 全文索引与集合不一致（如首次启用）时重建
+        post_ready_tasks["lexical_index_sync"] = lambda: model_registry.get_vector_store().sync_lexical_index()
+    if settings.VECTOR_PARTITIONS_ENABLED and is_primary_worker():
+        # 分区集合持久化在ChromaDB中，只需由一个进程补齐
+        post_ready_tasks["partition_backfill"] = lambda: model_registry.get_vector_store().sync_partitions()
+    if settings.EXACT_INDEX_ENABLED:
+        # 精确索引是进程级镜像，每个工作进程各自构建
+        post_ready_tasks["exact_index_build"] = lambda: model_registry.get_vector_store().build_exact_index()
+    model_registry.start_background_initialization(post_ready_tasks=post_ready_tasks)
+
+    # 入库任务工作者（模型就绪后开始领取上传产生的任务）
+    from app.services.ingest_jobs import get_ingest_worker
+
+    ingest_worker = get_ingest_worker() if settings.INGEST_WORKER_ENABLED else None
+    if ingest_worker is not None:
+        ingest_worker.start()
+
+    logger.info("✅ Knowledge Base API started, model loading in background")
 
     yield
 
     # 关闭时执行
     logger.info("Shutting down Knowledge Base API...")
+    if ingest_worker is not None:
+        await ingest_worker.stop()
+    model_registry.shutdown()
+    get_executor_pools().shutdown(wait=False)
 
 
 # 创建FastAPI应用
@@ -112,6 +107,28 @@ if not settings.DEBUG:
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.ALLOWED_HOSTS)
 
 
+# 上传大小预检中间件: 请求体在路由处理前就会被完整解析并缓存，超过上限的上传按 Content-Length 提前拒绝
+UPLOAD_PATH = f"{settings.API_V1_STR}/admin/documents/upload"
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next: Any) -> Any:
+    if request.method == "POST" and request.url.path == UPLOAD_PATH:
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES + settings.UPLOAD_FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "error": {
+                        "code": 413,
+                        "message": f"File exceeds the upload limit of {settings.UPLOAD_MAX_BYTES} bytes",
+                        "timestamp": time.time(),
+                    }
+                },
+            )
+    return await call_next(request)
+
+
 # 请求处理时间中间件
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next: Any) -> Any:
@@ -153,6 +170,19 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         content={
             "error": {"code": exc.status_code, "message": exc.detail, "timestamp": time.time()}
         },
+        headers=getattr(exc, "headers", None),
+    )
+
+
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request: Request, exc: ExecutorBusyError) -> JSONResponse:
+    log_error(exc, f"Executor Busy: {request.method} {request.url}")
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": {"code": 503, "message": "Server busy, please retry later", "timestamp": time.time()}
+        },
+        headers={"Retry-After": str(settings.EXECUTOR_BUSY_RETRY_AFTER_SECONDS)},
     )
 
 
@@ -177,6 +207,8 @@ async def root() -> dict[str, Any]:
         "description": "知识库A2A调用API服务",
         "docs_url": "/docs",
         "health_check": "/api/v1/admin/health",
+        "liveness": "/livez",
+        "readiness": "/readyz",
         "a2a_endpoint": "/a2a",
         "a2a_agent_card": "/a2a/",
         "a2a_search": "/a2a/search",
@@ -191,6 +223,30 @@ async def health() -> dict[str, Any]:
     return {"status": "healthy", "timestamp": time.time(), "version": settings.APP_VERSION}
 
 
+# 存活探针：进程能处理请求即返回200
+@app.get("/livez", summary="存活探针")
+async def livez() -> dict[str, Any]:
+    """存活检查，不依赖模型加载状态"""
+    return {"status": "alive", "timestamp": time.time()}
+
+
+# 就绪探针：嵌入模型加载并预热完成后返回200
+@app.get("/readyz", summary="就绪探针")
+async def readyz() -> JSONResponse:
+    """就绪检查，模型未就绪时返回503"""
+    from app.services.model_registry import get_model_registry
+
+    readiness = get_model_registry().get_readiness()
+    readiness["timestamp"] = time.time()
+    if readiness["ready"]:
+        return JSONResponse(status_code=200, content=readiness)
+    return JSONResponse(
+        status_code=503,
+        content=readiness,
+        headers={"Retry-After": str(settings.STARTUP_RETRY_AFTER_SECONDS)},
+    )
+
+
 # 注册API路由
 app.include_router(knowledge.router, prefix=f"{settings.API_V1_STR}/knowledge", tags=["知识库"])
 app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["管理"])
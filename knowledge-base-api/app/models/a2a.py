@@ -19,6 +19,7 @@ class A2AMethod(str, Enum):
     """A2A方法类型"""
     GET_AGENT_CARD = "get_agent_card"
     SEARCH_KNOWLEDGE = "search_knowledge"
+    SEARCH_KNOWLEDGE_BATCH = "search_knowledge_batch"
     HEALTH_CHECK = "health_check"
 
 
@@ -74,6 +75,12 @@ class KnowledgeSearchRequest(BaseModel):
     min_score: float = Field(None, description="最小相似度阈值", ge=0.0, le=1.0)
 
 
+class KnowledgeBatchSearchRequest(BaseModel):
+    """批量知识检索请求"""
+    
+    queries: List[KnowledgeSearchRequest] = Field(..., description="检索请求列表", min_length=1, max_length=50)
+
+
 class KnowledgeSearchResponse(BaseModel):
     """知识检索响应"""
     
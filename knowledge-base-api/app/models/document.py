@@ -33,6 +33,7 @@ class Document(Base):
     file_path = Column(String(1000), nullable=False)
     content = Column(Text, nullable=True)
     content_hash = Column(String(64), nullable=True, index=True)
+    file_sha256 = Column(String(64), nullable=True, index=True)  # 原始文件字节的sha256（上传去重）
 
     # 元数据
     source_url = Column(String(1000), nullable=True)
@@ -101,6 +102,7 @@ class DocumentResponse(BaseModel):
     tags: Optional[list[str]] = None
     metadata: Optional[dict[str, Any]] = Field(None, alias='doc_metadata')
     content_hash: Optional[str]
+    file_sha256: Optional[str] = None
     status: DocumentStatus
     file_size: Optional[int]
     word_count: Optional[int]
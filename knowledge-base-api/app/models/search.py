@@ -12,6 +12,7 @@ class SearchType(str, Enum):
     """搜索类型枚举"""
 
     SEMANTIC = "semantic"
+    HYBRID = "hybrid"  # 全文检索 + 语义检索，倒数排名融合
 
 
 class SearchRequest(BaseModel):
@@ -47,6 +48,40 @@ class SearchResponse(BaseModel):
     query: str
     search_type: SearchType
     processing_time: float
+    reranked: bool = Field(False, description="结果是否经过交叉编码器重排")
+    rerank_time: Optional[float] = Field(None, description="重排耗时（秒），未请求重排时为空")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多结果时为空")
+
+
+class SearchFilters(BaseModel):
+    """搜索过滤条件"""
+
+    source: Optional[str] = Field(None, description="指定文档来源")
+    provider: Optional[str] = Field(None, description="指定云服务提供商")
+    category: Optional[str] = Field(None, description="指定文档分类")
+
+
+class BatchSearchItem(BaseModel):
+    """批量搜索中的单个查询"""
+
+    query: str = Field(..., min_length=1, max_length=1000, description="搜索查询")
+    filters: SearchFilters = Field(default_factory=SearchFilters, description="过滤条件")
+    limit: int = Field(10, ge=1, le=100, description="返回结果数量")
+    min_score: float = Field(0.0, ge=0.0, le=1.0, description="最小相似度阈值")
+
+
+class BatchSearchRequest(BaseModel):
+    """批量搜索请求模型"""
+
+    queries: list[BatchSearchItem] = Field(..., min_length=1, max_length=50, description="查询列表")
+
+
+class BatchSearchResponse(BaseModel):
+    """批量搜索响应模型（results与请求中的queries一一对应）"""
+
+    results: list[SearchResponse]
+    total_queries: int
+    processing_time: float
 
 
 class QuestionAnswerRequest(BaseModel):
@@ -7,6 +7,7 @@ import logging
 from typing import Any, Dict, List, Optional
 
 from app.core.config import get_settings
+from app.core.executors import ExecutorBusyError
 from app.models.a2a import (
     AgentCard,
     A2AMessage,
@@ -14,9 +15,11 @@ from app.models.a2a import (
     A2AMethod,
     A2ARequest,
     A2AResponse,
+    KnowledgeBatchSearchRequest,
     KnowledgeSearchRequest,
     KnowledgeSearchResponse,
 )
+from app.services.model_registry import get_model_registry
 from app.services.search_engine import SearchEngine
 
 logger = logging.getLogger(__name__)
@@ -54,6 +57,11 @@ class A2AService:
                     "path": "/a2a/search",
                     "description": "知识库检索"
                 },
+                "search_knowledge_batch": {
+                    "method": "POST",
+                    "path": "/a2a/search/batch",
+                    "description": "批量知识库检索"
+                },
                 "a2a_protocol": {
                     "method": "POST",
                     "path": "/a2a",
@@ -114,69 +122,133 @@ class A2AService:
                 "timestamp": time.time()
             }
     
-    def search_knowledge(self, request: KnowledgeSearchRequest) -> Dict[str, Any]:
+    async def search_knowledge(self, request: KnowledgeSearchRequest) -> Dict[str, Any]:
         """知识库检索"""
         try:
             start_time = time.time()
-            
-            # 使用配置中的默认值，如果请求中没有指定的话
-            effective_limit = request.limit if request.limit is not None else settings.A2A_DEFAULT_LIMIT
-            effective_min_score = request.min_score if request.min_score is not None else settings.A2A_DEFAULT_MIN_SCORE
-            
-            # 应用限制
-            effective_limit = min(effective_limit, settings.A2A_MAX_LIMIT)
-            effective_min_score = max(0.0, min(1.0, effective_min_score))
-            
-            # 构建过滤条件
-            filters = {}
-            if request.provider:
-                filters['provider'] = request.provider
-            if request.category:
-                filters['category'] = request.category
+            effective_limit, effective_min_score, filters = self._resolve_search_params(request)
             
             # 执行搜索
-            search_results = self.search_engine.search(
+            search_results = await self.search_engine.asearch(
                 query=request.query,
                 limit=effective_limit,
-                filters=filters if filters else None,
+                filters=filters,
             )
             
-            # 过滤低分结果
-            filtered_results = []
-            for result in search_results['results']:
-                if result['score'] >= effective_min_score:
-                    filtered_results.append(result)
+            return self._format_search_result(
+                request, search_results, effective_limit, effective_min_score, time.time() - start_time
+            )
+            
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Knowledge search failed: {str(e)}")
+            return self._search_error(request, e)
+    
+    async def search_knowledge_batch(self, request: KnowledgeBatchSearchRequest) -> Dict[str, Any]:
+        """批量知识库检索（所有查询一次编码，相同过滤条件合并查询）"""
+        try:
+            start_time = time.time()
+            params = [self._resolve_search_params(item) for item in request.queries]
+            
+            # 执行批量搜索
+            search_results = await self.search_engine.asearch_many(
+                [
+                    {"query": item.query, "limit": limit, "filters": filters}
+                    for item, (limit, _, filters) in zip(request.queries, params)
+                ]
+            )
             
             processing_time = time.time() - start_time
+            results = [
+                self._format_search_result(item, search_result, limit, min_score, processing_time)
+                for item, search_result, (limit, min_score, _) in zip(request.queries, search_results, params)
+            ]
             
             return {
                 "success": True,
-                "query": request.query,
-                "total_results": len(filtered_results),
-                "results": filtered_results,
+                "total_queries": len(results),
+                "results": results,
                 "processing_time": round(processing_time, 3),
-                "search_params": {
-                    "limit": effective_limit,
-                    "min_score": effective_min_score,
-                    "provider": request.provider,
-                    "category": request.category
-                },
                 "timestamp": time.time()
             }
             
+        except ExecutorBusyError:
+            raise
         except Exception as e:
-            logger.error(f"Knowledge search failed: {str(e)}")
+            logger.error(f"Batch knowledge search failed: {str(e)}")
             return {
                 "success": False,
-                "query": request.query,
-                "total_results": 0,
-                "results": [],
+                "total_queries": len(request.queries),
+                "results": [self._search_error(item, e) for item in request.queries],
                 "processing_time": 0,
                 "error_message": str(e),
                 "timestamp": time.time()
             }
     
-    def handle_request(self, request: A2ARequest) -> A2AResponse:
+    def _resolve_search_params(
+        self, request: KnowledgeSearchRequest
+    ) -> tuple[int, float, Optional[Dict[str, Any]]]:
+        """计算检索请求的有效数量、最小分数和过滤条件"""
+        # 使用配置中的默认值，如果请求中没有指定的话
+        effective_limit = request.limit if request.limit is not None else settings.A2A_DEFAULT_LIMIT
+        effective_min_score = request.min_score if request.min_score is not None else settings.A2A_DEFAULT_MIN_SCORE
+        
+        # 应用限制
+        effective_limit = min(effective_limit, settings.A2A_MAX_LIMIT)
+        effective_min_score = max(0.0, min(1.0, effective_min_score))
+        
+        # 构建过滤条件
+        filters = {}
+        if request.provider:
+            filters['provider'] = request.provider
+        if request.category:
+            filters['category'] = request.category
+        
+        return effective_limit, effective_min_score, filters if filters else None
+    
+    def _format_search_result(
+        self,
+        request: KnowledgeSearchRequest,
+        search_results: Dict[str, Any],
+        effective_limit: int,
+        effective_min_score: float,
+        processing_time: float,
+    ) -> Dict[str, Any]:
+        """过滤低分结果并生成检索响应"""
+        filtered_results = []
+        for result in search_results['results']:
+            if result['score'] >= effective_min_score:
+                filtered_results.append(result)
+        
+        return {
+            "success": True,
+            "query": request.query,
+            "total_results": len(filtered_results),
+            "results": filtered_results,
+            "processing_time": round(processing_time, 3),
+            "search_params": {
+                "limit": effective_limit,
+                "min_score": effective_min_score,
+                "provider": request.provider,
+                "category": request.category
+            },
+            "timestamp": time.time()
+        }
+    
+    def _search_error(self, request: KnowledgeSearchRequest, error: Exception) -> Dict[str, Any]:
+        """生成检索失败响应"""
+        return {
+            "success": False,
+            "query": request.query,
+            "total_results": 0,
+            "results": [],
+            "processing_time": 0,
+            "error_message": str(error),
+            "timestamp": time.time()
+        }
+    
+    async def handle_request(self, request: A2ARequest) -> A2AResponse:
         """处理A2A请求"""
         try:
             if request.action == "agent_card":
@@ -202,7 +274,7 @@ class A2AService:
                 
                 # 创建搜索请求
                 search_request = KnowledgeSearchRequest(**request.data)
-                result = self.search_knowledge(search_request)
+                result = await self.search_knowledge(search_request)
                 
                 return A2AResponse(
                     success=result["success"],
@@ -221,6 +293,8 @@ class A2AService:
                     timestamp=time.time()
                 )
                 
+        except ExecutorBusyError:
+            raise
         except Exception as e:
             logger.error(f"A2A request handling failed: {str(e)}")
             return A2AResponse(
@@ -231,7 +305,7 @@ class A2AService:
                 timestamp=time.time()
             )
     
-    def handle_a2a_message(self, message: A2AMessage) -> A2AMessage:
+    async def handle_a2a_message(self, message: A2AMessage) -> A2AMessage:
         """处理标准A2A协议消息"""
         try:
             if message.method == A2AMethod.GET_AGENT_CARD:
@@ -243,7 +317,43 @@ class A2AService:
                     result=result
                 )
             
-            elif message.method == A2AMethod.SEARCH_KNOWLEDGE:
+            elif message.method in (A2AMethod.SEARCH_KNOWLEDGE, A2AMethod.SEARCH_KNOWLEDGE_BATCH):
+                if not get_model_registry().is_ready():
+                    error = A2AError(
+                        code=-32000,
+                        message="Service warming up, please retry later",
+                        data={"retry_after": settings.STARTUP_RETRY_AFTER_SECONDS}
+                    )
+                    return A2AMessage(
+                        jsonrpc="2.0",
+                        id=message.id,
+                        method=message.method,
+                        error=error.dict()
+                    )
+
+                if message.method == A2AMethod.SEARCH_KNOWLEDGE_BATCH:
+                    if not message.params or not message.params.get("queries"):
+                        error = A2AError(
+                            code=-32602,
+                            message="Invalid params: missing required field 'queries'",
+                            data={"required_fields": ["queries"]}
+                        )
+                        return A2AMessage(
+                            jsonrpc="2.0",
+                            id=message.id,
+                            method=message.method,
+                            error=error.dict()
+                        )
+                    
+                    batch_request = KnowledgeBatchSearchRequest(**message.params)
+                    result = await self.search_knowledge_batch(batch_request)
+                    return A2AMessage(
+                        jsonrpc="2.0",
+                        id=message.id,
+                        method=message.method,
+                        result=result
+                    )
+                
                 if not message.params or "query" not in message.params:
                     error = A2AError(
                         code=-32602,
@@ -259,7 +369,7 @@ class A2AService:
                 
                 # 创建搜索请求
                 search_request = KnowledgeSearchRequest(**message.params)
-                result = self.search_knowledge(search_request)
+                result = await self.search_knowledge(search_request)
                 
                 return A2AMessage(
                     jsonrpc="2.0",
@@ -269,10 +379,11 @@ class A2AService:
                 )
             
             elif message.method == A2AMethod.HEALTH_CHECK:
+                search_ready = get_model_registry().is_ready()
                 health_result = {
-                    "status": "healthy",
+                    "status": "healthy" if search_ready else "starting",
                     "agent_card_available": True,
-                    "search_available": True,
+                    "search_available": search_ready,
                     "timestamp": time.time()
                 }
                 return A2AMessage(
@@ -295,6 +406,18 @@ class A2AService:
                     error=error.dict()
                 )
                 
+        except ExecutorBusyError as e:
+            error = A2AError(
+                code=-32000,
+                message="Server busy, please retry later",
+                data={"pool": e.pool_name, "retry_after": settings.EXECUTOR_BUSY_RETRY_AFTER_SECONDS}
+            )
+            return A2AMessage(
+                jsonrpc="2.0",
+                id=message.id,
+                method=message.method,
+                error=error.dict()
+            )
         except Exception as e:
             logger.error(f"A2A message handling failed: {str(e)}")
             error = A2AError(
@@ -0,0 +1,224 @@
+"""
+分块向量持久化缓存
+
+以 sha256(模型ID + 分块文本) 为键，将分块向量追加写入磁盘上的定长二进制矩阵，
+读取时通过内存映射按行取出。重新上传、重建索引或重启时，内容未变的分块无需再次编码。
+
+目录结构（每个模型一个子目录）:
+    meta.json    模型ID、向量维度、存储精度
+    keys.bin     每行32字节的sha256摘要，按写入顺序排列
+    vectors.bin  与keys.bin逐行对应的向量矩阵
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from filelock import FileLock
+
+logger = logging.getLogger(__name__)
+
+_KEY_SIZE = 32
+
+
+def _slugify(model_id: str) -> str:
+    """将模型ID转换为可用作目录名的字符串"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_id).strip("_") or "default"
+
+
+class ChunkEmbeddingCache:
+    """基于内容哈希的持久化分块向量缓存"""
+
+    def __init__(self, cache_dir: str, model_id: str, dimension: int, dtype: str = "float32") -> None:
+        """
+        初始化分块向量缓存
+
+        Args:
+            cache_dir: 缓存根目录
+            model_id: 模型标识（参与哈希，模型变化时不会命中旧向量）
+            dimension: 向量维度
+            dtype: 存储精度 (float32/float16)
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported cache dtype: {dtype}")
+
+        self.model_id = model_id
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = self.dimension * self.dtype.itemsize
+
+        self.directory = Path(cache_dir) / _slugify(model_id)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.directory / "meta.json"
+        self._keys_path = self.directory / "keys.bin"
+        self._vectors_path = self.directory / "vectors.bin"
+
+        # 跨进程写入锁，线程锁保护进程内状态
+        self._file_lock = FileLock(str(self.directory / ".lock"))
+        self._lock = threading.Lock()
+
+        self._index: dict[bytes, int] = {}
+        self._rows = 0
+        self._matrix: Optional[np.memmap] = None
+        self._mapped_rows = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        with self._file_lock:
+            self._load()
+
+    def make_key(self, text: str) -> bytes:
+        """计算分块文本的缓存键"""
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode("utf-8")).digest()
+
+    def _load(self) -> None:
+        """加载磁盘上的缓存索引（需持有文件锁）"""
+        meta = {'model_id': self.model_id, 'dimension': self.dimension, 'dtype': self.dtype.name}
+        if self._meta_path.exists():
+            try:
+                existing = json.loads(self._meta_path.read_text(encoding="utf-8"))
+            except Exception:
+                existing = {}
+            if existing != meta:
+                logger.warning(f"Chunk embedding cache metadata changed ({existing} -> {meta}), resetting cache")
+                self._keys_path.unlink(missing_ok=True)
+                self._vectors_path.unlink(missing_ok=True)
+        self._meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+        self._keys_path.touch(exist_ok=True)
+        self._vectors_path.touch(exist_ok=True)
+
+        # 以两个文件中完整行数的较小值为准，截掉中断写入留下的残缺尾部
+        key_rows = self._keys_path.stat().st_size // _KEY_SIZE
+        vector_rows = self._vectors_path.stat().st_size // self.row_bytes
+        rows = min(key_rows, vector_rows)
+        if self._keys_path.stat().st_size != rows * _KEY_SIZE:
+            os.truncate(self._keys_path, rows * _KEY_SIZE)
+        if self._vectors_path.stat().st_size != rows * self.row_bytes:
+            os.truncate(self._vectors_path, rows * self.row_bytes)
+
+        self._index = {}
+        self._rows = 0
+        self._read_new_keys(rows)
+        logger.info(f"Chunk embedding cache loaded: {self._rows} vectors at {self.directory}")
+
+    def _read_new_keys(self, total_rows: int) -> None:
+        """读取其他进程追加的新键（需持有锁）"""
+        if total_rows <= self._rows:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._rows * _KEY_SIZE)
+            data = f.read((total_rows - self._rows) * _KEY_SIZE)
+        for offset in range(0, len(data), _KEY_SIZE):
+            self._index.setdefault(data[offset:offset + _KEY_SIZE], self._rows)
+            self._rows += 1
+
+    def _truncate(self, rows: int) -> None:
+        """将两个文件截到指定行数（需持有文件锁）"""
+        if self._keys_path.stat().st_size > rows * _KEY_SIZE:
+            os.truncate(self._keys_path, rows * _KEY_SIZE)
+        if self._vectors_path.stat().st_size > rows * self.row_bytes:
+            os.truncate(self._vectors_path, rows * self.row_bytes)
+
+    def _ensure_mapped(self) -> Optional[np.memmap]:
+        """确保内存映射覆盖所有已知行（需持有线程锁）"""
+        if self._rows == 0:
+            return None
+        if self._matrix is None or self._mapped_rows < self._rows:
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r", shape=(self._rows, self.dimension)
+            )
+            self._mapped_rows = self._rows
+        return self._matrix
+
+    def get_many(self, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """
+        批量读取缓存向量
+
+        Returns:
+            与texts对应的向量列表，未命中位置为None
+        """
+        keys = [self.make_key(text) for text in texts]
+        results: list[Optional[np.ndarray]] = [None] * len(texts)
+
+        with self._lock:
+            positions = []
+            rows = []
+            for i, key in enumerate(keys):
+                row = self._index.get(key)
+                if row is not None:
+                    positions.append(i)
+                    rows.append(row)
+
+            matrix = self._ensure_mapped()
+            if rows and matrix is not None:
+                vectors = np.asarray(matrix[np.asarray(rows)], dtype=np.float32)
+                for position, vector in zip(positions, vectors):
+                    results[position] = vector
+
+            self.hits += len(rows)
+            self.misses += len(texts) - len(rows)
+
+        return results
+
+    def put_many(self, texts: list[str], embeddings: Any) -> None:
+        """批量写入分块向量（已存在的键会被跳过）"""
+        vectors = np.asarray(embeddings, dtype=self.dtype).reshape(len(texts), self.dimension)
+        keys = [self.make_key(text) for text in texts]
+
+        with self._lock, self._file_lock:
+            # 先同步其他进程追加的键，避免重复写入
+            self._read_new_keys(self._keys_path.stat().st_size // _KEY_SIZE)
+
+            new_keys: list[bytes] = []
+            new_rows: list[int] = []
+            seen: set[bytes] = set()
+            for i, key in enumerate(keys):
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(i)
+
+            if not new_keys:
+                return
+
+            # 以键的行数为准截掉之前失败写入留下的多余行，保证新向量与新键写在同一行号上；
+            # 先写向量再写键，任一写入失败时回滚到写入前的长度
+            self._truncate(self._rows)
+            try:
+                with open(self._vectors_path, "ab") as f:
+                    f.write(np.ascontiguousarray(vectors[new_rows]).tobytes())
+                    f.flush()
+                with open(self._keys_path, "ab") as f:
+                    f.write(b"".join(new_keys))
+                    f.flush()
+            except BaseException:
+                self._truncate(self._rows)
+                raise
+
+            for key in new_keys:
+                self._index[key] = self._rows
+                self._rows += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            'model_id': self.model_id,
+            'entries': self._rows,
+            'dimension': self.dimension,
+            'dtype': self.dtype.name,
+            'disk_bytes': self._rows * (self.row_bytes + _KEY_SIZE),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'path': str(self.directory),
+        }
@@ -18,10 +18,45 @@ from langchain_core.documents import Document as LangChainDocument
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from app.core.config import get_settings
+from app.core.executors import get_executor_pools
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 支持上传和入库的文件扩展名
+SUPPORTED_EXTENSIONS = ['.md', '.markdown', '.doc', '.docx', '.pdf', '.txt', '.xlsx', '.xls', '.pptx', '.ppt']
+
+# CPU进程池中每个工作进程按配置复用的处理器实例
+_worker_processors: dict[tuple, "DocumentProcessor"] = {}
+
+
+def _get_worker_processor(chunk_size: int, chunk_overlap: int, separators: List[str]) -> "DocumentProcessor":
+    key = (chunk_size, chunk_overlap, tuple(separators))
+    processor = _worker_processors.get(key)
+    if processor is None:
+        processor = DocumentProcessor(chunk_size, chunk_overlap, separators)
+        _worker_processors[key] = processor
+    return processor
+
+
+def _process_file_in_worker(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: List[str],
+    file_sha256: Optional[str] = None,
+) -> dict[str, Any]:
+    """在CPU进程池的工作进程中处理单个文件"""
+    return _get_worker_processor(chunk_size, chunk_overlap, separators).process_file(file_path, file_sha256)
+
+
+def _batch_process_in_worker(
+    directory: str, file_extension: str, chunk_size: int, chunk_overlap: int, separators: List[str]
+) -> List[dict[str, Any]]:
+    """在CPU进程池的工作进程中批量处理目录"""
+    processor = _get_worker_processor(chunk_size, chunk_overlap, separators)
+    return processor.batch_process_directory(directory, file_extension)
+
 
 class DocumentProcessor:
     """基于LangChain的文档处理器"""
@@ -55,12 +90,13 @@ class DocumentProcessor:
         
         logger.info(f"LangChain DocumentProcessor initialized with chunk_size={self.chunk_size}, chunk_overlap={self.chunk_overlap}")
 
-    def process_file(self, file_path: str) -> dict[str, Any]:
+    def process_file(self, file_path: str, file_sha256: Optional[str] = None) -> dict[str, Any]:
         """
         处理单个文件
         
         Args:
             file_path: 文件路径
+            file_sha256: 调用方已计算的原始字节sha256（写入文档记录用于去重）
             
         Returns:
             处理后的文档数据
@@ -98,6 +134,7 @@ class DocumentProcessor:
                 'metadata': combined_metadata,
                 'chunks': chunks,
                 'content_hash': content_hash,
+                'file_sha256': file_sha256,
                 **file_info
             }
             
@@ -108,6 +145,26 @@ class DocumentProcessor:
             logger.error(f"Error processing file {file_path} with LangChain: {str(e)}")
             raise
 
+    async def aprocess_file(self, file_path: str, file_sha256: Optional[str] = None) -> dict[str, Any]:
+        """
+        在CPU进程池中处理单个文件（解析和分块不占用事件循环与GIL）
+
+        Args:
+            file_path: 文件路径
+            file_sha256: 调用方已计算的原始字节sha256
+
+        Returns:
+            处理后的文档数据
+        """
+        return await get_executor_pools().cpu.run(
+            _process_file_in_worker,
+            file_path,
+            self.chunk_size,
+            self.chunk_overlap,
+            list(self.separators),
+            file_sha256,
+        )
+
     def _load_document(self, file_path: str) -> List[LangChainDocument]:
         """
         使用LangChain加载器加载文档
@@ -440,6 +497,19 @@ class DocumentProcessor:
             # 回退到逐个文件处理
             return self._fallback_batch_process(directory, file_extension)
 
+    async def abatch_process_directory(
+        self, directory: str, file_extension: str = "*.md"
+    ) -> List[dict[str, Any]]:
+        """在CPU进程池中批量处理目录中的文件（参数与返回值同 batch_process_directory）"""
+        return await get_executor_pools().cpu.run(
+            _batch_process_in_worker,
+            directory,
+            file_extension,
+            self.chunk_size,
+            self.chunk_overlap,
+            list(self.separators),
+        )
+
     def _process_single_document(self, doc: LangChainDocument, file_path: str) -> dict[str, Any]:
         """
         处理单个LangChain文档
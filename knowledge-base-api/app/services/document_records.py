@@ -0,0 +1,117 @@
+"""
+文档数据库记录服务
+
+负责将处理后的文档写入 documents 表，并生成与之对应的向量元数据
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from app.models.document import Document, DocumentStatus
+
+
+def parse_tags(metadata: dict[str, Any]) -> Optional[list[str]]:
+    """从元数据中解析标签列表"""
+    tags = metadata.get('tags')
+    if isinstance(tags, str) and tags:
+        return tags.split(',')
+    if isinstance(tags, list):
+        return tags
+    return None
+
+
+def document_path_key(file_path: Union[str, Path]) -> str:
+    """文档记录的文件路径（统一为绝对路径，同一文件的相对路径和绝对路径对应同一条记录）"""
+    return str(Path(file_path).resolve())
+
+
+def build_vector_metadata(document: Document) -> dict[str, Any]:
+    """根据数据库记录生成向量存储的文档级元数据"""
+    return {
+        'title': document.title,
+        'filename': document.filename,
+        'provider': document.provider or '',
+        'category': document.category or '',
+        'source_url': document.source_url or '',
+    }
+
+
+def _unique_filename(db: Session, filename: str, file_path: str, exclude_id: Optional[int] = None) -> str:
+    """文件名已被其他记录占用时追加路径哈希保证唯一"""
+    query = db.query(Document).filter(Document.filename == filename)
+    if exclude_id is not None:
+        query = query.filter(Document.id != exclude_id)
+    if query.first() is None:
+        return filename
+    path_hash = hashlib.md5(file_path.encode()).hexdigest()[:8]
+    return f"{filename}_{path_hash}"
+
+
+def upsert_document_record(
+    db: Session,
+    file_path: str,
+    processed_doc: dict[str, Any],
+    title: Optional[str] = None,
+    provider: Optional[str] = None,
+    category: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Document:
+    """
+    按文件路径创建或更新文档记录（不提交事务）
+
+    Args:
+        db: 数据库会话
+        file_path: 文件路径（作为记录的唯一标识）
+        processed_doc: DocumentProcessor.process_file 的返回结果
+        title: 显式指定的标题，新记录默认使用处理结果中的标题，已有记录默认保留原标题
+        provider: 显式指定的云厂商，新记录默认使用元数据中提取的值，已有记录默认保留原值
+        category: 显式指定的产品分类，新记录默认使用元数据中提取的值，已有记录默认保留原值
+        filename: 新记录使用的文件名，默认使用处理结果中的文件名（冲突时自动追加路径哈希）
+
+    Returns:
+        文档记录（新记录已加入会话并flush以获得ID）
+    """
+    metadata = processed_doc.get('metadata', {})
+    word_count = int(metadata['word_count']) if metadata.get('word_count') else None
+
+    document = db.query(Document).filter(Document.file_path == file_path).first()
+    if document is not None:
+        # 重新入库（如目录重建）不应覆盖上传时用户指定的元数据
+        title = title or document.title
+        provider = provider or document.provider
+        category = category or document.category
+
+    values = {
+        'title': title or processed_doc.get('title') or processed_doc.get('filename', ''),
+        'content': processed_doc.get('content'),
+        'content_hash': processed_doc.get('content_hash'),
+        'file_sha256': processed_doc.get('file_sha256'),
+        'source_url': metadata.get('source_url'),
+        'provider': provider or processed_doc.get('provider') or metadata.get('provider'),
+        'category': category or processed_doc.get('category') or metadata.get('category'),
+        'tags': parse_tags(metadata),
+        'doc_metadata': metadata,
+        'status': DocumentStatus.PROCESSED,
+        'file_size': processed_doc.get('file_size', 0),
+        'word_count': word_count,
+        'vector_indexed': False,
+        'search_indexed': False,
+    }
+
+    if document is None:
+        filename = filename or processed_doc.get('filename') or file_path.rsplit('/', 1)[-1]
+        document = Document(
+            filename=_unique_filename(db, filename, file_path),
+            file_path=file_path,
+            **values,
+        )
+        db.add(document)
+    else:
+        for key, value in values.items():
+            setattr(document, key, value)
+
+    db.flush()
+    return document
@@ -0,0 +1,183 @@
+"""
+查询向量动态微批处理服务
+
+将并发到达的查询文本在很短的等待窗口内合并为一次批量encode调用，
+每个请求通过独立的Future获取自己的向量
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 停止信号
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """查询向量微批处理器"""
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 3.0,
+    ) -> None:
+        """
+        初始化微批处理器
+
+        Args:
+            encode_fn: 批量编码函数，输入文本列表，返回二维向量数组
+            max_batch_size: 单批最大文本数量
+            max_wait_ms: 首个请求到达后等待更多请求的最长时间（毫秒）
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_encoded = 0
+        self._max_observed_batch = 0
+
+    def start(self) -> None:
+        """启动后台批处理线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="embedding-batcher", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"Embedding batcher started (max_batch_size={self.max_batch_size}, "
+                f"max_wait_ms={self.max_wait * 1000:.1f})"
+            )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止后台线程，未处理的请求将收到异常"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout=timeout)
+        logger.info("Embedding batcher stopped")
+
+    def submit(self, text: str) -> "Future[np.ndarray]":
+        """提交一条查询文本，返回该文本向量的Future"""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        future: "Future[np.ndarray]" = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """同步获取单条查询文本的向量"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect_batch(self, first: Any) -> tuple[list[tuple[str, Future]], bool]:
+        """以首个请求为起点，在等待窗口内收集一批请求"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        stop_requested = False
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # 等待窗口已过，只取已排队的请求
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop_requested = True
+                break
+            batch.append(item)
+
+        return batch, stop_requested
+
+    def _run(self) -> None:
+        """后台批处理循环"""
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch, stop_requested = self._collect_batch(first)
+            self._process_batch(batch)
+
+            if stop_requested:
+                break
+
+        # 清理未处理的请求
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Embedding batcher stopped"))
+
+    def _process_batch(self, batch: list[tuple[str, Future]]) -> None:
+        """对一批请求执行一次encode并分发结果"""
+        # 将Future标记为运行中，之后不能再被取消；已取消的请求（如客户端断开）直接跳过
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        # 同一批次中的相同文本只编码一次
+        unique_texts: list[str] = []
+        positions: dict[str, int] = {}
+        for text, _ in batch:
+            if text not in positions:
+                positions[text] = len(unique_texts)
+                unique_texts.append(text)
+
+        try:
+            embeddings = np.asarray(self.encode_fn(unique_texts))
+            if embeddings.ndim == 1:
+                embeddings = embeddings.reshape(1, -1)
+        except Exception as e:
+            logger.error(f"Batched embedding failed for {len(batch)} requests: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for text, future in batch:
+            future.set_result(embeddings[positions[text]])
+
+        self._total_requests += len(batch)
+        self._total_batches += 1
+        self._total_encoded += len(unique_texts)
+        self._max_observed_batch = max(self._max_observed_batch, len(batch))
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取批处理统计信息"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queue_depth': self._queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'total_requests': self._total_requests,
+            'total_batches': self._total_batches,
+            'total_encoded': self._total_encoded,
+            'avg_batch_size': (
+                round(self._total_requests / self._total_batches, 2) if self._total_batches else 0.0
+            ),
+            'max_observed_batch': self._max_observed_batch,
+        }
@@ -0,0 +1,378 @@
+"""
+进程内精确向量索引
+
+将 knowledge_base 集合镜像为一个连续的向量矩阵（内存映射文件）和按列存储的元数据数组，
+过滤条件直接转换为布尔掩码，对候选行做暴力内积并用 argpartition 取 top-k。
+百万级以下分块时，精确检索比 HNSW + where 后过滤更快且召回稳定（始终为100%）。
+
+返回的距离与ChromaDB l2空间的定义一致（平方欧氏距离），上层打分逻辑无需区分来源。
+镜像是进程级的：启动后从集合全量构建，之后由 VectorStore 的增删改钩子保持同步。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+
+from app.core.logging import log_performance
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
+logger = logging.getLogger(__name__)
+
+# 字符串列按字典编码为整数，数值列直接存储
+_STRING_COLUMNS = ("provider", "category", "filename")
+_INT_COLUMNS = ("document_id", "chunk_index")
+
+# 分块计算距离时每块的行数，限制float16转换等临时内存
+_SEARCH_BLOCK_ROWS = 65536
+
+# 逻辑删除的行超过该比例时压缩矩阵
+_COMPACT_RATIO = 0.25
+
+
+def _to_int(value: Any) -> int:
+    """数值列取值（缺失或无法解析时为-1）"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class ExactVectorIndex:
+    """基于NumPy的精确向量索引（线程安全）"""
+
+    def __init__(self, directory: str, dimension: int, dtype: str = "float32", initial_capacity: int = 4096) -> None:
+        """
+        初始化索引
+
+        Args:
+            directory: 内存映射文件所在目录
+            dimension: 向量维度
+            dtype: 矩阵存储精度 (float32/float16)
+            initial_capacity: 初始行容量（不足时按倍数扩容）
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+
+        self.directory = directory
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self._initial_capacity = max(1, initial_capacity)
+
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._building = False
+        self._deleted_during_build: set[int] = set()
+
+        self._reset_storage()
+
+        self.searches = 0
+        self._total_search_ms = 0.0
+
+    def _reset_storage(self) -> None:
+        """清空矩阵和元数据列（需持有锁或在初始化时调用）"""
+        self._capacity = 0
+        self._rows = 0
+        self._matrix = self._allocate(self._initial_capacity)
+        self._norms = np.zeros(self._capacity, dtype=np.float32)
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._int_columns = {name: np.full(self._capacity, -1, dtype=np.int64) for name in _INT_COLUMNS}
+        self._code_columns = {name: np.full(self._capacity, -1, dtype=np.int32) for name in _STRING_COLUMNS}
+        self._dictionaries: dict[str, dict[str, int]] = {name: {} for name in _STRING_COLUMNS}
+        self._ids: list[Optional[str]] = []
+        self._row_of: dict[str, int] = {}
+        self._tombstones = 0
+
+    def _allocate(self, capacity: int) -> np.memmap:
+        """
+        分配指定容量的内存映射矩阵
+
+        映射文件创建后立即删除目录项，进程退出时由内核回收；
+        各工作进程各自持有镜像，互不干扰
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"exact-{os.getpid()}-", suffix=".bin", dir=self.directory)
+        try:
+            os.ftruncate(fd, capacity * self.dimension * self.dtype.itemsize)
+            matrix = np.memmap(path, dtype=self.dtype, mode="r+", shape=(capacity, self.dimension))
+        finally:
+            os.close(fd)
+            os.unlink(path)
+        self._capacity = capacity
+        return matrix
+
+    def _grow(self, required: int) -> None:
+        """扩容到至少 required 行（需持有锁）"""
+        if required <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= 2
+
+        old_matrix, rows = self._matrix, self._rows
+        matrix = self._allocate(capacity)
+        matrix[:rows] = old_matrix[:rows]
+        self._matrix = matrix
+
+        def extend(array: np.ndarray, fill: Any) -> np.ndarray:
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:rows] = array[:rows]
+            return grown
+
+        self._norms = extend(self._norms, 0.0)
+        self._alive = extend(self._alive, False)
+        self._int_columns = {name: extend(column, -1) for name, column in self._int_columns.items()}
+        self._code_columns = {name: extend(column, -1) for name, column in self._code_columns.items()}
+
+    def _encode_value(self, column: str, value: Any) -> int:
+        """字符串值字典编码（需持有锁）"""
+        dictionary = self._dictionaries[column]
+        text = "" if value is None else str(value)
+        code = dictionary.get(text)
+        if code is None:
+            code = dictionary[text] = len(dictionary)
+        return code
+
+    def is_ready(self) -> bool:
+        """索引是否已完成全量构建"""
+        return self._ready.is_set()
+
+    def __len__(self) -> int:
+        return self._rows - self._tombstones
+
+    def add(self, ids: list[str], embeddings: Any, metadatas: list[dict[str, Any]]) -> None:
+        """
+        写入分块向量（ID已存在时覆盖旧行）
+
+        Args:
+            ids: 分块ID
+            embeddings: 与ids对应的向量
+            metadatas: 与ids对应的分块元数据
+        """
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dimension)
+
+        with self._lock:
+            self._remove_rows([self._row_of[chunk_id] for chunk_id in ids if chunk_id in self._row_of])
+            self._grow(self._rows + len(ids))
+
+            start, end = self._rows, self._rows + len(ids)
+            self._matrix[start:end] = vectors
+            self._norms[start:end] = np.einsum("ij,ij->i", vectors, vectors)
+            for name in _INT_COLUMNS:
+                self._int_columns[name][start:end] = [_to_int(meta.get(name)) for meta in metadatas]
+            for name in _STRING_COLUMNS:
+                self._code_columns[name][start:end] = [self._encode_value(name, meta.get(name)) for meta in metadatas]
+
+            for offset, chunk_id in enumerate(ids):
+                self._row_of[chunk_id] = start + offset
+            self._ids.extend(ids)
+            # 最后再标记为有效，并发检索不会看到写了一半的行
+            self._alive[start:end] = True
+            self._rows = end
+
+    def _remove_rows(self, rows: list[int]) -> None:
+        """逻辑删除指定行（需持有锁）"""
+        if not rows:
+            return
+        self._alive[rows] = False
+        for row in rows:
+            chunk_id = self._ids[row]
+            if chunk_id is not None:
+                self._row_of.pop(chunk_id, None)
+                self._ids[row] = None
+        self._tombstones += len(rows)
+
+    def remove_ids(self, ids: list[str]) -> int:
+        """按分块ID删除，返回删除的行数"""
+        with self._lock:
+            rows = [self._row_of[chunk_id] for chunk_id in ids if chunk_id in self._row_of]
+            self._remove_rows(rows)
+            self._maybe_compact()
+            return len(rows)
+
+    def remove_document(self, document_id: int) -> int:
+        """删除文档的所有分块，返回删除的行数"""
+        with self._lock:
+            if self._building:
+                self._deleted_during_build.add(document_id)
+            rows = self._int_columns["document_id"][:self._rows] == document_id
+            rows &= self._alive[:self._rows]
+            removed = np.flatnonzero(rows).tolist()
+            self._remove_rows(removed)
+            self._maybe_compact()
+            return len(removed)
+
+    def clear(self) -> None:
+        """清空索引（集合重置时调用）"""
+        with self._lock:
+            self._reset_storage()
+
+    def _maybe_compact(self) -> None:
+        """逻辑删除行过多时重写矩阵，回收空间（需持有锁）"""
+        if self._rows == 0 or self._tombstones / self._rows < _COMPACT_RATIO:
+            return
+
+        keep = np.flatnonzero(self._alive[:self._rows])
+        capacity = max(self._initial_capacity, len(keep) * 2)
+        matrix = self._allocate(capacity)
+        matrix[:len(keep)] = self._matrix[keep]
+
+        def compact(array: np.ndarray, fill: Any) -> np.ndarray:
+            compacted = np.full(capacity, fill, dtype=array.dtype)
+            compacted[:len(keep)] = array[keep]
+            return compacted
+
+        self._matrix = matrix
+        self._norms = compact(self._norms, 0.0)
+        self._alive = compact(self._alive, False)
+        self._int_columns = {name: compact(column, -1) for name, column in self._int_columns.items()}
+        self._code_columns = {name: compact(column, -1) for name, column in self._code_columns.items()}
+        self._ids = [self._ids[row] for row in keep]
+        self._row_of = {chunk_id: row for row, chunk_id in enumerate(self._ids) if chunk_id is not None}
+        self._rows = len(keep)
+        self._tombstones = 0
+        logger.info(f"Exact index compacted to {self._rows} rows")
+
+    def supports_filter(self, filter_criteria: Optional[dict[str, Any]]) -> bool:
+        """过滤条件是否都能由元数据列表达"""
+        if not filter_criteria:
+            return True
+        return all(key in _STRING_COLUMNS or key in _INT_COLUMNS for key in filter_criteria)
+
+    def _build_mask(self, rows: int, filter_criteria: Optional[dict[str, Any]]) -> np.ndarray:
+        """将过滤条件转换为布尔掩码（需持有锁）"""
+        mask = self._alive[:rows].copy()
+        for key, value in (filter_criteria or {}).items():
+            if value is None:
+                continue
+            if key in _INT_COLUMNS:
+                mask &= self._int_columns[key][:rows] == int(value)
+            else:
+                code = self._dictionaries[key].get(str(value))
+                if code is None:
+                    mask[:] = False
+                    break
+                mask &= self._code_columns[key][:rows] == code
+        return mask
+
+    def search(
+        self, query_embedding: Any, limit: int, filter_criteria: Optional[dict[str, Any]] = None
+    ) -> list[tuple[str, float]]:
+        """
+        精确检索最近的分块
+
+        Args:
+            query_embedding: 查询向量
+            limit: 返回结果数量
+            filter_criteria: 元数据等值过滤条件
+
+        Returns:
+            按距离升序排列的 (分块ID, 平方欧氏距离) 列表
+        """
+        start_time = time.perf_counter()
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(self.dimension)
+
+        # 在锁内取得当前快照；矩阵只追加写入，锁外计算不会读到不完整的行
+        with self._lock:
+            rows = self._rows
+            matrix, norms = self._matrix, self._norms
+            mask = self._build_mask(rows, filter_criteria)
+            ids = self._ids
+
+        candidates = np.flatnonzero(mask)
+        if limit <= 0 or len(candidates) == 0:
+            return []
+
+        # 距离 = |x|² + |q|² - 2·x·q；未过滤时按连续块计算，过滤后只计算候选行
+        dots = np.empty(len(candidates), dtype=np.float32)
+        contiguous = len(candidates) == rows
+        for offset in range(0, len(candidates), _SEARCH_BLOCK_ROWS):
+            block_rows = candidates[offset:offset + _SEARCH_BLOCK_ROWS]
+            if contiguous:
+                block = matrix[offset:offset + len(block_rows)]
+            else:
+                block = matrix[block_rows]
+            dots[offset:offset + len(block_rows)] = np.asarray(block, dtype=np.float32) @ query
+
+        distances = norms[candidates] + float(query @ query) - 2.0 * dots
+        np.maximum(distances, 0.0, out=distances)
+
+        k = min(limit, len(candidates))
+        top = np.argpartition(distances, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(distances[top], kind="stable")]
+
+        results = []
+        for position in top:
+            chunk_id = ids[candidates[position]]
+            if chunk_id is not None:
+                results.append((chunk_id, float(distances[position])))
+
+        self.searches += 1
+        self._total_search_ms += (time.perf_counter() - start_time) * 1000
+        return results
+
+    def build_from_collection(self, collection: "Collection", page_size: int = 5000) -> None:
+        """
+        从ChromaDB集合全量构建镜像
+
+        构建期间的增删改钩子照常生效：已写入的ID会被覆盖，构建期间删除的文档不会被旧分页重新写入
+        """
+        start_time = time.time()
+        with self._lock:
+            self._ready.clear()
+            self._reset_storage()
+            self._building = True
+            self._deleted_during_build = set()
+
+        try:
+            offset = 0
+            while True:
+                page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+                page_ids = page["ids"] or []
+                if not page_ids:
+                    break
+                offset += len(page_ids)
+
+                embeddings = page["embeddings"]
+                metadatas = [dict(meta or {}) for meta in (page["metadatas"] or [{}] * len(page_ids))]
+                with self._lock:
+                    keep = [
+                        i for i, (chunk_id, meta) in enumerate(zip(page_ids, metadatas))
+                        if chunk_id not in self._row_of and meta.get("document_id") not in self._deleted_during_build
+                    ]
+                    if keep:
+                        self.add(
+                            [page_ids[i] for i in keep],
+                            np.asarray(embeddings, dtype=np.float32)[keep],
+                            [metadatas[i] for i in keep],
+                        )
+        finally:
+            with self._lock:
+                self._building = False
+                self._deleted_during_build = set()
+
+        self._ready.set()
+        log_performance("exact_index_build", time.time() - start_time, rows=len(self), dtype=self.dtype.name)
+        logger.info(f"Exact index built with {len(self)} chunks")
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取索引统计信息"""
+        return {
+            'ready': self.is_ready(),
+            'chunks': len(self),
+            'tombstones': self._tombstones,
+            'capacity': self._capacity,
+            'dimension': self.dimension,
+            'dtype': self.dtype.name,
+            'matrix_bytes': self._capacity * self.dimension * self.dtype.itemsize,
+            'searches': self.searches,
+            'avg_search_ms': round(self._total_search_ms / self.searches, 3) if self.searches else 0.0,
+        }
@@ -0,0 +1,100 @@
+"""
+检索结果分组
+
+问答和推荐需要的是若干个不同的文档，而不是若干个分块。一篇长文档的多个分块可能占满前N个结果，
+去重后来源数量不足。分组检索按元数据字段（默认 document_id）将分块归组，每组保留分数最高的
+per_group 个分块，组分数由组内命中分块的分数聚合得到:
+- max: 组内最高分（与只看最相关分块的去重结果一致）
+- sum: 分数之和，偏向有多个分块命中的文档
+- mean: 平均分
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+AGGREGATIONS = ("max", "sum", "mean")
+
+
+@dataclass(frozen=True)
+class GroupSpec:
+    """分组检索参数"""
+
+    group_by: str = "document_id"
+    per_group: int = 1
+    aggregation: str = "max"
+
+    def __post_init__(self) -> None:
+        if self.per_group < 1:
+            raise ValueError(f"per_group must be positive: {self.per_group}")
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unsupported group aggregation: {self.aggregation}")
+
+    def cache_key(self) -> tuple[str, int, str]:
+        """用于检索结果缓存键"""
+        return (self.group_by, self.per_group, self.aggregation)
+
+
+def group_key(result: dict[str, Any], spec: GroupSpec) -> Any:
+    """分块所属的组（缺少分组字段时每个分块单独成组）"""
+    metadata = result.get('metadata') if isinstance(result.get('metadata'), dict) else {}
+    return metadata.get(spec.group_by, result['id'])
+
+
+def aggregate_groups(results: list[dict[str, Any]], spec: GroupSpec) -> list[dict[str, Any]]:
+    """
+    将按分数降序排列的分块结果分组
+
+    Args:
+        results: 分块检索结果（需包含 metadata 和 score）
+        spec: 分组参数
+
+    Returns:
+        按组分数降序排列的分组列表，每组包含 key、score、matched（组内命中分块数）和 hits（前per_group个分块）
+    """
+    groups: dict[Any, dict[str, Any]] = {}
+    for result in results:
+        key = group_key(result, spec)
+        group = groups.setdefault(key, {'key': key, 'scores': [], 'hits': []})
+        group['scores'].append(result['score'])
+        if len(group['hits']) < spec.per_group:
+            group['hits'].append(result)
+
+    grouped = []
+    for group in groups.values():
+        scores = group.pop('scores')
+        if spec.aggregation == "sum":
+            group['score'] = sum(scores)
+        elif spec.aggregation == "mean":
+            group['score'] = sum(scores) / len(scores)
+        else:
+            group['score'] = max(scores)
+        group['matched'] = len(scores)
+        grouped.append(group)
+
+    grouped.sort(key=lambda group: group['score'], reverse=True)
+    return grouped
+
+
+def flatten_groups(grouped: list[dict[str, Any]], limit: int) -> list[dict[str, Any]]:
+    """取前limit个组，按组顺序展开为分块结果，每个分块附带 group_score"""
+    return [{**hit, 'group_score': group['score']} for group in grouped[:limit] for hit in group['hits']]
+
+
+def take_groups(results: list[dict[str, Any]], spec: GroupSpec, limit: int) -> list[dict[str, Any]]:
+    """
+    保持结果原有顺序截取前limit个组（用于重排之后，组的顺序由其排名最高的分块决定）
+
+    每组最多保留per_group个分块，同组分块按原顺序排在一起
+    """
+    order: list[Any] = []
+    hits: dict[Any, list[dict[str, Any]]] = {}
+    for result in results:
+        key = group_key(result, spec)
+        if key not in hits:
+            if len(order) >= limit:
+                continue
+            order.append(key)
+            hits[key] = []
+        if len(hits[key]) < spec.per_group:
+            hits[key].append(result)
+    return [hit for key in order for hit in hits[key]]
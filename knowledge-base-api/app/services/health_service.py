@@ -4,16 +4,17 @@
 
 import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 from app.core.config import get_settings
+from app.services.model_registry import get_model_registry
 from app.services.vector_store import VectorStore
 
 
 class HealthService:
     """系统健康检查聚合服务"""
 
-    def __init__(self, vector_store: VectorStore):
+    def __init__(self, vector_store: Optional[VectorStore]):
         self.vector_store = vector_store
         self.settings = get_settings()
 
@@ -45,6 +46,7 @@ class HealthService:
         return {
             "status": "healthy" if (vector_status and model_status) else "degraded",
             "timestamp": time.time(),
+            "readiness": get_model_registry().get_readiness(),
             "components": {
                 "vector_store": {"status": "healthy" if vector_status else "unhealthy"},
                 "embedding_model": {"status": "healthy" if model_status else "unhealthy"},
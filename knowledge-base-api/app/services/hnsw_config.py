@@ -0,0 +1,121 @@
+"""
+ChromaDB集合的HNSW参数
+
+构建参数（space、M、ef_construction）只在创建集合时生效，之后无法修改；
+检索参数 ef_search 以及写入批量参数 batch_size、sync_threshold 来自配置，可以按集合单独覆盖:
+- knowledge_base: 全局集合
+- partition: 按 (provider, category) 划分的分区集合（见 partitioned_index）
+
+配置值为None时使用ChromaDB默认值。已存在集合的 ef_search 在启动时（索引加载之前）按配置调整，
+构建参数与配置不一致时只记录警告，需要重建集合才能生效。
+参数选择可参考 scripts/benchmark_hnsw.py 输出的 recall@k 与 p50/p99 延迟
+"""
+
+import logging
+from typing import TYPE_CHECKING, Any, Optional
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 参数名 -> ChromaDB集合元数据键
+_METADATA_KEYS = {
+    "space": "hnsw:space",
+    "M": "hnsw:M",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+    "batch_size": "hnsw:batch_size",
+    "sync_threshold": "hnsw:sync_threshold",
+}
+
+# 创建后不可修改的构建参数
+_BUILD_PARAMS = ("space", "M", "ef_construction")
+
+SPACES = ("l2", "cosine", "ip")
+
+
+def resolve_hnsw_params(role: str) -> dict[str, Any]:
+    """
+    合并全局HNSW配置和指定集合角色的覆盖项
+
+    Args:
+        role: 集合角色 (knowledge_base / partition)
+
+    Returns:
+        参数名到取值的映射（未配置的参数不出现）
+    """
+    params: dict[str, Any] = {
+        "space": settings.HNSW_SPACE,
+        "M": settings.HNSW_M,
+        "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+        "ef_search": settings.HNSW_EF_SEARCH,
+        "batch_size": settings.HNSW_BATCH_SIZE,
+        "sync_threshold": settings.HNSW_SYNC_THRESHOLD,
+    }
+    overrides = settings.HNSW_COLLECTION_OVERRIDES.get(role, {})
+    unknown = set(overrides) - set(_METADATA_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown HNSW parameters for '{role}': {sorted(unknown)}")
+    params.update(overrides)
+
+    if params["space"] not in SPACES:
+        raise ValueError(f"Unsupported HNSW space: {params['space']}")
+    return {name: value for name, value in params.items() if value is not None}
+
+
+def hnsw_metadata(role: str, params: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """生成创建集合时使用的 hnsw:* 元数据"""
+    params = resolve_hnsw_params(role) if params is None else params
+    return {_METADATA_KEYS[name]: value for name, value in params.items()}
+
+
+def collection_space(collection: "Collection") -> str:
+    """集合实际使用的距离空间（以创建时的元数据为准）"""
+    return str((collection.metadata or {}).get(_METADATA_KEYS["space"], "l2"))
+
+
+def apply_search_params(collection: "Collection", role: str) -> None:
+    """
+    将可在线调整的检索参数应用到已存在的集合
+
+    构建参数与配置不一致时记录警告（需要重建集合）
+    """
+    params = resolve_hnsw_params(role)
+    metadata = collection.metadata or {}
+    built_with = {name: metadata.get(_METADATA_KEYS[name]) for name in _BUILD_PARAMS}
+    built_with["space"] = built_with["space"] or "l2"
+    mismatched = [
+        name
+        for name in _BUILD_PARAMS
+        if name in params and built_with[name] is not None and built_with[name] != params[name]
+    ]
+    if mismatched:
+        logger.warning(
+            f"Collection '{collection.name}' was built with different HNSW parameters {mismatched}; "
+            f"rebuild the collection to apply the configured values"
+        )
+
+    ef_search = params.get("ef_search")
+    if ef_search is None:
+        return
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": ef_search}})  # type: ignore[arg-type]
+        logger.info(f"Collection '{collection.name}' ef_search set to {ef_search}")
+    except Exception as e:
+        logger.warning(f"Could not update ef_search of collection '{collection.name}': {str(e)}")
+
+
+def distance_to_squared_l2(distance: float, space: str) -> float:
+    """
+    将集合返回的距离换算为平方L2距离
+
+    相似度分数公式按平方L2距离标定。嵌入向量是归一化的，cosine 距离 1 - cos
+    与 ip 距离 1 - dot 都等于平方L2距离的一半
+    """
+    if space == "l2":
+        return distance
+    return 2.0 * distance
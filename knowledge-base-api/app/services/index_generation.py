@@ -0,0 +1,52 @@
+"""
+索引代数计数器
+
+知识库集合每次写入（添加、删除、更新文档或重置集合）后递增代数，缓存以代数作为键的一部分，
+代数变化后旧条目自然失效，无需TTL。
+
+计数器存放在SQLite中而不是进程内存里，多工作进程部署以及 scripts/ 下的离线脚本
+写入集合后，所有进程读取到的都是同一个代数
+"""
+
+import logging
+from typing import Any
+
+from sqlalchemy import Engine, text
+
+logger = logging.getLogger(__name__)
+
+
+class IndexGeneration:
+    """基于SQLite单行表的单调递增计数器"""
+
+    TABLE = "index_generation"
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.bumps = 0
+        self.ensure_schema()
+
+    def ensure_schema(self) -> None:
+        """创建计数器表并写入初始行（已存在时跳过）"""
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(f"CREATE TABLE IF NOT EXISTS {self.TABLE} (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)")
+            )
+            connection.execute(text(f"INSERT OR IGNORE INTO {self.TABLE} (id, value) VALUES (1, 0)"))
+
+    def current(self) -> int:
+        """读取当前代数"""
+        with self.engine.connect() as connection:
+            return int(connection.execute(text(f"SELECT value FROM {self.TABLE} WHERE id = 1")).scalar() or 0)
+
+    def bump(self) -> int:
+        """递增代数（应在写入完成之后调用），返回新代数"""
+        with self.engine.begin() as connection:
+            connection.execute(text(f"UPDATE {self.TABLE} SET value = value + 1 WHERE id = 1"))
+            value = int(connection.execute(text(f"SELECT value FROM {self.TABLE} WHERE id = 1")).scalar() or 0)
+        self.bumps += 1
+        return value
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取计数器统计信息"""
+        return {'generation': self.current(), 'local_bumps': self.bumps}
@@ -0,0 +1,603 @@
+"""
+文档入库任务队列
+
+上传接口只负责把文件写入磁盘并登记任务，解析、分块、嵌入和写入索引由后台工作者异步完成，
+一个几百页的PDF不再占用HTTP连接数分钟。
+
+任务保存在SQLite的 ingest_jobs 表中（进程重启不丢失），工作者以租约方式领取任务:
+- 多个工作者（API进程内的工作者、run_ingest_worker.py 启动的独立进程）可以同时领取，
+  领取是一条原子UPDATE，同一任务只会被一个工作者持有
+- 工作者处理期间定期续约；进程崩溃后租约过期，任务被其他工作者重新领取
+- 失败的任务按指数退避重试，超过最大次数后执行补偿清理（删除已写入的向量、文档记录和文件）
+
+任务进度按阶段推进: received -> parsed -> chunked -> embedded -> indexed，
+嵌入阶段按批更新已嵌入的分块数。每次重试都从解析重新开始，已嵌入过的分块命中分块向量缓存，
+重试的主要开销只是解析
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import Engine, text
+
+from app.core.config import get_settings
+from app.core.executors import get_executor_pools
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+# 处理阶段（按顺序）
+STAGES = ("received", "parsed", "chunked", "embedded", "indexed")
+
+
+class JobLeaseLostError(RuntimeError):
+    """任务租约已过期并被其他工作者领取"""
+
+
+class PermanentJobError(RuntimeError):
+    """重试无法恢复的错误（如上传文件已不存在）"""
+
+
+def retry_delay(attempts: int) -> float:
+    """第attempts次失败后的重试等待时间（指数退避，带随机抖动避免同时重试）"""
+    delay = min(settings.INGEST_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), settings.INGEST_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class IngestJobQueue:
+    """基于SQLite的持久化入库任务队列"""
+
+    TABLE = "ingest_jobs"
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.ensure_schema()
+
+    def ensure_schema(self) -> None:
+        """创建任务表和领取任务使用的索引（已存在时跳过）"""
+        with self.engine.begin() as connection:
+            connection.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    document_id INTEGER,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    next_run_at REAL NOT NULL,
+                    locked_by TEXT,
+                    lease_expires_at REAL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """))
+            connection.execute(
+                text(f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE}_status_next_run ON {self.TABLE} (status, next_run_at)")
+            )
+
+    def enqueue(self, file_path: str, params: dict[str, Any]) -> str:
+        """
+        登记入库任务
+
+        Args:
+            file_path: 已写入磁盘的上传文件路径
+            params: 文档参数（title、provider、category、filename）
+
+        Returns:
+            任务ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(f"""
+                    INSERT INTO {self.TABLE}
+                        (id, status, stage, file_path, params, max_attempts, next_run_at, created_at, updated_at)
+                    VALUES (:id, :status, :stage, :file_path, :params, :max_attempts, :now, :now, :now)
+                """),
+                {
+                    'id': job_id,
+                    'status': STATUS_QUEUED,
+                    'stage': STAGES[0],
+                    'file_path': file_path,
+                    'params': json.dumps(params, ensure_ascii=False),
+                    'max_attempts': max(1, settings.INGEST_JOB_MAX_ATTEMPTS),
+                    'now': now,
+                },
+            )
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict[str, Any]]:
+        """
+        领取一个到期的排队任务，或租约已过期的运行中任务（原持有者已崩溃）
+
+        Returns:
+            任务信息，没有可领取的任务时返回None
+        """
+        now = time.time()
+        with self.engine.begin() as connection:
+            row = connection.execute(
+                text(f"""
+                    UPDATE {self.TABLE}
+                    SET status = :running, stage = :stage, attempts = attempts + 1, chunks_embedded = 0,
+                        locked_by = :worker_id, lease_expires_at = :lease_expires_at, updated_at = :now
+                    WHERE id = (
+                        SELECT id FROM {self.TABLE}
+                        WHERE (status = :queued AND next_run_at <= :now)
+                           OR (status = :running AND lease_expires_at < :now)
+                        ORDER BY next_run_at
+                        LIMIT 1
+                    )
+                    RETURNING id, file_path, params, document_id, attempts, max_attempts
+                """),
+                {
+                    'running': STATUS_RUNNING,
+                    'queued': STATUS_QUEUED,
+                    'stage': STAGES[0],
+                    'worker_id': worker_id,
+                    'lease_expires_at': now + lease_seconds,
+                    'now': now,
+                },
+            ).mappings().first()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def _update_owned(self, job_id: str, worker_id: str, assignments: str, values: dict[str, Any]) -> None:
+        """更新当前工作者持有的任务，租约已被他人接管时抛出 JobLeaseLostError"""
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                text(f"""
+                    UPDATE {self.TABLE} SET {assignments}, updated_at = :now
+                    WHERE id = :id AND locked_by = :worker_id AND status = :running
+                """),
+                {**values, 'id': job_id, 'worker_id': worker_id, 'running': STATUS_RUNNING, 'now': time.time()},
+            )
+        if result.rowcount == 0:
+            raise JobLeaseLostError(f"Lease on ingest job {job_id} was lost")
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> None:
+        """续约"""
+        self._update_owned(
+            job_id, worker_id, "lease_expires_at = :lease_expires_at", {'lease_expires_at': time.time() + lease_seconds}
+        )
+
+    def update_progress(self, job_id: str, worker_id: str, stage: str, **progress: Any) -> None:
+        """推进处理阶段并更新进度字段（document_id、chunks_total、chunks_embedded）"""
+        allowed = {'document_id', 'chunks_total', 'chunks_embedded'}
+        unknown = set(progress) - allowed
+        if unknown:
+            raise ValueError(f"Unknown ingest job fields: {sorted(unknown)}")
+        assignments = ", ".join(["stage = :stage"] + [f"{name} = :{name}" for name in progress])
+        self._update_owned(job_id, worker_id, assignments, {'stage': stage, **progress})
+
+    def complete(self, job_id: str, worker_id: str) -> None:
+        """标记任务成功"""
+        self._update_owned(
+            job_id,
+            worker_id,
+            "status = :succeeded, stage = :stage, locked_by = NULL, lease_expires_at = NULL, error = NULL, finished_at = :finished_at",
+            {'succeeded': STATUS_SUCCEEDED, 'stage': STAGES[-1], 'finished_at': time.time()},
+        )
+
+    def retry(self, job_id: str, worker_id: str, error: str, delay: float) -> None:
+        """释放任务，在delay秒后重新排队"""
+        self._update_owned(
+            job_id,
+            worker_id,
+            "status = :queued, next_run_at = :next_run_at, locked_by = NULL, lease_expires_at = NULL, error = :error",
+            {'queued': STATUS_QUEUED, 'next_run_at': time.time() + delay, 'error': error},
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> None:
+        """标记任务最终失败"""
+        self._update_owned(
+            job_id,
+            worker_id,
+            "status = :failed, locked_by = NULL, lease_expires_at = NULL, error = :error, finished_at = :finished_at",
+            {'failed': STATUS_FAILED, 'error': error, 'finished_at': time.time()},
+        )
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """查询任务状态和进度"""
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                text(f"SELECT * FROM {self.TABLE} WHERE id = :id"), {'id': job_id}
+            ).mappings().first()
+        if row is None:
+            return None
+
+        job = dict(row)
+        params = json.loads(job.pop('params'))
+        reached = STAGES.index(job['stage']) if job['stage'] in STAGES else 0
+        if job['status'] == STATUS_SUCCEEDED:
+            reached = len(STAGES) - 1
+        return {
+            'job_id': job['id'],
+            'status': job['status'],
+            'stage': job['stage'],
+            'progress': {
+                stage: index <= reached for index, stage in enumerate(STAGES) if index > 0
+            },
+            'chunks_total': job['chunks_total'],
+            'chunks_embedded': job['chunks_embedded'],
+            'document_id': job['document_id'],
+            'filename': params.get('filename'),
+            'title': params.get('title'),
+            'provider': params.get('provider'),
+            'category': params.get('category'),
+            'attempts': job['attempts'],
+            'max_attempts': job['max_attempts'],
+            'next_run_at': job['next_run_at'] if job['status'] == STATUS_QUEUED else None,
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at'],
+            'finished_at': job['finished_at'],
+        }
+
+    def active_file_paths(self) -> list[str]:
+        """排队中和处理中任务的文件路径（重建索引时跳过这些文件）"""
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text(f"SELECT DISTINCT file_path FROM {self.TABLE} WHERE status IN (:queued, :running)"),
+                {'queued': STATUS_QUEUED, 'running': STATUS_RUNNING},
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_stats(self) -> dict[str, Any]:
+        """各状态任务数和最早排队任务的等待时间"""
+        with self.engine.connect() as connection:
+            counts = dict(
+                connection.execute(text(f"SELECT status, COUNT(*) FROM {self.TABLE} GROUP BY status")).fetchall()
+            )
+            oldest = connection.execute(
+                text(f"SELECT MIN(created_at) FROM {self.TABLE} WHERE status = :queued"), {'queued': STATUS_QUEUED}
+            ).scalar()
+        return {
+            **{status: int(counts.get(status, 0)) for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED, STATUS_FAILED)},
+            'oldest_queued_seconds': round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+
+def _save_document(file_path: str, processed_doc: dict[str, Any], params: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+    """写入文档记录，返回 (文档ID, 向量元数据)"""
+    from app.core.database import get_db_context
+    from app.services.document_records import build_vector_metadata, upsert_document_record
+
+    with get_db_context() as db:
+        document = upsert_document_record(
+            db,
+            file_path,
+            processed_doc,
+            title=params.get('title'),
+            provider=params.get('provider'),
+            category=params.get('category'),
+            filename=params.get('filename'),
+        )
+        return document.id, build_vector_metadata(document)
+
+
+def _mark_document_indexed(document_id: int) -> None:
+    """更新索引状态（搜索基于向量存储，因此两个索引状态一致）"""
+    from app.core.database import get_db_context
+    from app.models.document import Document
+
+    with get_db_context() as db:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is not None:
+            document.vector_indexed = True
+            document.search_indexed = True
+
+
+def _discard_document(document_id: Optional[int], file_path: str) -> None:
+    """删除文档记录和文件（新上传的文档任务最终失败时回滚上传）"""
+    from app.core.database import get_db_context
+    from app.models.document import Document
+
+    if document_id is not None:
+        with get_db_context() as db:
+            document = db.query(Document).filter(Document.id == document_id).first()
+            if document is not None:
+                db.delete(document)
+    path = Path(file_path)
+    if path.exists():
+        path.unlink()
+
+
+class IngestWorker:
+    """
+    入库任务工作者
+
+    在事件循环中同时处理多个任务，各阶段的并发数分别受限:
+    - parse: 解析和分块（CPU进程池）
+    - embed: 嵌入（推理池，同一时间只有少量文档的分块在编码，避免大文档饿死查询编码）
+    - index: 写入ChromaDB和SQLite（I/O池）
+    """
+
+    def __init__(self, queue: IngestJobQueue, worker_id: Optional[str] = None, concurrency: Optional[int] = None) -> None:
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = max(1, concurrency or settings.INGEST_WORKER_CONCURRENCY)
+        self.stage_limits = {
+            'parse': max(1, settings.INGEST_PARSE_CONCURRENCY),
+            'embed': max(1, settings.INGEST_EMBED_CONCURRENCY),
+            'index': max(1, settings.INGEST_INDEX_CONCURRENCY),
+        }
+        self._stage_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._stage_active = {stage: 0 for stage in self.stage_limits}
+        self._wakeup = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.active_jobs = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.lost_leases = 0
+
+    def notify(self) -> None:
+        """有新任务时唤醒工作者（同一事件循环内调用）"""
+        self._wakeup.set()
+
+    def start(self) -> asyncio.Task:
+        """在当前事件循环中启动工作者"""
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(), name="ingest-worker")
+        return self._task
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        停止领取新任务并等待处理中的任务结束
+
+        超时后取消仍在处理的任务，它们的租约到期后由下一个工作者重新领取
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Ingest worker {self.worker_id} stopped with jobs in progress")
+            self._task = None
+
+    async def run(self) -> None:
+        """领取并处理任务，直到 stop 被调用"""
+        from app.services.model_registry import get_model_registry
+
+        self._stage_semaphores = {stage: asyncio.Semaphore(limit) for stage, limit in self.stage_limits.items()}
+        slots = asyncio.Semaphore(self.concurrency)
+        running: set[asyncio.Task] = set()
+        poll_interval = settings.INGEST_POLL_INTERVAL_SECONDS
+
+        # 嵌入模型就绪后才开始领取任务，启动期间上传的任务保持排队
+        registry = get_model_registry()
+        while not registry.is_ready() and not self._stop.is_set():
+            await self._sleep(poll_interval)
+        logger.info(f"Ingest worker {self.worker_id} started (concurrency {self.concurrency}, stages {self.stage_limits})")
+
+        while not self._stop.is_set():
+            await slots.acquire()
+            try:
+                job = await get_executor_pools().io.run(
+                    self.queue.claim, self.worker_id, settings.INGEST_JOB_LEASE_SECONDS
+                )
+            except Exception as e:
+                logger.error(f"Failed to claim ingest job: {str(e)}")
+                job = None
+            if job is None:
+                slots.release()
+                await self._sleep(poll_interval)
+                continue
+
+            task = asyncio.create_task(self._run_job(job))
+            running.add(task)
+
+            def _finished(done: asyncio.Task) -> None:
+                running.discard(done)
+                slots.release()
+
+            task.add_done_callback(_finished)
+
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        logger.info(f"Ingest worker {self.worker_id} stopped")
+
+    async def _sleep(self, seconds: float) -> None:
+        """等待一段时间，有新任务或停止时提前返回"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """处理期间定期续约"""
+        lease_seconds = settings.INGEST_JOB_LEASE_SECONDS
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            try:
+                await get_executor_pools().io.run(self.queue.heartbeat, job_id, self.worker_id, lease_seconds)
+            except JobLeaseLostError:
+                # 处理流程在下一次更新进度时同样会发现租约丢失并放弃任务
+                return
+            except Exception as e:
+                logger.warning(f"Failed to renew lease of ingest job {job_id}: {str(e)}")
+
+    async def _stage(self, stage: str, fn: Any, *args: Any) -> Any:
+        """在阶段并发限制内执行协程函数"""
+        async with self._stage_semaphores[stage]:
+            self._stage_active[stage] += 1
+            try:
+                return await fn(*args)
+            finally:
+                self._stage_active[stage] -= 1
+
+    async def _progress(self, job_id: str, stage: str, **progress: Any) -> None:
+        await get_executor_pools().io.run(self.queue.update_progress, job_id, self.worker_id, stage, **progress)
+
+    async def _run_job(self, job: dict[str, Any]) -> None:
+        """处理单个任务并记录结果（成功、重试或最终失败）"""
+        job_id = job['id']
+        io = get_executor_pools().io
+        state: dict[str, Any] = {'document_id': job['document_id'], 'indexing': False}
+        self.active_jobs += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            if job['attempts'] > job['max_attempts']:
+                # 最后一次尝试的工作者崩溃后租约过期被重新领取
+                raise PermanentJobError("Worker lost during final attempt")
+            await self._process(job, state)
+            await io.run(self.queue.complete, job_id, self.worker_id)
+            self.succeeded += 1
+            logger.info(f"Ingest job {job_id} finished, document {state['document_id']} indexed")
+
+        except JobLeaseLostError:
+            # 其他工作者已接管任务，由其负责后续处理
+            self.lost_leases += 1
+            logger.warning(f"Ingest job {job_id} was taken over by another worker")
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            final = isinstance(e, PermanentJobError) or job['attempts'] >= job['max_attempts']
+            logger.error(f"Ingest job {job_id} attempt {job['attempts']} failed: {error}")
+            try:
+                await self._cleanup(job, state, final)
+                if final:
+                    await io.run(self.queue.fail, job_id, self.worker_id, error)
+                    self.failed += 1
+                else:
+                    await io.run(self.queue.retry, job_id, self.worker_id, error, retry_delay(job['attempts']))
+                    self.retried += 1
+            except JobLeaseLostError:
+                self.lost_leases += 1
+            except Exception as cleanup_error:
+                # 保持租约到期，由下一个工作者重新领取
+                logger.error(f"Failed to record failure of ingest job {job_id}: {str(cleanup_error)}")
+        finally:
+            heartbeat.cancel()
+            self.active_jobs -= 1
+
+    async def _process(self, job: dict[str, Any], state: dict[str, Any]) -> None:
+        """解析、分块、嵌入、写入索引"""
+        from app.services.document_processor import DocumentProcessor
+        from app.services.vector_store import get_vector_store
+
+        job_id = job['id']
+        file_path = job['file_path']
+        params = job['params']
+        io = get_executor_pools().io
+
+        if not await io.run(os.path.exists, file_path):
+            raise PermanentJobError(f"Uploaded file not found: {file_path}")
+
+        # 解析与分块在CPU进程池中一次完成
+        processed_doc = await self._stage(
+            'parse', DocumentProcessor().aprocess_file, file_path, params.get('file_sha256')
+        )
+        await self._progress(job_id, 'parsed')
+
+        chunks = processed_doc.get('chunks', [])
+        document_id, vector_metadata = await io.run(_save_document, file_path, processed_doc, params)
+        state['document_id'] = document_id
+        await self._progress(job_id, 'chunked', document_id=document_id, chunks_total=len(chunks))
+
+        # 与已存储的分块比较内容哈希（重新上传时），只编码内容变化和新增的分块
+        vector_store = get_vector_store()
+        plan = await io.run(vector_store.plan_update, document_id, chunks, vector_metadata)
+        texts = plan.changed_texts
+        embeddings: list[list[float]] = []
+        batch_size = max(1, settings.INGEST_EMBED_BATCH_SIZE)
+        for offset in range(0, len(texts), batch_size):
+            embeddings.extend(await self._stage('embed', vector_store.aencode_chunks, texts[offset:offset + batch_size]))
+            await self._progress(job_id, 'chunked', chunks_embedded=len(chunks) - len(texts) + len(embeddings))
+        await self._progress(job_id, 'embedded', chunks_embedded=len(chunks))
+
+        state['indexing'] = True
+        await self._stage('index', io.run, vector_store.apply_update, plan, embeddings)
+        await self._stage('index', io.run, _mark_document_indexed, document_id)
+
+    async def _cleanup(self, job: dict[str, Any], state: dict[str, Any], final: bool) -> None:
+        """
+        补偿清理
+
+        只清理本任务新建的文档: 写入索引失败时删除可能已部分写入的向量，最终失败时还删除文档记录和上传的文件。
+        替换已有文档的任务不删除任何数据，原有分块保持可检索（apply_update 按分块原地覆盖），
+        记录保持未索引状态，由重试或下一次重建索引重新入库
+        """
+        from app.services.vector_store import get_vector_store
+
+        if job['params'].get('previous_document_id') is not None:
+            if final:
+                logger.warning(
+                    f"Ingest job {job['id']} failed, keeping the indexed chunks of document "
+                    f"{job['params']['previous_document_id']}"
+                )
+            return
+
+        io = get_executor_pools().io
+        document_id = state['document_id']
+        if document_id is not None and (state['indexing'] or final):
+            await get_vector_store().adelete_document(document_id)
+        if final:
+            await io.run(_discard_document, document_id, job['file_path'])
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取工作者统计信息"""
+        return {
+            'worker_id': self.worker_id,
+            'running': self._task is not None and not self._task.done(),
+            'concurrency': self.concurrency,
+            'active_jobs': self.active_jobs,
+            'stage_limits': dict(self.stage_limits),
+            'stage_active': dict(self._stage_active),
+            'succeeded': self.succeeded,
+            'retried': self.retried,
+            'failed': self.failed,
+            'lost_leases': self.lost_leases,
+        }
+
+
+# 全局任务队列和进程内工作者（首次使用时创建）
+_ingest_job_queue: Optional[IngestJobQueue] = None
+_ingest_worker: Optional[IngestWorker] = None
+
+
+def get_ingest_job_queue() -> IngestJobQueue:
+    """获取入库任务队列"""
+    global _ingest_job_queue
+    if _ingest_job_queue is None:
+        from app.core.database import engine
+
+        _ingest_job_queue = IngestJobQueue(engine)
+    return _ingest_job_queue
+
+
+def get_ingest_worker() -> IngestWorker:
+    """获取进程内的入库工作者"""
+    global _ingest_worker
+    if _ingest_worker is None:
+        _ingest_worker = IngestWorker(get_ingest_job_queue())
+    return _ingest_worker
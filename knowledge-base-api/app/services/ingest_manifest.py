@@ -0,0 +1,236 @@
+"""
+文档入库清单
+
+持久化记录文档目录中每个文件的入库状态（路径、大小、修改时间、内容哈希、
+文档ID、分块ID、模型ID），启动时据此只处理新增/修改的文件，并清理已删除文件的向量
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from app.core.config import get_settings
+from app.core.logging import log_performance
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MANIFEST_VERSION = 1
+
+# 每处理多少个变更文件保存一次清单
+_SAVE_EVERY = 50
+
+
+@dataclass
+class ManifestEntry:
+    """单个文件的入库记录"""
+
+    path: str
+    size: int
+    mtime: float
+    content_hash: str
+    document_id: int
+    chunk_ids: list[str] = field(default_factory=list)
+    model_id: str = ""
+
+
+def hash_file(file_path: Path, block_size: int = 1024 * 1024) -> str:
+    """计算文件原始字节的sha256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """持久化的文档入库清单"""
+
+    def __init__(self, manifest_path: str) -> None:
+        self.manifest_path = Path(manifest_path)
+        self._entries: dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """从磁盘加载清单，文件损坏时从空清单开始"""
+        if not self.manifest_path.exists():
+            return
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if data.get('version') != MANIFEST_VERSION:
+                logger.warning(f"Ingest manifest version mismatch, rebuilding: {self.manifest_path}")
+                return
+            self._entries = {
+                entry['path']: ManifestEntry(**entry) for entry in data.get('entries', [])
+            }
+        except Exception as e:
+            logger.warning(f"Failed to load ingest manifest {self.manifest_path}: {str(e)}")
+            self._entries = {}
+
+    def save(self) -> None:
+        """原子写入清单文件"""
+        with self._lock:
+            data = {
+                'version': MANIFEST_VERSION,
+                'updated_at': time.time(),
+                'entries': [asdict(entry) for entry in self._entries.values()],
+            }
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(self.manifest_path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self._entries.get(path)
+
+    def set(self, entry: ManifestEntry) -> None:
+        with self._lock:
+            self._entries[entry.path] = entry
+
+    def remove(self, path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self._entries.pop(path, None)
+
+    def paths(self) -> list[str]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def reconcile_documents_directory() -> dict[str, Any]:
+    """
+    按清单对账文档目录
+
+    - 大小和修改时间均未变化的文件直接跳过（仅一次stat）
+    - 元信息变化但内容哈希相同的文件只更新清单
+    - 新增或内容变化的文件重新解析、写入数据库并更新向量
+    - 清单中存在但磁盘上已删除的文件从向量库和数据库中移除
+
+    Returns:
+        对账统计信息
+    """
+    from app.core.database import get_db_context
+    from app.models.document import Document
+    from app.services.document_processor import DocumentProcessor
+    from app.services.document_records import build_vector_metadata, document_path_key, upsert_document_record
+    from app.services.model_registry import get_model_registry
+    from app.services.vector_store import get_vector_store, make_chunk_id
+
+    start_time = time.time()
+    stats = {'scanned': 0, 'unchanged': 0, 'touched': 0, 'indexed': 0, 'deleted': 0, 'failed': 0}
+
+    documents_path = Path(settings.DOCUMENTS_PATH)
+    if not documents_path.exists():
+        logger.warning(f"Documents directory not found: {documents_path}")
+        return stats
+
+    manifest = IngestManifest(settings.INGEST_MANIFEST_PATH)
+    model_id = get_model_registry().embedding_model_id
+    vector_store = get_vector_store()
+    document_processor: Optional[DocumentProcessor] = None
+    pending_saves = 0
+
+    seen_paths: set[str] = set()
+    for md_file in documents_path.glob("*.md"):
+        stats['scanned'] += 1
+        path_key = document_path_key(md_file)
+        seen_paths.add(path_key)
+
+        try:
+            file_stat = md_file.stat()
+            entry = manifest.get(path_key)
+            if (
+                entry is not None
+                and entry.size == file_stat.st_size
+                and entry.mtime == file_stat.st_mtime
+                and entry.model_id == model_id
+            ):
+                stats['unchanged'] += 1
+                continue
+
+            content_hash = hash_file(md_file)
+            if entry is not None and entry.content_hash == content_hash and entry.model_id == model_id:
+                # 仅修改时间变化（如touch/复制），内容未变
+                entry.size = file_stat.st_size
+                entry.mtime = file_stat.st_mtime
+                manifest.set(entry)
+                stats['touched'] += 1
+                pending_saves += 1
+                continue
+
+            if document_processor is None:
+                document_processor = DocumentProcessor()
+            processed_doc = document_processor.process_file(str(md_file), content_hash)
+            chunks = processed_doc.get('chunks', [])
+
+            with get_db_context() as db:
+                document = upsert_document_record(db, path_key, processed_doc)
+                document_id = int(document.id)
+
+                # 文档ID变化（如旧清单对应的记录已被删除）时清理旧向量
+                if entry is not None and entry.document_id != document_id:
+                    vector_store.delete_document(entry.document_id)
+
+                if not vector_store.update_document(document_id, chunks, build_vector_metadata(document)):
+                    raise RuntimeError(f"Failed to index document {document_id}")
+                document.vector_indexed = True
+                document.search_indexed = True
+
+            manifest.set(ManifestEntry(
+                path=path_key,
+                size=file_stat.st_size,
+                mtime=file_stat.st_mtime,
+                content_hash=content_hash,
+                document_id=document_id,
+                chunk_ids=[make_chunk_id(document_id, chunk['chunk_index']) for chunk in chunks],
+                model_id=model_id,
+            ))
+            stats['indexed'] += 1
+            pending_saves += 1
+            logger.info(f"✅ Indexed: {md_file.name} (document {document_id}, {len(chunks)} chunks)")
+
+        except Exception as e:
+            stats['failed'] += 1
+            logger.error(f"❌ Failed to reconcile {md_file.name}: {str(e)}")
+
+        if pending_saves >= _SAVE_EVERY:
+            manifest.save()
+            pending_saves = 0
+
+    # 清理已从磁盘删除的文件
+    for path_key in manifest.paths():
+        if path_key in seen_paths:
+            continue
+        entry = manifest.get(path_key)
+        if entry is None:
+            continue
+        try:
+            vector_store.delete_document(entry.document_id)
+            with get_db_context() as db:
+                document = db.query(Document).filter(Document.file_path == path_key).first()
+                if document is not None:
+                    db.delete(document)
+            manifest.remove(path_key)
+            stats['deleted'] += 1
+            pending_saves += 1
+            logger.info(f"🗑️ Removed deleted file from index: {path_key}")
+        except Exception as e:
+            stats['failed'] += 1
+            logger.error(f"❌ Failed to remove deleted file {path_key}: {str(e)}")
+
+    if pending_saves:
+        manifest.save()
+
+    log_performance("document_reconcile", time.time() - start_time, **stats)
+    logger.info(f"📚 Reconciled documents directory: {stats}")
+    return stats
@@ -0,0 +1,400 @@
+"""
+目录批量入库流水线
+
+逐个文件解析、分块、嵌入、写入时，嵌入模型要等所有解析结束才开始工作，CPU核心也只用上一个。
+流水线把三个阶段拆开并让它们重叠执行:
+
+    解析进程池 --(有界队列)--> 批量嵌入线程 --(有界队列)--> 批量写入线程
+
+- 解析/分块: 独立的spawn进程池，文件按完成顺序流出，解析速度随核数近似线性扩展
+- 嵌入: 跨文档合并分块组批，已入库文档只编码内容哈希在旧分块中不存在的分块
+- 写入: 多个文档的SQLite记录在一个事务中写入，新文档的分块一次写入ChromaDB，
+  已入库文档按 plan_update/apply_update 原地更新（更新过程中旧分块始终可以检索）
+
+队列有界，下游变慢时上游自然阻塞，内存中只保留有限个文档。
+各阶段统计处理的文件数、分块数、耗时以及 files/sec、chunks/sec
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from app.core.config import get_settings
+from app.core.logging import log_performance
+from app.services.document_processor import DocumentProcessor, _process_file_in_worker
+from app.services.ingest_manifest import hash_file
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 队列结束标记
+_DONE = None
+
+
+@dataclass
+class StageStats:
+    """单个阶段的统计信息"""
+
+    files: int = 0
+    chunks: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    finished_at: Optional[float] = None
+
+    def to_dict(self, started_at: float) -> dict[str, Any]:
+        elapsed = (self.finished_at or time.perf_counter()) - started_at
+        return {
+            'files': self.files,
+            'chunks': self.chunks,
+            'failed': self.failed,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'files_per_sec': round(self.files / elapsed, 2) if elapsed > 0 else 0.0,
+            'chunks_per_sec': round(self.chunks / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+@dataclass
+class _EmbeddedDocument:
+    """已解析并编码、等待写入的文档"""
+
+    file_path: str
+    processed_doc: dict[str, Any]
+    embeddings: dict[str, list[float]] = field(default_factory=dict)   # 分块内容哈希 -> 向量
+    stored_chunks: Optional[list[dict[str, Any]]] = None               # 已入库文档的旧分块，新文档为None
+
+    @property
+    def chunks(self) -> list[dict[str, Any]]:
+        return self.processed_doc.get('chunks', [])
+
+
+def _parse_file_in_worker(
+    file_path: str, file_sha256: Optional[str], chunk_size: int, chunk_overlap: int, separators: list[str]
+) -> dict[str, Any]:
+    """在解析进程中计算原始字节sha256（调用方未提供时）并处理文件"""
+    file_sha256 = file_sha256 or hash_file(Path(file_path))
+    return _process_file_in_worker(file_path, chunk_size, chunk_overlap, separators, file_sha256)
+
+
+def _default_parse_workers() -> int:
+    return settings.INGEST_PIPELINE_PARSE_WORKERS or max(1, (os.cpu_count() or 2) - 1)
+
+
+class IngestPipeline:
+    """解析、嵌入、写入三阶段重叠执行的批量入库流水线"""
+
+    def __init__(
+        self,
+        parse_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        write_batch_size: Optional[int] = None,
+        processor: Optional[DocumentProcessor] = None,
+        reencode: bool = False,
+    ) -> None:
+        """
+        初始化流水线
+
+        Args:
+            parse_workers: 解析进程数（默认 INGEST_PIPELINE_PARSE_WORKERS，0 为CPU核数-1）
+            queue_size: 阶段之间队列容纳的文档数
+            embed_batch_size: 嵌入阶段跨文档合并的分块数
+            write_batch_size: 写入阶段每个事务写入的文档数
+            processor: 提供分块参数的文档处理器
+            reencode: 为True时已入库文档的分块也全部重新编码（如更换了嵌入模型）
+        """
+        self.parse_workers = max(1, parse_workers or _default_parse_workers())
+        self.queue_size = max(1, queue_size or settings.INGEST_PIPELINE_QUEUE_SIZE)
+        self.embed_batch_size = max(1, embed_batch_size or settings.INGEST_PIPELINE_EMBED_BATCH)
+        self.write_batch_size = max(1, write_batch_size or settings.INGEST_PIPELINE_WRITE_BATCH)
+        self.processor = processor or DocumentProcessor()
+        self.reencode = reencode
+
+        self.stats = {'parse': StageStats(), 'embed': StageStats(), 'write': StageStats()}
+        self.document_ids: dict[str, int] = {}
+        self._started_at = 0.0
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        files: Iterable[Path],
+        on_progress: Optional[Callable[[dict[str, Any]], None]] = None,
+        file_hashes: Optional[dict[str, str]] = None,
+    ) -> dict[str, Any]:
+        """
+        入库一批文件（以文件路径作为文档记录的唯一标识，已存在的文档被更新）
+
+        Args:
+            files: 文件路径
+            on_progress: 每写入一批文档后调用，参数为当前统计信息
+            file_hashes: 调用方已计算的原始字节sha256（按 document_path_key 索引），缺少的在解析进程中计算
+
+        Returns:
+            各阶段统计信息
+        """
+        from app.services.document_records import document_path_key
+        from app.services.vector_store import get_vector_store
+
+        vector_store = get_vector_store()
+        files = [document_path_key(path) for path in files]
+        parsed: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._started_at = time.perf_counter()
+
+        embed_thread = threading.Thread(
+            target=self._embed_stage, args=(vector_store, parsed, embedded), name="ingest-embed", daemon=True
+        )
+        write_thread = threading.Thread(
+            target=self._write_stage, args=(vector_store, embedded, on_progress), name="ingest-write", daemon=True
+        )
+        embed_thread.start()
+        write_thread.start()
+        try:
+            self._parse_stage(files, file_hashes or {}, parsed)
+        finally:
+            parsed.put(_DONE)
+            embed_thread.join()
+            write_thread.join()
+
+        summary = self.get_stats()
+        log_performance("ingest_pipeline", summary['elapsed_seconds'], files=len(files), indexed=summary['write']['files'])
+        logger.info(f"📚 Ingest pipeline finished: {summary}")
+        return summary
+
+    def _parse_stage(self, files: list[str], file_hashes: dict[str, str], parsed: queue.Queue) -> None:
+        """在进程池中解析和分块，按完成顺序送入嵌入队列（在途任务数有界）"""
+        stats = self.stats['parse']
+        args = (self.processor.chunk_size, self.processor.chunk_overlap, list(self.processor.separators))
+        max_in_flight = self.parse_workers * 2
+        pending: dict[Future, str] = {}
+        remaining = iter(files)
+
+        with ProcessPoolExecutor(
+            max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            while True:
+                for file_path in remaining:
+                    future = executor.submit(_parse_file_in_worker, file_path, file_hashes.get(file_path), *args)
+                    pending[future] = file_path
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = pending.pop(future)
+                    try:
+                        processed_doc = future.result()
+                    except Exception as e:
+                        stats.failed += 1
+                        logger.error(f"❌ Failed to parse {file_path}: {str(e)}")
+                        continue
+                    stats.files += 1
+                    stats.chunks += len(processed_doc.get('chunks', []))
+                    # 嵌入跟不上时在此阻塞，解析进程随之停止领取新文件
+                    parsed.put(_EmbeddedDocument(file_path, processed_doc))
+        stats.finished_at = time.perf_counter()
+
+    def _embed_stage(self, vector_store: Any, parsed: queue.Queue, embedded: queue.Queue) -> None:
+        """跨文档合并分块组批编码"""
+        stats = self.stats['embed']
+        finished = False
+        try:
+            while not finished:
+                # 阻塞等待第一个文档，再取走队列中已就绪的文档直到凑满一批
+                batch: list[_EmbeddedDocument] = []
+                batch_chunks = 0
+                item = parsed.get()
+                while item is not _DONE:
+                    batch.append(item)
+                    batch_chunks += len(item.chunks)
+                    if batch_chunks >= self.embed_batch_size:
+                        break
+                    try:
+                        item = parsed.get_nowait()
+                    except queue.Empty:
+                        break
+                finished = item is _DONE
+                if batch:
+                    self._embed_batch(vector_store, batch, embedded, stats)
+        finally:
+            stats.finished_at = time.perf_counter()
+            embedded.put(_DONE)
+
+    def _embed_batch(
+        self, vector_store: Any, batch: list[_EmbeddedDocument], embedded: queue.Queue, stats: StageStats
+    ) -> None:
+        from app.services.vector_store import chunk_content_hash
+
+        start = time.perf_counter()
+        try:
+            self._load_stored_chunks(vector_store, batch)
+            # 按内容哈希去重，已入库文档的旧分块中存在的内容不再编码（复用旧分块的向量）
+            pending: dict[str, str] = {}
+            for document in batch:
+                stored_hashes = set() if self.reencode else {
+                    (chunk['metadata'] or {}).get('content_hash') or chunk_content_hash(chunk['content'] or '')
+                    for chunk in document.stored_chunks or []
+                }
+                for chunk in document.chunks:
+                    content_hash = chunk_content_hash(chunk['content'])
+                    if content_hash not in stored_hashes and content_hash not in pending:
+                        pending[content_hash] = chunk['content']
+            vectors = vector_store.encode_chunks(list(pending.values())) if pending else []
+        except Exception as e:
+            stats.failed += len(batch)
+            logger.error(f"❌ Failed to embed {len(batch)} documents: {str(e)}")
+            return
+        finally:
+            stats.busy_seconds += time.perf_counter() - start
+
+        encoded = dict(zip(pending, vectors))
+        for document in batch:
+            for chunk in document.chunks:
+                content_hash = chunk_content_hash(chunk['content'])
+                if content_hash in encoded:
+                    document.embeddings[content_hash] = encoded[content_hash]
+            stats.files += 1
+            stats.chunks += len(document.chunks)
+            embedded.put(document)
+
+    def _load_stored_chunks(self, vector_store: Any, batch: list[_EmbeddedDocument]) -> None:
+        """读取本批中已有记录的文档的旧分块"""
+        from app.core.database import get_db_context
+        from app.models.document import Document
+
+        with get_db_context() as db:
+            existing = dict(
+                db.query(Document.file_path, Document.id)
+                .filter(Document.file_path.in_([document.file_path for document in batch]))
+                .all()
+            )
+
+        for document in batch:
+            if document.file_path in existing:
+                document.stored_chunks = vector_store.get_document_chunks(int(existing[document.file_path]))
+
+    def _write_stage(
+        self,
+        vector_store: Any,
+        embedded: queue.Queue,
+        on_progress: Optional[Callable[[dict[str, Any]], None]],
+    ) -> None:
+        """按批写入SQLite和ChromaDB"""
+        stats = self.stats['write']
+        finished = False
+        try:
+            while not finished:
+                batch: list[_EmbeddedDocument] = []
+                item = embedded.get()
+                while item is not _DONE:
+                    batch.append(item)
+                    if len(batch) >= self.write_batch_size:
+                        break
+                    try:
+                        item = embedded.get_nowait()
+                    except queue.Empty:
+                        break
+                finished = item is _DONE
+                if not batch:
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    self._write_batch(vector_store, batch)
+                    stats.files += len(batch)
+                    stats.chunks += sum(len(document.chunks) for document in batch)
+                except Exception as e:
+                    stats.failed += len(batch)
+                    logger.error(f"❌ Failed to write {len(batch)} documents: {str(e)}")
+                finally:
+                    stats.busy_seconds += time.perf_counter() - start
+
+                if on_progress is not None:
+                    on_progress(self.get_stats())
+        finally:
+            stats.finished_at = time.perf_counter()
+
+    def _write_batch(self, vector_store: Any, batch: list[_EmbeddedDocument]) -> None:
+        """
+        在一个事务中写入文档记录，再写入分块，最后批量标记为已索引
+
+        分块写入（词法索引、索引代数）使用同一个SQLite文件，必须在记录事务提交后进行。
+        新文档的分块一次写入；已入库的文档按内容哈希比较后原地更新，旧版本在更新过程中始终可以检索。
+        分块写入失败时只删除新文档可能已部分写入的分块，本批文档保持未索引状态，重新运行时按文件路径更新
+        """
+        from app.core.database import get_db_context
+        from app.models.document import Document
+        from app.services.document_records import build_vector_metadata, upsert_document_record
+        from app.services.vector_store import chunk_content_hash
+
+        with get_db_context() as db:
+            records = [upsert_document_record(db, document.file_path, document.processed_doc) for document in batch]
+            document_ids = [int(record.id) for record in records]
+            metadatas = [build_vector_metadata(record) for record in records]
+
+        created_ids = [
+            document_id for document, document_id in zip(batch, document_ids) if document.stored_chunks is None
+        ]
+        try:
+            vector_store.index_documents([
+                (
+                    document_id,
+                    document.chunks,
+                    [document.embeddings[chunk_content_hash(chunk['content'])] for chunk in document.chunks],
+                    metadata,
+                )
+                for document_id, document, metadata in zip(document_ids, batch, metadatas)
+                if document.stored_chunks is None
+            ])
+            for document_id, document, metadata in zip(document_ids, batch, metadatas):
+                if document.stored_chunks is not None:
+                    self._update_document(vector_store, document_id, document, metadata)
+        except Exception:
+            if created_ids:
+                vector_store.delete_documents(created_ids)
+            raise
+
+        with get_db_context() as db:
+            db.query(Document).filter(Document.id.in_(document_ids)).update(
+                {'vector_indexed': True, 'search_indexed': True}, synchronize_session=False
+            )
+
+        with self._lock:
+            for document, document_id in zip(batch, document_ids):
+                self.document_ids[document.file_path] = document_id
+
+    def _update_document(
+        self, vector_store: Any, document_id: int, document: _EmbeddedDocument, metadata: dict[str, Any]
+    ) -> None:
+        """按嵌入阶段读取的旧分块更新已入库的文档，只写入变化的分块"""
+        plan = vector_store.plan_update(
+            document_id, document.chunks, metadata, stored_chunks=document.stored_chunks, reencode=self.reencode
+        )
+        changed_hashes = [plan.metadatas[i]['content_hash'] for i in plan.changed]
+        # 嵌入阶段之后旧分块被其他写入修改时，补编码缺少的分块
+        missing = {
+            content_hash: plan.texts[i]
+            for i, content_hash in zip(plan.changed, changed_hashes)
+            if content_hash not in document.embeddings
+        }
+        if missing:
+            document.embeddings.update(zip(missing, vector_store.encode_chunks(list(missing.values()))))
+        vector_store.apply_update(plan, [document.embeddings[content_hash] for content_hash in changed_hashes])
+
+    def get_stats(self) -> dict[str, Any]:
+        """各阶段统计信息"""
+        now = time.perf_counter()
+        return {
+            'elapsed_seconds': round(now - self._started_at, 3) if self._started_at else 0.0,
+            'parse_workers': self.parse_workers,
+            **{name: stage.to_dict(self._started_at) for name, stage in self.stats.items()},
+        }
@@ -0,0 +1,225 @@
+"""
+分块全文检索索引（SQLite FTS5）
+
+纯向量检索容易漏掉产品型号、API名称和 ALB/CLB/NAT 这类缩写，词法索引作为补充召回通道。
+索引与 knowledge_base 集合同步维护，存放在现有SQLite数据库中:
+- chunk_fts: FTS5虚拟表，只存分词后的词项
+- chunk_lexical: 与chunk_fts按rowid对应的普通表，存分块ID和可过滤的元数据（带索引，便于按ID/文档删除）
+
+FTS5自带的分词器不切分中文，写入和查询前先做预分词：
+连续的中日韩字符切成重叠二元组（负载均衡 -> 负载 载均 均衡），其他字母数字按词小写保留，
+再交给 unicode61 分词器按空格切分。
+"""
+
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from sqlalchemy import Engine, text
+
+from app.core.logging import log_performance
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
+logger = logging.getLogger(__name__)
+
+# 中日韩统一表意文字、日文假名、韩文音节
+_CJK_RANGES = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(f"[{_CJK_RANGES}]+|[^\\W{_CJK_RANGES}]+")
+_CJK_RE = re.compile(f"[{_CJK_RANGES}]")
+
+# 可在FTS表中直接过滤的元数据列
+_FILTER_COLUMNS = ("document_id", "provider", "category", "filename")
+
+
+def tokenize_for_fts(content: str) -> list[str]:
+    """将文本切分为FTS词项：中日韩字符取二元组，其他按词小写"""
+    tokens: list[str] = []
+    for match in _TOKEN_RE.finditer(content):
+        run = match.group()
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """构造FTS5 MATCH表达式（词项以OR连接，由bm25排序）"""
+    tokens = list(dict.fromkeys(tokenize_for_fts(query)))
+    if not tokens:
+        return None
+    return " OR ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+class LexicalIndex:
+    """基于SQLite FTS5的分块全文索引"""
+
+    TABLE = "chunk_fts"
+    META_TABLE = "chunk_lexical"
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.searches = 0
+        self._total_search_ms = 0.0
+        self.ensure_schema()
+
+    def ensure_schema(self) -> None:
+        """创建FTS5虚拟表和元数据表（已存在时跳过）"""
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} "
+                    "USING fts5(terms, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+            connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.META_TABLE} ("
+                    "id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, document_id INTEGER, "
+                    "chunk_index INTEGER, provider TEXT, category TEXT, filename TEXT)"
+                )
+            )
+            connection.execute(
+                text(f"CREATE INDEX IF NOT EXISTS ix_{self.META_TABLE}_document_id ON {self.META_TABLE} (document_id)")
+            )
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict[str, Any]]) -> None:
+        """写入分块（相同分块ID先删除再写入）"""
+        if not ids:
+            return
+        rows = [
+            {
+                'chunk_id': chunk_id,
+                'document_id': metadata.get('document_id'),
+                'chunk_index': metadata.get('chunk_index'),
+                'provider': metadata.get('provider') or '',
+                'category': metadata.get('category') or '',
+                'filename': metadata.get('filename') or '',
+                'terms': " ".join(tokenize_for_fts(content or "")),
+            }
+            for chunk_id, content, metadata in zip(ids, texts, metadatas)
+        ]
+        with self.engine.begin() as connection:
+            self._delete_where(connection, "chunk_id = :chunk_id", [{'chunk_id': chunk_id} for chunk_id in ids])
+            for row in rows:
+                row_id = connection.execute(
+                    text(
+                        f"INSERT INTO {self.META_TABLE} "
+                        "(chunk_id, document_id, chunk_index, provider, category, filename) "
+                        "VALUES (:chunk_id, :document_id, :chunk_index, :provider, :category, :filename)"
+                    ),
+                    row,
+                ).lastrowid
+                connection.execute(
+                    text(f"INSERT INTO {self.TABLE} (rowid, terms) VALUES (:rowid, :terms)"),
+                    {'rowid': row_id, 'terms': row['terms']},
+                )
+
+    def _delete_where(self, connection: Any, condition: str, params: Any) -> None:
+        """按元数据表条件删除分块（先删FTS行再删元数据行）"""
+        connection.execute(
+            text(f"DELETE FROM {self.TABLE} WHERE rowid IN (SELECT id FROM {self.META_TABLE} WHERE {condition})"),
+            params,
+        )
+        connection.execute(text(f"DELETE FROM {self.META_TABLE} WHERE {condition}"), params)
+
+    def remove_ids(self, ids: list[str]) -> None:
+        """按分块ID删除"""
+        if not ids:
+            return
+        with self.engine.begin() as connection:
+            self._delete_where(connection, "chunk_id = :chunk_id", [{'chunk_id': chunk_id} for chunk_id in ids])
+
+    def remove_document(self, document_id: int) -> None:
+        """删除文档的所有分块"""
+        with self.engine.begin() as connection:
+            self._delete_where(connection, "document_id = :document_id", {'document_id': document_id})
+
+    def clear(self) -> None:
+        """清空索引"""
+        with self.engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {self.TABLE}"))
+            connection.execute(text(f"DELETE FROM {self.META_TABLE}"))
+
+    def count(self) -> int:
+        """索引中的分块数量"""
+        with self.engine.connect() as connection:
+            return int(connection.execute(text(f"SELECT count(*) FROM {self.META_TABLE}")).scalar() or 0)
+
+    def supports_filter(self, filter_criteria: Optional[dict[str, Any]]) -> bool:
+        """过滤条件是否都能在FTS表中表达"""
+        return all(key in _FILTER_COLUMNS for key in (filter_criteria or {}))
+
+    def search(
+        self, query: str, limit: int, filter_criteria: Optional[dict[str, Any]] = None
+    ) -> list[tuple[str, float]]:
+        """
+        全文检索
+
+        Args:
+            query: 查询文本
+            limit: 返回结果数量
+            filter_criteria: 元数据等值过滤条件
+
+        Returns:
+            按相关度降序排列的 (分块ID, bm25分数) 列表，分数越小越相关
+        """
+        match_query = build_match_query(query)
+        if match_query is None or limit <= 0:
+            return []
+
+        start_time = time.perf_counter()
+        conditions = [f"{self.TABLE} MATCH :match_query"]
+        params: dict[str, Any] = {'match_query': match_query, 'limit': limit}
+        for key, value in (filter_criteria or {}).items():
+            if value is None:
+                continue
+            if key not in _FILTER_COLUMNS:
+                raise ValueError(f"Unsupported lexical filter: {key}")
+            conditions.append(f"m.{key} = :{key}")
+            params[key] = value
+
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text(
+                    f"SELECT m.chunk_id, bm25({self.TABLE}) AS rank FROM {self.TABLE} "
+                    f"JOIN {self.META_TABLE} m ON m.id = {self.TABLE}.rowid "
+                    f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT :limit"
+                ),
+                params,
+            ).fetchall()
+
+        self.searches += 1
+        self._total_search_ms += (time.perf_counter() - start_time) * 1000
+        return [(row[0], float(row[1])) for row in rows]
+
+    def backfill(self, collection: "Collection", page_size: int = 2000) -> None:
+        """从ChromaDB集合重建全文索引"""
+        start_time = time.time()
+        self.clear()
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            page_ids = page["ids"] or []
+            if not page_ids:
+                break
+            offset += len(page_ids)
+            metadatas = [dict(metadata or {}) for metadata in (page["metadatas"] or [{}] * len(page_ids))]
+            self.add(page_ids, page["documents"] or [""] * len(page_ids), metadatas)
+
+        log_performance("lexical_index_backfill", time.time() - start_time, chunks=offset)
+        logger.info(f"Lexical index rebuilt with {offset} chunks")
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取索引统计信息"""
+        return {
+            'chunks': self.count(),
+            'searches': self.searches,
+            'avg_search_ms': round(self._total_search_ms / self.searches, 3) if self.searches else 0.0,
+        }
@@ -0,0 +1,407 @@
+"""
+模型与向量库客户端注册表
+
+进程内共享嵌入模型、ChromaDB客户端和VectorStore实例，
+避免每个服务/请求重复加载模型权重。
+
+torch/FlagEmbedding/chromadb 均在首次使用时才导入，
+使应用本身可以在模型加载前快速启动并接受连接
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
+
+from app.core.config import get_settings
+from app.core.logging import log_performance
+from app.services.bucketed_encoder import BucketedEncoder
+from app.services.chunk_embedding_cache import ChunkEmbeddingCache
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.query_embedding_cache import QueryEmbeddingCache
+from app.services.reranker import CrossEncoderReranker
+from app.services.semantic_cache import SemanticQueryCache
+
+if TYPE_CHECKING:
+    import chromadb
+    from FlagEmbedding import FlagModel
+
+    from app.services.onnx_embedder import OnnxEmbeddingModel
+    from app.services.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EmbeddingModel = Union["FlagModel", "OnnxEmbeddingModel"]
+
+
+class ModelState:
+    """模型加载状态"""
+
+    IDLE = "idle"
+    LOADING = "loading"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class ModelRegistry:
+    """进程级共享资源注册表（线程安全）"""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._embedding_model: Optional[EmbeddingModel] = None
+        self._embedding_dimension: Optional[int] = None
+        self._chroma_client: Optional["chromadb.ClientAPI"] = None
+        self._vector_store: Optional["VectorStore"] = None
+        self._query_batcher: Optional[EmbeddingBatcher] = None
+        self._query_embedding_cache: Optional[QueryEmbeddingCache] = None
+        self._chunk_embedding_cache: Optional[ChunkEmbeddingCache] = None
+        self._document_encoder: Optional[BucketedEncoder] = None
+        self._reranker: Optional[CrossEncoderReranker] = None
+        self._semantic_query_cache: Optional[SemanticQueryCache] = None
+
+        # 就绪状态
+        self._state = ModelState.IDLE
+        self._state_error: Optional[str] = None
+        self._ready_event = threading.Event()
+        self._startup_tasks: dict[str, str] = {}
+        self._init_thread: Optional[threading.Thread] = None
+
+    def get_embedding_model(self) -> EmbeddingModel:
+        """获取共享的嵌入模型（首次调用时加载）"""
+        model = self._embedding_model
+        if model is not None:
+            return model
+
+        with self._lock:
+            if self._embedding_model is None:
+                self._embedding_model = self._load_embedding_model()
+            return self._embedding_model
+
+    def _load_embedding_model(self) -> EmbeddingModel:
+        """按配置的后端加载嵌入模型并探测向量维度"""
+        logger.info(f"Loading embedding model '{settings.EMBEDDING_MODEL}' (backend: {settings.EMBEDDING_BACKEND})...")
+        start_time = time.time()
+        try:
+            model: EmbeddingModel
+            if settings.EMBEDDING_BACKEND == "onnx":
+                from app.services.onnx_embedder import OnnxEmbeddingModel
+
+                model = OnnxEmbeddingModel(
+                    settings.EMBEDDING_MODEL,
+                    onnx_dir=settings.EMBEDDING_ONNX_DIR,
+                    quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+                    num_threads=settings.EMBEDDING_ONNX_THREADS,
+                    query_instruction_for_retrieval=settings.EMBEDDING_QUERY_INSTRUCTION,
+                )
+            elif settings.EMBEDDING_BACKEND == "flag":
+                from FlagEmbedding import FlagModel
+
+                model = FlagModel(
+                    settings.EMBEDDING_MODEL,
+                    query_instruction_for_retrieval=settings.EMBEDDING_QUERY_INSTRUCTION,
+                )
+            else:
+                raise ValueError(f"Unsupported embedding backend: {settings.EMBEDDING_BACKEND}")
+            self._embedding_dimension = len(model.encode(["test"])[0])
+        except Exception as e:
+            logger.error(f"Failed to load embedding model '{settings.EMBEDDING_MODEL}': {str(e)}")
+            raise
+
+        log_performance(
+            "embedding_model_load",
+            time.time() - start_time,
+            model=settings.EMBEDDING_MODEL,
+            backend=settings.EMBEDDING_BACKEND,
+            dimension=self._embedding_dimension,
+        )
+        logger.info(f"Embedding model loaded, dimension: {self._embedding_dimension}")
+        return model
+
+    @property
+    def embedding_dimension(self) -> int:
+        """嵌入向量维度"""
+        self.get_embedding_model()
+        assert self._embedding_dimension is not None
+        return self._embedding_dimension
+
+    @property
+    def embedding_model_id(self) -> str:
+        """嵌入模型标识（包含推理后端，量化模型的向量与原模型存在细微差异）"""
+        if settings.EMBEDDING_BACKEND == "onnx":
+            return f"{settings.EMBEDDING_MODEL}@onnx-{'int8' if settings.EMBEDDING_ONNX_QUANTIZE else 'fp32'}"
+        return settings.EMBEDDING_MODEL
+
+    def is_embedding_model_loaded(self) -> bool:
+        """嵌入模型是否已加载"""
+        return self._embedding_model is not None
+
+    def get_chroma_client(self) -> "chromadb.ClientAPI":
+        """获取共享的ChromaDB客户端"""
+        client = self._chroma_client
+        if client is not None:
+            return client
+
+        with self._lock:
+            if self._chroma_client is None:
+                import chromadb
+                from chromadb.config import Settings as ChromaSettings
+
+                self._chroma_client = chromadb.PersistentClient(
+                    path=settings.CHROMA_PERSIST_DIRECTORY,
+                    settings=ChromaSettings(anonymized_telemetry=False, allow_reset=True),
+                )
+                logger.info(f"ChromaDB client created at {settings.CHROMA_PERSIST_DIRECTORY}")
+            return self._chroma_client
+
+    def get_document_encoder(self) -> BucketedEncoder:
+        """获取共享的文档分块编码器（按长度分桶组批）"""
+        encoder = self._document_encoder
+        if encoder is not None:
+            return encoder
+
+        with self._lock:
+            if self._document_encoder is None:
+                self._document_encoder = BucketedEncoder(
+                    self.get_embedding_model(),
+                    token_budget=settings.EMBEDDING_BATCH_TOKEN_BUDGET,
+                    max_length=settings.EMBEDDING_MAX_SEQ_LENGTH,
+                )
+            return self._document_encoder
+
+    def get_query_batcher(self) -> EmbeddingBatcher:
+        """获取共享的查询向量微批处理器"""
+        batcher = self._query_batcher
+        if batcher is not None:
+            return batcher
+
+        with self._lock:
+            if self._query_batcher is None:
+                self._query_batcher = EmbeddingBatcher(
+                    encode_fn=lambda texts: self.get_embedding_model().encode(texts),
+                    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS,
+                )
+                self._query_batcher.start()
+            return self._query_batcher
+
+    def get_query_embedding_cache(self) -> QueryEmbeddingCache:
+        """获取共享的查询向量缓存"""
+        cache = self._query_embedding_cache
+        if cache is not None:
+            return cache
+
+        with self._lock:
+            if self._query_embedding_cache is None:
+                self._query_embedding_cache = QueryEmbeddingCache(
+                    model_name=self.embedding_model_id,
+                    query_instruction=settings.EMBEDDING_QUERY_INSTRUCTION,
+                    max_bytes=settings.QUERY_EMBEDDING_CACHE_MAX_BYTES,
+                    dtype=settings.QUERY_EMBEDDING_CACHE_DTYPE,
+                )
+            return self._query_embedding_cache
+
+    def get_semantic_query_cache(self) -> SemanticQueryCache:
+        """获取共享的语义查询缓存"""
+        cache = self._semantic_query_cache
+        if cache is not None:
+            return cache
+
+        with self._lock:
+            if self._semantic_query_cache is None:
+                self._semantic_query_cache = SemanticQueryCache(
+                    dimension=self.embedding_dimension,
+                    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                )
+            return self._semantic_query_cache
+
+    def get_chunk_embedding_cache(self) -> ChunkEmbeddingCache:
+        """获取共享的分块向量持久化缓存"""
+        cache = self._chunk_embedding_cache
+        if cache is not None:
+            return cache
+
+        with self._lock:
+            if self._chunk_embedding_cache is None:
+                self._chunk_embedding_cache = ChunkEmbeddingCache(
+                    cache_dir=settings.CHUNK_EMBEDDING_CACHE_DIR,
+                    model_id=self.embedding_model_id,
+                    dimension=self.embedding_dimension,
+                    dtype=settings.CHUNK_EMBEDDING_CACHE_DTYPE,
+                )
+            return self._chunk_embedding_cache
+
+    def get_reranker(self) -> CrossEncoderReranker:
+        """获取共享的交叉编码器重排序器"""
+        reranker = self._reranker
+        if reranker is not None:
+            return reranker
+
+        with self._lock:
+            if self._reranker is None:
+                self._reranker = CrossEncoderReranker(
+                    settings.RERANK_MODEL,
+                    batch_size=settings.RERANK_BATCH_SIZE,
+                    max_length=settings.RERANK_MAX_LENGTH,
+                    cache_max_bytes=settings.RERANK_CACHE_MAX_BYTES,
+                )
+            return self._reranker
+
+    def get_vector_store(self) -> "VectorStore":
+        """获取共享的VectorStore实例"""
+        vector_store = self._vector_store
+        if vector_store is not None:
+            return vector_store
+
+        with self._lock:
+            if self._vector_store is None:
+                from app.services.vector_store import VectorStore
+
+                self._vector_store = VectorStore()
+            return self._vector_store
+
+    def initialize(self) -> None:
+        """预加载所有共享资源"""
+        self.get_embedding_model()
+        self.get_chroma_client()
+        self.get_vector_store()
+        if settings.RERANK_ENABLED:
+            self.get_reranker().load()
+
+    def warm_up(self) -> None:
+        """用几种代表性的批形状预热模型，避免首批真实请求承担首次推理开销"""
+        start_time = time.time()
+        model = self.get_embedding_model()
+        max_length = settings.EMBEDDING_MAX_SEQ_LENGTH
+
+        # (批大小, 单条文本长度): 单条短查询、中等批次、接近token预算的长文本批次
+        shapes = [(1, 8), (8, 128), (max(1, settings.EMBEDDING_BATCH_TOKEN_BUDGET // max_length), max_length)]
+        for batch_size, text_length in shapes:
+            texts = [("负载均衡" * text_length)[:text_length]] * batch_size
+            model.encode(texts, batch_size=batch_size, max_length=max_length)
+
+        if settings.EMBEDDING_BATCHING_ENABLED:
+            self.get_query_batcher().encode("负载均衡对比")
+
+        log_performance("embedding_model_warmup", time.time() - start_time, shapes=str(shapes))
+
+    def start_background_initialization(
+        self, post_ready_tasks: Optional[dict[str, Callable[[], Any]]] = None
+    ) -> threading.Thread:
+        """
+        在后台线程中加载模型、预热并执行启动后任务
+
+        Args:
+            post_ready_tasks: 模型就绪后依次执行的任务（如补齐索引），键为任务名称
+        """
+        with self._lock:
+            if self._init_thread is not None and self._init_thread.is_alive():
+                return self._init_thread
+            self._startup_tasks = {name: "pending" for name in (post_ready_tasks or {})}
+            self._init_thread = threading.Thread(
+                target=self._background_initialize,
+                args=(post_ready_tasks or {},),
+                name="model-initializer",
+                daemon=True,
+            )
+            self._init_thread.start()
+            return self._init_thread
+
+    def load_and_warm_up(self) -> bool:
+        """加载共享资源并预热，成功后标记为就绪"""
+        start_time = time.time()
+        try:
+            self._state = ModelState.LOADING
+            self.initialize()
+            self._state = ModelState.WARMING
+            self.warm_up()
+        except Exception as e:
+            self._state = ModelState.FAILED
+            self._state_error = str(e)
+            logger.error(f"❌ Model initialization failed: {str(e)}")
+            return False
+
+        self._state = ModelState.READY
+        self._state_error = None
+        self._ready_event.set()
+        log_performance("model_ready", time.time() - start_time)
+        logger.info("✅ Embedding model ready, accepting search traffic")
+        return True
+
+    def _background_initialize(self, post_ready_tasks: dict[str, Callable[[], Any]]) -> None:
+        """后台初始化流程"""
+        if not self.load_and_warm_up():
+            return
+
+        for name, task in post_ready_tasks.items():
+            self._startup_tasks[name] = "running"
+            try:
+                task()
+                self._startup_tasks[name] = "done"
+            except Exception as e:
+                self._startup_tasks[name] = "failed"
+                logger.error(f"❌ Startup task '{name}' failed: {str(e)}")
+
+    def is_ready(self) -> bool:
+        """模型是否已加载并完成预热"""
+        return self._ready_event.is_set()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """阻塞等待模型就绪"""
+        return self._ready_event.wait(timeout)
+
+    def get_component_stats(self) -> dict[str, Any]:
+        """获取已初始化组件的统计信息（不会触发模型加载）"""
+        components: dict[str, Any] = {
+            'embedding_batcher': self._query_batcher,
+            'query_embedding_cache': self._query_embedding_cache,
+            'semantic_query_cache': self._semantic_query_cache,
+            'document_encoder': self._document_encoder,
+            'chunk_embedding_cache': self._chunk_embedding_cache,
+            'exact_index': self._vector_store.exact_index if self._vector_store is not None else None,
+            'vector_partitions': self._vector_store.partition_router if self._vector_store is not None else None,
+            'lexical_index': self._vector_store.lexical_index if self._vector_store is not None else None,
+            'index_generation': self._vector_store.generation if self._vector_store is not None else None,
+            'reranker': self._reranker,
+        }
+        return {name: component.get_stats() for name, component in components.items() if component is not None}
+
+    def get_readiness(self) -> dict[str, Any]:
+        """获取就绪状态详情"""
+        return {
+            'ready': self.is_ready(),
+            'state': self._state,
+            'error': self._state_error,
+            'embedding_model': self.embedding_model_id,
+            'startup_tasks': dict(self._startup_tasks),
+        }
+
+    def shutdown(self) -> None:
+        """释放共享资源（应用关闭时调用）"""
+        with self._lock:
+            if self._query_batcher is not None:
+                self._query_batcher.stop()
+                self._query_batcher = None
+            self._vector_store = None
+            self._document_encoder = None
+            self._query_embedding_cache = None
+            self._semantic_query_cache = None
+            self._chunk_embedding_cache = None
+            self._reranker = None
+            self._chroma_client = None
+            self._embedding_model = None
+            self._embedding_dimension = None
+            self._state = ModelState.IDLE
+            self._ready_event.clear()
+        logger.info("Model registry released")
+
+
+# 全局注册表实例
+model_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取模型注册表"""
+    return model_registry
@@ -0,0 +1,182 @@
+"""
+ONNX Runtime 嵌入模型后端
+
+将 settings.EMBEDDING_MODEL 导出为ONNX（可选动态int8量化），
+通过onnxruntime在CPU上推理，encode接口与FlagModel保持一致
+"""
+
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+from filelock import FileLock
+from transformers import AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+
+def _slugify(model_name: str) -> str:
+    """将模型名称转换为可用作目录名的字符串"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_name).strip("_") or "model"
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> Path:
+    """
+    导出ONNX模型（已存在时直接返回）
+
+    Args:
+        model_name: HuggingFace模型名称或本地路径
+        output_dir: ONNX模型根目录
+        quantize: 是否额外生成动态int8量化模型
+
+    Returns:
+        推理使用的ONNX模型路径
+    """
+    model_dir = Path(output_dir) / _slugify(model_name)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = model_dir / "model.onnx"
+    int8_path = model_dir / "model.int8.onnx"
+    target_path = int8_path if quantize else fp32_path
+
+    # 多进程同时启动时只允许一个进程导出
+    with FileLock(str(model_dir / ".export.lock")):
+        if target_path.exists():
+            return target_path
+
+        if not fp32_path.exists():
+            import torch
+            from transformers import AutoModel
+
+            logger.info(f"Exporting '{model_name}' to ONNX at {fp32_path}...")
+            start_time = time.time()
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModel.from_pretrained(model_name)
+            model.eval()
+
+            sample = tokenizer(["导出样例文本"], return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+            dynamic_axes: dict[str, dict[int, str]] = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    tuple(sample[name] for name in input_names),
+                    str(fp32_path),
+                    input_names=input_names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=17,
+                    do_constant_folding=True,
+                )
+            logger.info(f"ONNX export finished in {time.time() - start_time:.1f}s")
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"Applying dynamic int8 quantization to {fp32_path}...")
+            quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+    return target_path
+
+
+class OnnxEmbeddingModel:
+    """基于ONNX Runtime的BGE嵌入模型"""
+
+    def __init__(
+        self,
+        model_name: str,
+        onnx_dir: str,
+        quantize: bool = True,
+        num_threads: int = 0,
+        query_instruction_for_retrieval: Optional[str] = None,
+        pooling_method: str = "cls",
+        normalize_embeddings: bool = True,
+    ) -> None:
+        """
+        初始化ONNX嵌入模型
+
+        Args:
+            model_name: HuggingFace模型名称或本地路径
+            onnx_dir: ONNX模型存放目录
+            quantize: 是否使用动态int8量化模型
+            num_threads: onnxruntime算子内线程数，0表示由onnxruntime自动决定
+            query_instruction_for_retrieval: 检索查询指令
+            pooling_method: 池化方式 (cls/mean)
+            normalize_embeddings: 是否L2归一化输出向量
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND='onnx' requires the 'onnx' and 'onnxruntime' packages"
+            ) from e
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.query_instruction_for_retrieval = query_instruction_for_retrieval
+        self.pooling_method = pooling_method
+        self.normalize_embeddings = normalize_embeddings
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model_path = export_onnx_model(model_name, onnx_dir, quantize=quantize)
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            session_options.intra_op_num_threads = num_threads
+            session_options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(self.model_path), sess_options=session_options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        logger.info(f"ONNX embedding model loaded from {self.model_path} (threads={num_threads or 'auto'})")
+
+    def _pool(self, hidden_state: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """池化得到句向量"""
+        if self.pooling_method == "cls":
+            return hidden_state[:, 0]
+        mask = attention_mask[..., None].astype(hidden_state.dtype)
+        return (hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self, sentences: Union[list[str], str], batch_size: int = 256, max_length: int = 512, **kwargs: Any
+    ) -> np.ndarray:
+        """编码文本（与FlagModel.encode一致：输入单个字符串时返回一维向量）"""
+        input_was_string = isinstance(sentences, str)
+        if input_was_string:
+            sentences = [sentences]
+
+        all_embeddings = []
+        for start_index in range(0, len(sentences), batch_size):
+            batch = sentences[start_index:start_index + batch_size]
+            inputs = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=max_length, return_tensors="np"
+            )
+            feed = {name: inputs[name].astype(np.int64) for name in inputs if name in self._input_names}
+            hidden_state = self.session.run(["last_hidden_state"], feed)[0]
+            embeddings = self._pool(hidden_state, inputs["attention_mask"])
+            if self.normalize_embeddings:
+                embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12, None)
+            all_embeddings.append(embeddings.astype(np.float32))
+
+        if not all_embeddings:
+            return np.zeros((0, 0), dtype=np.float32)
+        result = np.concatenate(all_embeddings, axis=0)
+        return result[0] if input_was_string else result
+
+    def encode_queries(self, queries: Union[list[str], str], **kwargs: Any) -> np.ndarray:
+        """编码检索查询（拼接检索指令）"""
+        if self.query_instruction_for_retrieval:
+            if isinstance(queries, str):
+                queries = self.query_instruction_for_retrieval + queries
+            else:
+                queries = [self.query_instruction_for_retrieval + q for q in queries]
+        return self.encode(queries, **kwargs)
+
+    def encode_corpus(self, corpus: Union[list[str], str], **kwargs: Any) -> np.ndarray:
+        """编码文档语料"""
+        return self.encode(corpus, **kwargs)
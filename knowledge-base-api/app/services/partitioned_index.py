@@ -0,0 +1,217 @@
+"""
+按 (provider, category) 分区的向量子索引
+
+几乎所有线上查询都带 provider 和/或 category 过滤，而全局HNSW图上的 where 过滤
+在条件选择性高时召回和延迟都会明显变差。分区路由为每个 (provider, category)
+组合维护一个独立的ChromaDB集合（kb_part_<哈希>），检索时:
+- 同时给出 provider 和 category: 只查询对应的单个分区
+- 只给出其一: 查询所有匹配分区后按距离归并
+- 无过滤或包含其他过滤字段: 仍使用全局 knowledge_base 集合
+
+分区集合与全局集合写入相同的分块ID、向量和元数据，全局集合始终保留完整数据
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from app.core.logging import log_performance
+from app.services.hnsw_config import apply_search_params, hnsw_metadata
+
+if TYPE_CHECKING:
+    import chromadb
+    from chromadb.api.models.Collection import Collection
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "kb_part_"
+
+# 可由分区表达的过滤字段
+_PARTITION_KEYS = ("provider", "category")
+
+PartitionKey = tuple[str, str]
+
+
+def partition_name(provider: str, category: str) -> str:
+    """生成分区集合名称（ChromaDB集合名只允许有限字符，使用哈希）"""
+    digest = hashlib.sha1(f"{provider}\0{category}".encode("utf-8")).hexdigest()[:16]
+    return f"{PARTITION_PREFIX}{digest}"
+
+
+def _partition_key(metadata: dict[str, Any]) -> PartitionKey:
+    return (str(metadata.get("provider") or ""), str(metadata.get("category") or ""))
+
+
+class PartitionRouter:
+    """分区集合的维护与查询路由（线程安全）"""
+
+    def __init__(self, client: "chromadb.ClientAPI") -> None:
+        self.client = client
+        self._lock = threading.RLock()
+        self._partitions: dict[PartitionKey, "Collection"] = {}
+        self._ready = False
+
+        self.single_probes = 0
+        self.fan_outs = 0
+        self.fallbacks = 0
+
+    def load(self, global_collection: "Collection") -> None:
+        """
+        加载已存在的分区集合
+
+        分区分块总数与全局集合一致时直接标记为就绪，否则需要执行 backfill
+        """
+        partitions: dict[PartitionKey, "Collection"] = {}
+        for item in self.client.list_collections():
+            name = item if isinstance(item, str) else item.name
+            if not name.startswith(PARTITION_PREFIX):
+                continue
+            collection = self.client.get_collection(name=name)
+            apply_search_params(collection, "partition")
+            metadata = collection.metadata or {}
+            partitions[_partition_key(metadata)] = collection
+
+        with self._lock:
+            self._partitions = partitions
+            partition_chunks = sum(collection.count() for collection in partitions.values())
+            self._ready = partition_chunks == global_collection.count()
+
+        logger.info(
+            f"Loaded {len(partitions)} vector partitions ({partition_chunks} chunks, "
+            f"{'ready' if self._ready else 'backfill required'})"
+        )
+
+    def is_ready(self) -> bool:
+        """分区是否与全局集合一致，可用于查询路由"""
+        return self._ready
+
+    def _get_or_create(self, key: PartitionKey) -> "Collection":
+        """获取分区集合，不存在时创建（需持有锁）"""
+        collection = self._partitions.get(key)
+        if collection is None:
+            provider, category = key
+            collection = self.client.get_or_create_collection(
+                name=partition_name(provider, category),
+                metadata={
+                    "description": "Knowledge base partition",
+                    "provider": provider,
+                    "category": category,
+                    **hnsw_metadata("partition"),
+                },
+            )
+            self._partitions[key] = collection
+        return collection
+
+    def _group(self, ids: list[str], metadatas: list[dict[str, Any]]) -> dict[PartitionKey, list[int]]:
+        """按分区对记录位置分组"""
+        groups: dict[PartitionKey, list[int]] = {}
+        for position, metadata in enumerate(metadatas):
+            groups.setdefault(_partition_key(metadata), []).append(position)
+        return groups
+
+    def add(
+        self,
+        ids: list[str],
+        texts: Optional[list[str]],
+        embeddings: list[list[float]],
+        metadatas: list[dict[str, Any]],
+    ) -> None:
+        """将分块写入各自的分区（相同ID覆盖）"""
+        with self._lock:
+            for key, positions in self._group(ids, metadatas).items():
+                self._get_or_create(key).upsert(
+                    ids=[ids[i] for i in positions],
+                    embeddings=[embeddings[i] for i in positions],
+                    documents=[texts[i] for i in positions] if texts is not None else None,
+                    metadatas=[metadatas[i] for i in positions],  # type: ignore
+                )
+
+    def delete(self, ids: list[str], metadatas: list[dict[str, Any]]) -> None:
+        """从分区中删除分块（元数据用于定位所在分区）"""
+        with self._lock:
+            for key, positions in self._group(ids, metadatas).items():
+                collection = self._partitions.get(key)
+                if collection is not None:
+                    collection.delete(ids=[ids[i] for i in positions])
+
+    def reset(self) -> None:
+        """删除所有分区集合"""
+        with self._lock:
+            for collection in self._partitions.values():
+                self.client.delete_collection(collection.name)
+            self._partitions = {}
+            self._ready = True
+
+    def route(self, filter_criteria: dict[str, Any]) -> Optional[list["Collection"]]:
+        """
+        根据过滤条件选择需要查询的分区
+
+        Returns:
+            需要查询的分区集合列表（可能为空，表示没有匹配的数据）；
+            返回None表示无法由分区表达，应查询全局集合
+        """
+        if not self._ready or not filter_criteria or any(key not in _PARTITION_KEYS for key in filter_criteria):
+            self.fallbacks += 1
+            return None
+
+        provider = filter_criteria.get("provider")
+        category = filter_criteria.get("category")
+        with self._lock:
+            if provider is not None and category is not None:
+                self.single_probes += 1
+                collection = self._partitions.get((str(provider), str(category)))
+                return [collection] if collection is not None else []
+
+            self.fan_outs += 1
+            return [
+                collection
+                for (partition_provider, partition_category), collection in self._partitions.items()
+                if (provider is None or partition_provider == str(provider))
+                and (category is None or partition_category == str(category))
+            ]
+
+    def backfill(self, global_collection: "Collection", page_size: int = 2000) -> None:
+        """从全局集合重建所有分区"""
+        start_time = time.time()
+        with self._lock:
+            self._ready = False
+            for collection in self._partitions.values():
+                self.client.delete_collection(collection.name)
+            self._partitions = {}
+
+        offset = 0
+        while True:
+            # 读取分页和写入分区在同一把锁内完成，期间的删除不会被旧分页重新写回
+            with self._lock:
+                page = global_collection.get(
+                    include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+                )
+                page_ids = page["ids"] or []
+                if not page_ids:
+                    break
+                offset += len(page_ids)
+                metadatas = [dict(metadata or {}) for metadata in (page["metadatas"] or [{}] * len(page_ids))]
+                self.add(page_ids, page["documents"], [list(vector) for vector in page["embeddings"]], metadatas)
+
+        with self._lock:
+            self._ready = True
+        log_performance("vector_partition_backfill", time.time() - start_time, chunks=offset, partitions=len(self._partitions))
+        logger.info(f"Backfilled {len(self._partitions)} vector partitions with {offset} chunks")
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取分区统计信息"""
+        with self._lock:
+            partitions = list(self._partitions.items())
+        return {
+            'ready': self._ready,
+            'partitions': len(partitions),
+            'partition_sizes': {
+                f"{provider or '-'}/{category or '-'}": collection.count()
+                for (provider, category), collection in partitions
+            },
+            'single_probes': self.single_probes,
+            'fan_outs': self.fan_outs,
+            'fallbacks': self.fallbacks,
+        }
@@ -8,7 +8,9 @@ import requests
 from typing import Any, Optional
 
 from app.core.config import get_settings
+from app.core.executors import ExecutorBusyError
 from app.models.search import SearchType
+from app.services.grouping import GroupSpec
 from app.services.search_engine import SearchEngine
 
 logger = logging.getLogger(__name__)
@@ -18,8 +20,8 @@ settings = get_settings()
 class QAService:
     """竞品分析问答服务"""
 
-    def __init__(self) -> None:
-        self.search_engine = SearchEngine()
+    def __init__(self, search_engine: Optional[SearchEngine] = None) -> None:
+        self.search_engine = search_engine or SearchEngine()
 
     def answer_question(
         self,
@@ -47,58 +49,110 @@ class QAService:
         start_time = time.time()
 
         try:
-            # 1. 构建过滤条件
-            filters = {}
-            if provider:
-                filters['provider'] = provider
-            if category:
-                filters['category'] = category
-            
-            # 2. 搜索相关文档
+            # 1. 按文档分组检索，每个文档取最相关的分块，保证得到context_limit个不同文档
             search_results = self.search_engine.search(
                 query=question,
-                limit=context_limit * 2,  # 搜索更多结果以便筛选
-                filters=filters if filters else None,
+                limit=context_limit,
+                filters=self._build_filters(provider, category),
+                group=self._context_group(),
             )
+            return self._build_answer(question, search_results, context_limit, include_sources, start_time)
 
-            if not search_results['results']:
-                return {
-                    'answer': '抱歉，我在知识库中没有找到相关信息来回答您的问题。',
-                    'confidence': 0.0,
-                    'sources': [],
-                    'processing_time': time.time() - start_time,
-                }
-
-            # 2. 选择最相关的文档作为上下文
-            relevant_docs = self._select_relevant_context(search_results['results'], context_limit)
-
-            # 3. 生成回答
-            answer_data = self._generate_template_answer(question, relevant_docs)
+        except Exception as e:
+            return self._error_answer(e, start_time)
 
-            # 4. 准备来源信息
-            sources = []
-            if include_sources:
-                sources = self._prepare_sources(relevant_docs, question)
+    async def aanswer_question(
+        self,
+        question: str,
+        context_limit: int = 3,
+        include_sources: bool = True,
+        temperature: float = 0.7,
+        provider: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        回答问题（异步，检索不阻塞事件循环）
 
-            processing_time = time.time() - start_time
+        参数与返回值同 answer_question
+        """
+        start_time = time.time()
 
-            return {
-                'answer': answer_data['answer'],
-                'confidence': answer_data['confidence'],
-                'sources': sources,
-                'processing_time': round(processing_time, 3),
-            }
+        try:
+            search_results = await self.search_engine.asearch(
+                query=question,
+                limit=context_limit,
+                filters=self._build_filters(provider, category),
+                group=self._context_group(),
+            )
+            return self._build_answer(question, search_results, context_limit, include_sources, start_time)
 
+        except ExecutorBusyError:
+            raise
         except Exception as e:
-            logger.error(f"Failed to answer question: {str(e)}")
+            return self._error_answer(e, start_time)
+
+    @staticmethod
+    def _context_group() -> GroupSpec:
+        """上下文检索的分组参数（每个文档一个分块）"""
+        return GroupSpec(group_by='document_id', per_group=1, aggregation=settings.QA_CONTEXT_AGGREGATION)
+
+    def _build_filters(self, provider: Optional[str], category: Optional[str]) -> Optional[dict[str, Any]]:
+        """构建过滤条件"""
+        filters = {}
+        if provider:
+            filters['provider'] = provider
+        if category:
+            filters['category'] = category
+        return filters if filters else None
+
+    def _build_answer(
+        self,
+        question: str,
+        search_results: dict[str, Any],
+        context_limit: int,
+        include_sources: bool,
+        start_time: float,
+    ) -> dict[str, Any]:
+        """根据检索结果生成问答响应"""
+        if not search_results['results']:
             return {
-                'answer': '抱歉，处理您的问题时发生了错误，请稍后重试。',
+                'answer': '抱歉，我在知识库中没有找到相关信息来回答您的问题。',
                 'confidence': 0.0,
                 'sources': [],
                 'processing_time': time.time() - start_time,
-                'error': str(e),
             }
 
+        # 2. 选择最相关的文档作为上下文
+        relevant_docs = self._select_relevant_context(search_results['results'], context_limit)
+
+        # 3. 生成回答
+        answer_data = self._generate_template_answer(question, relevant_docs)
+
+        # 4. 准备来源信息
+        sources = []
+        if include_sources:
+            sources = self._prepare_sources(relevant_docs, question)
+
+        processing_time = time.time() - start_time
+
+        return {
+            'answer': answer_data['answer'],
+            'confidence': answer_data['confidence'],
+            'sources': sources,
+            'processing_time': round(processing_time, 3),
+        }
+
+    def _error_answer(self, error: Exception, start_time: float) -> dict[str, Any]:
+        """问答失败时的兜底响应"""
+        logger.error(f"Failed to answer question: {str(error)}")
+        return {
+            'answer': '抱歉，处理您的问题时发生了错误，请稍后重试。',
+            'confidence': 0.0,
+            'sources': [],
+            'processing_time': time.time() - start_time,
+            'error': str(error),
+        }
+
     def _select_relevant_context(self, search_results: list[dict], limit: int) -> list[dict]:
         """选择最相关的上下文文档"""
         # 按分数排序并去重
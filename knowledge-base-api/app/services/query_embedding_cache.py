@@ -0,0 +1,77 @@
+"""
+查询向量缓存
+
+缓存规范化查询文本到查询向量的映射，避免重复查询反复调用模型编码。
+缓存键包含模型名称和检索指令，模型配置变化时不会命中旧向量
+"""
+
+import re
+import unicodedata
+from typing import Any, Optional
+
+import numpy as np
+
+from app.core.cache import LRUCache
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """规范化查询文本：NFKC归一化（全角转半角）并折叠空白"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class QueryEmbeddingCache:
+    """查询向量LRU缓存"""
+
+    def __init__(
+        self,
+        model_name: str,
+        query_instruction: str,
+        max_bytes: int,
+        dtype: str = "float32",
+    ) -> None:
+        """
+        初始化查询向量缓存
+
+        Args:
+            model_name: 嵌入模型名称
+            query_instruction: 检索查询指令
+            max_bytes: 缓存字节预算
+            dtype: 向量存储精度 (float32/float16)
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported cache dtype: {dtype}")
+
+        self.model_name = model_name
+        self.query_instruction = query_instruction
+        self.dtype = np.dtype(dtype)
+        self._cache = LRUCache(max_bytes=max_bytes, name="query_embedding")
+
+    def _make_key(self, normalized_query: str) -> tuple[str, str, str]:
+        return (self.model_name, self.query_instruction, normalized_query)
+
+    def get(self, normalized_query: str) -> Optional[np.ndarray]:
+        """读取缓存向量（返回float32副本）"""
+        vector = self._cache.get(self._make_key(normalized_query))
+        if vector is None:
+            return None
+        return vector.astype(np.float32)
+
+    def put(self, normalized_query: str, embedding: Any) -> None:
+        """写入查询向量"""
+        vector = np.ascontiguousarray(embedding, dtype=self.dtype)
+        vector.setflags(write=False)
+        # 计入键文本的大致开销
+        size = vector.nbytes + len(normalized_query.encode("utf-8")) + 64
+        self._cache.put(self._make_key(normalized_query), vector, size=size)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._cache.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取缓存统计信息"""
+        stats = self._cache.get_stats()
+        stats.update({'model': self.model_name, 'dtype': self.dtype.name})
+        return stats
@@ -0,0 +1,269 @@
+"""
+增量重建索引
+
+对比磁盘上的文件、SQLite documents 记录和 ChromaDB 中的分块ID，只处理变化的部分:
+
+- 新增: 磁盘上存在、数据库中没有记录的文件
+- 更新: 原始字节sha256与记录不同、尚未完成索引或向量库中没有分块的文档
+- 删除: 文件已从磁盘删除的记录，以及向量库中没有对应记录的孤立分块
+
+新增和更新经批量入库流水线按批写入（使用数据库中的真实文档ID），删除按 REINDEX_DELETE_BATCH 分批执行。
+集合从不被整体清空，未变化的文档在重建过程中始终可以检索
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from app.core.config import get_settings
+from app.core.logging import log_performance
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+STATUS_IDLE = "idle"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class ReindexPlan:
+    """磁盘、数据库与向量库之间的差异"""
+
+    inserts: list[str] = field(default_factory=list)     # 新文件路径
+    updates: list[str] = field(default_factory=list)     # 需要重新入库的记录文件路径
+    deletes: list[int] = field(default_factory=list)     # 文件已删除的文档ID
+    file_hashes: dict[str, str] = field(default_factory=dict)  # 比较时已计算的原始字节sha256，入库时复用
+    orphans: list[int] = field(default_factory=list)     # 只存在于向量库的文档ID
+    unchanged: int = 0
+    skipped: int = 0                                     # 有入库任务正在处理的文件
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            'inserts': len(self.inserts),
+            'updates': len(self.updates),
+            'deletes': len(self.deletes),
+            'orphans': len(self.orphans),
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+        }
+
+
+def _scan_documents_directory(documents_path: Path) -> dict[str, Path]:
+    """递归列出文档目录中支持的文件（跳过上传过程中的隐藏临时文件）"""
+    from app.services.document_processor import SUPPORTED_EXTENSIONS
+    from app.services.document_records import document_path_key
+
+    files: dict[str, Path] = {}
+    for path in documents_path.rglob("*"):
+        if path.name.startswith(".") or path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        if path.is_file():
+            files[document_path_key(path)] = path
+    return files
+
+
+def plan_reindex(force: bool = False) -> ReindexPlan:
+    """
+    计算磁盘文件、documents 记录和向量库分块之间的差异
+
+    Args:
+        force: 为True时所有现存文档都重新入库（如更换了嵌入模型）
+
+    Returns:
+        重建计划
+    """
+    from app.core.database import get_db_context
+    from app.models.document import Document
+    from app.services.document_records import document_path_key
+    from app.services.ingest_jobs import get_ingest_job_queue
+    from app.services.ingest_manifest import hash_file
+    from app.services.vector_store import get_vector_store
+
+    documents_path = Path(settings.DOCUMENTS_PATH)
+    if not documents_path.exists():
+        raise FileNotFoundError(f"Documents directory not found: {documents_path}")
+
+    files = _scan_documents_directory(documents_path)
+    active = {document_path_key(file_path) for file_path in get_ingest_job_queue().active_file_paths()}
+    indexed_ids = get_vector_store().get_indexed_document_ids()
+    with get_db_context() as db:
+        records = db.query(
+            Document.id, Document.file_path, Document.file_sha256, Document.vector_indexed
+        ).order_by(Document.id).all()
+
+    plan = ReindexPlan()
+    matched: set[str] = set()
+    for record in records:
+        key = document_path_key(record.file_path)
+        if key in active:
+            plan.skipped += 1
+            matched.add(key)
+            continue
+        path = files.get(key)
+        # 文件已删除，或同一文件已有更早的记录
+        if path is None or key in matched:
+            plan.deletes.append(int(record.id))
+            continue
+        matched.add(key)
+        if force or not record.vector_indexed or int(record.id) not in indexed_ids:
+            plan.updates.append(key)
+            continue
+        file_sha256 = hash_file(path)
+        if record.file_sha256 != file_sha256:
+            plan.updates.append(key)
+            plan.file_hashes[key] = file_sha256
+        else:
+            plan.unchanged += 1
+
+    for key, path in files.items():
+        if key in matched:
+            continue
+        if key in active:
+            plan.skipped += 1
+        else:
+            plan.inserts.append(key)
+
+    plan.orphans = sorted(indexed_ids - {int(record.id) for record in records})
+    return plan
+
+
+class ReindexRunner:
+    """在后台线程中执行增量重建，同一时间只运行一次，进度通过 get_status 查询"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._done.set()
+        self._state: dict[str, Any] = {'status': STATUS_IDLE}
+
+    def start(self, force: bool = False) -> bool:
+        """开始重建，已有重建在运行时返回False"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._done.clear()
+            self._state = {
+                'status': STATUS_RUNNING,
+                'phase': 'planning',
+                'force': force,
+                'plan': None,
+                'progress': {'indexed': 0, 'deleted': 0, 'failed': 0, 'total': 0},
+                'pipeline': None,
+                'error': None,
+                'started_at': time.time(),
+                'finished_at': None,
+            }
+            self._thread = threading.Thread(target=self._run, args=(force,), name="reindex", daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待当前重建结束"""
+        return self._done.wait(timeout)
+
+    def get_status(self) -> dict[str, Any]:
+        with self._lock:
+            state = dict(self._state)
+            if 'progress' in state:
+                state['progress'] = dict(state['progress'])
+            return state
+
+    def _update(self, **changes: Any) -> None:
+        with self._lock:
+            self._state.update(changes)
+
+    def _advance(self, **counts: int) -> None:
+        with self._lock:
+            progress = self._state['progress']
+            for name, count in counts.items():
+                progress[name] += count
+
+    def _run(self, force: bool) -> None:
+        start_time = time.time()
+        try:
+            plan = plan_reindex(force)
+            total = len(plan.inserts) + len(plan.updates) + len(plan.deletes) + len(plan.orphans)
+            self._update(plan=plan.to_dict())
+            self._advance(total=total)
+            logger.info(f"🔄 Reindex plan: {plan.to_dict()}")
+
+            # 先写入新增和更新的文档，再删除，重建过程中文档只会短暂多出而不会缺失
+            self._update(phase='indexing')
+            self._apply_upserts(plan.inserts + plan.updates, plan.file_hashes, reencode=force)
+            self._update(phase='deleting')
+            self._apply_deletes(plan.deletes, plan.orphans)
+
+            self._update(status=STATUS_SUCCEEDED, phase='done', finished_at=time.time())
+        except Exception as e:
+            logger.error(f"❌ Reindex failed: {str(e)}")
+            self._update(status=STATUS_FAILED, error=str(e), finished_at=time.time())
+        finally:
+            status = self.get_status()
+            log_performance("reindex", time.time() - start_time, status=status['status'], **status['progress'])
+            self._done.set()
+
+    def _apply_upserts(self, file_paths: list[str], file_hashes: dict[str, str], reencode: bool = False) -> None:
+        """经批量入库流水线写入（文档记录按文件路径更新，保持原有ID，已入库文档只重新编码变化的分块）"""
+        if not file_paths:
+            return
+        from app.services.ingest_pipeline import IngestPipeline
+
+        pipeline = IngestPipeline(reencode=reencode)
+        reported = {'indexed': 0, 'failed': 0}
+
+        def on_progress(stats: dict[str, Any]) -> None:
+            failed = stats['parse']['failed'] + stats['embed']['failed'] + stats['write']['failed']
+            current = {'indexed': stats['write']['files'], 'failed': failed}
+            self._advance(**{name: current[name] - reported[name] for name in current})
+            reported.update(current)
+            self._update(pipeline=stats)
+
+        stats = pipeline.run(file_paths, on_progress=on_progress, file_hashes=file_hashes)
+        on_progress(stats)
+
+    def _apply_deletes(self, document_ids: list[int], orphan_ids: list[int]) -> None:
+        """分批删除已删除文件的向量和记录，以及孤立分块"""
+        from app.core.database import get_db_context
+        from app.models.document import Document
+        from app.services.vector_store import get_vector_store
+
+        vector_store = get_vector_store()
+        batch_size = max(1, settings.REINDEX_DELETE_BATCH)
+
+        for offset in range(0, len(document_ids), batch_size):
+            batch = document_ids[offset:offset + batch_size]
+            try:
+                vector_store.delete_documents(batch)
+                with get_db_context() as db:
+                    db.query(Document).filter(Document.id.in_(batch)).delete(synchronize_session=False)
+                self._advance(deleted=len(batch))
+            except Exception as e:
+                self._advance(failed=len(batch))
+                logger.error(f"❌ Failed to delete {len(batch)} documents: {str(e)}")
+
+        for offset in range(0, len(orphan_ids), batch_size):
+            batch = orphan_ids[offset:offset + batch_size]
+            try:
+                vector_store.delete_documents(batch)
+                self._advance(deleted=len(batch))
+            except Exception as e:
+                self._advance(failed=len(batch))
+                logger.error(f"❌ Failed to delete orphan chunks of {len(batch)} documents: {str(e)}")
+
+
+# 全局重建实例
+_reindex_runner: Optional[ReindexRunner] = None
+
+
+def get_reindex_runner() -> ReindexRunner:
+    """获取重建索引实例"""
+    global _reindex_runner
+    if _reindex_runner is None:
+        _reindex_runner = ReindexRunner()
+    return _reindex_runner
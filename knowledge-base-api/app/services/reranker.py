@@ -0,0 +1,156 @@
+"""
+交叉编码器重排序服务
+
+向量检索只比较查询和分块各自的向量，交叉编码器（如 bge-reranker-base）将查询与分块拼接后
+整体打分，排序质量更高但开销也大得多。因此只对前N个候选重排，并且:
+- 按小批次打分，每批之间检查截止时间，超时即放弃重排、保持向量检索顺序
+- 以 (模型, 规范化查询, 分块内容哈希) 为键缓存分数，代理重复发出的查询无需再次打分；
+  分块ID按位置分配，文档更新后同一ID的内容可能变化，因此不能以ID为键
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from app.core.cache import LRUCache
+from app.services.query_embedding_cache import normalize_query
+
+if TYPE_CHECKING:
+    from FlagEmbedding import FlagReranker
+
+logger = logging.getLogger(__name__)
+
+# 单个缓存分数的大致内存开销（键元组 + 浮点数）
+_SCORE_ENTRY_BYTES = 160
+
+
+def _content_key(candidate: dict[str, Any]) -> str:
+    """候选分块的内容哈希（优先使用写入时保存在元数据中的哈希）"""
+    metadata = candidate.get('metadata') or {}
+    content_hash = metadata.get('content_hash') if isinstance(metadata, dict) else None
+    return content_hash or hashlib.sha256((candidate.get('content') or '').encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """带分数缓存和截止时间的交叉编码器重排序器"""
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 8,
+        max_length: int = 512,
+        cache_max_bytes: int = 8 * 1024 * 1024,
+        model_factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        """
+        初始化重排序器（模型在首次打分或调用 load 时加载）
+
+        Args:
+            model_name: 交叉编码器模型名称
+            batch_size: 每批打分的 (查询, 分块) 对数量，也是检查截止时间的粒度
+            max_length: 拼接后的最大token长度
+            cache_max_bytes: 分数缓存字节预算
+            model_factory: 自定义模型构造函数（默认使用FlagReranker）
+        """
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self._model_factory = model_factory
+        self._model: Optional["FlagReranker"] = None
+        self._lock = threading.Lock()
+        self._cache = LRUCache(max_bytes=cache_max_bytes, name="rerank_score")
+
+        self.requests = 0
+        self.timeouts = 0
+        self.pairs_scored = 0
+
+    def load(self) -> Any:
+        """加载交叉编码器模型"""
+        model = self._model
+        if model is not None:
+            return model
+
+        with self._lock:
+            if self._model is None:
+                start_time = time.time()
+                if self._model_factory is not None:
+                    self._model = self._model_factory()
+                else:
+                    from FlagEmbedding import FlagReranker
+
+                    self._model = FlagReranker(self.model_name, use_fp16=False)
+                logger.info(f"Reranker model '{self.model_name}' loaded in {time.time() - start_time:.1f}s")
+            return self._model
+
+    def _compute_scores(self, query: str, passages: list[str]) -> list[float]:
+        """对一批 (查询, 分块) 打分并用sigmoid归一化到 [0, 1]"""
+        model = self.load()
+        raw_scores = model.compute_score(
+            [[query, passage] for passage in passages], batch_size=self.batch_size, max_length=self.max_length
+        )
+        if not isinstance(raw_scores, list):
+            raw_scores = [raw_scores]
+        self.pairs_scored += len(passages)
+        return [1.0 / (1.0 + math.exp(-float(score))) for score in raw_scores]
+
+    def rerank(
+        self, query: str, candidates: list[dict[str, Any]], deadline: Optional[float] = None
+    ) -> Optional[list[dict[str, Any]]]:
+        """
+        对候选结果重排序
+
+        Args:
+            query: 查询文本
+            candidates: 候选结果（需包含 id、content）
+            deadline: 截止时间（time.monotonic()时间戳），None表示不限时
+
+        Returns:
+            按交叉编码器分数降序排列、score替换为重排分数的结果；
+            超过截止时间时返回None，调用方应保持原顺序
+        """
+        self.requests += 1
+        normalized_query = normalize_query(query)
+        scores: dict[str, float] = {}
+        pending: list[dict[str, Any]] = []
+
+        for candidate in candidates:
+            cached = self._cache.get((self.model_name, normalized_query, _content_key(candidate)))
+            if cached is not None:
+                scores[candidate['id']] = cached
+            else:
+                pending.append(candidate)
+
+        for offset in range(0, len(pending), self.batch_size):
+            if deadline is not None and time.monotonic() > deadline:
+                self.timeouts += 1
+                logger.warning(f"Rerank deadline exceeded after {offset}/{len(pending)} pairs, keeping vector order")
+                return None
+
+            batch = pending[offset:offset + self.batch_size]
+            batch_scores = self._compute_scores(normalized_query, [candidate['content'] for candidate in batch])
+            for candidate, score in zip(batch, batch_scores):
+                scores[candidate['id']] = score
+                self._cache.put(
+                    (self.model_name, normalized_query, _content_key(candidate)), score, size=_SCORE_ENTRY_BYTES
+                )
+
+        reranked = [{**candidate, 'score': scores[candidate['id']]} for candidate in candidates]
+        reranked.sort(key=lambda result: result['score'], reverse=True)
+        return reranked
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取重排序统计信息"""
+        stats = self._cache.get_stats()
+        stats.update(
+            {
+                'model': self.model_name,
+                'loaded': self._model is not None,
+                'requests': self.requests,
+                'timeouts': self.timeouts,
+                'pairs_scored': self.pairs_scored,
+            }
+        )
+        return stats
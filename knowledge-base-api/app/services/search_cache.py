@@ -0,0 +1,106 @@
+"""
+检索结果缓存
+
+看板和代理会反复发出完全相同的搜索请求。缓存以规范化后的请求参数加索引代数为键，
+保存检索（及重排）得到的排序结果；集合的任何写入都会递增代数，旧条目不再被命中，
+随后按LRU淘汰，失效是精确的，不依赖TTL。
+
+min_score 等在检索之后才应用的参数不进入缓存键，不同阈值的请求共享同一条目
+"""
+
+import json
+import sys
+from typing import Any, Optional
+
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.services.grouping import GroupSpec
+from app.services.query_embedding_cache import normalize_query
+
+settings = get_settings()
+
+# 单个结果除内容文本外的大致内存开销（结果字典、元数据字典）
+_RESULT_OVERHEAD_BYTES = 1024
+
+CachedSearch = tuple[list[dict[str, Any]], Optional[dict[str, Any]]]
+
+
+def retrieval_params_key(
+    limit: int,
+    filters: Optional[dict[str, Any]],
+    search_type: str,
+    rerank: bool,
+    group: Optional[GroupSpec] = None,
+) -> tuple[Any, ...]:
+    """除查询文本外决定检索结果的参数（过滤条件忽略空值并按键排序）"""
+    valid_filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    return (
+        limit,
+        json.dumps(valid_filters, ensure_ascii=False, sort_keys=True),
+        search_type,
+        rerank,
+        group.cache_key() if group is not None else None,
+    )
+
+
+def is_cacheable(value: CachedSearch) -> bool:
+    """
+    检索结果是否可以缓存
+
+    检索异常在下层被吞掉后表现为空结果，重排超时表现为未重排，这两种结果都不缓存，
+    避免一次偶发故障在下一次写入集合之前一直被命中
+    """
+    results, rerank_info = value
+    return bool(results) and (rerank_info is None or bool(rerank_info.get('reranked')))
+
+
+def _estimate_results_size(value: CachedSearch) -> int:
+    """估算缓存的检索结果占用的字节数"""
+    results, _ = value
+    return sum(sys.getsizeof(result.get('content') or '') + _RESULT_OVERHEAD_BYTES for result in results) + 256
+
+
+class SearchResponseCache:
+    """以索引代数区分版本的检索结果LRU缓存"""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._cache = LRUCache(max_bytes=max_bytes, size_of=_estimate_results_size, name="search_responses")
+
+    @staticmethod
+    def make_key(
+        generation: int,
+        query: str,
+        limit: int,
+        filters: Optional[dict[str, Any]],
+        search_type: str,
+        rerank: bool,
+        group: Optional[GroupSpec] = None,
+    ) -> tuple[Any, ...]:
+        """构造缓存键"""
+        return (generation, normalize_query(query)) + retrieval_params_key(limit, filters, search_type, rerank, group)
+
+    def get(self, key: tuple[Any, ...]) -> Optional[CachedSearch]:
+        """读取缓存的 (结果, 重排信息)"""
+        return self._cache.get(key)
+
+    def put(self, key: tuple[Any, ...], value: CachedSearch) -> None:
+        """写入缓存（不可缓存的结果直接跳过）"""
+        if is_cacheable(value):
+            self._cache.put(key, value)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._cache.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取缓存统计信息（命中率等）"""
+        return self._cache.get_stats()
+
+
+# 全局检索结果缓存实例
+search_response_cache = SearchResponseCache(max_bytes=settings.SEARCH_RESPONSE_CACHE_MAX_BYTES)
+
+
+def get_search_response_cache() -> SearchResponseCache:
+    """获取检索结果缓存"""
+    return search_response_cache
@@ -0,0 +1,162 @@
+"""
+搜索结果游标缓存
+
+offset分页每翻一页都要重新编码查询并检索 limit + offset 个结果。游标分页在首页检索一次
+候选窗口，把排序后的 (分块ID, 分数) 列表存入短TTL缓存，后续页只按ID取回下一段分块，
+total 取自缓存的完整列表，翻页过程中保持不变。
+
+游标本身携带查询参数和偏移量（URL安全的base64 JSON），缓存过期或请求被分配到
+其他工作进程时，按相同参数重新检索一次即可继续翻页
+"""
+
+import base64
+import binascii
+import json
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# 单个 (分块ID, 分数) 条目的大致内存开销
+_RANKED_ENTRY_BYTES = 120
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与请求参数不一致"""
+
+
+@dataclass
+class SearchCursor:
+    """游标携带的检索参数"""
+
+    result_set_id: str
+    offset: int
+    query: str
+    filters: Optional[dict[str, Any]]
+    search_type: str
+    rerank: Optional[bool]
+    min_score: float
+
+    def encode(self) -> str:
+        """编码为URL安全的游标字符串"""
+        payload = {
+            'r': self.result_set_id,
+            'o': self.offset,
+            'q': self.query,
+            'f': self.filters,
+            't': self.search_type,
+            'k': self.rerank,
+            'm': self.min_score,
+        }
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def check_request(
+        self,
+        query: str,
+        filters: Optional[dict[str, Any]],
+        search_type: str,
+        rerank: Optional[bool],
+        min_score: float,
+    ) -> None:
+        """检查请求参数与游标生成时的参数一致，不一致时抛出 InvalidCursorError"""
+        requested = {
+            'query': query,
+            'filters': filters or None,
+            'search_type': search_type,
+            'rerank': rerank,
+            'min_score': float(min_score),
+        }
+        stored = {
+            'query': self.query,
+            'filters': self.filters or None,
+            'search_type': self.search_type,
+            'rerank': self.rerank,
+            'min_score': self.min_score,
+        }
+        mismatched = [name for name in requested if requested[name] != stored[name]]
+        if mismatched:
+            raise InvalidCursorError(f"Search cursor does not match the request ({', '.join(mismatched)})")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "SearchCursor":
+        """解析游标字符串"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw.decode("utf-8"))
+            decoded = cls(
+                result_set_id=str(payload['r']),
+                offset=int(payload['o']),
+                query=str(payload['q']),
+                filters=payload.get('f'),
+                search_type=str(payload['t']),
+                rerank=payload.get('k'),
+                min_score=float(payload.get('m', 0.0)),
+            )
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            raise InvalidCursorError(f"Malformed search cursor: {str(e)}") from e
+
+        if decoded.offset < 0 or (decoded.filters is not None and not isinstance(decoded.filters, dict)):
+            raise InvalidCursorError("Malformed search cursor")
+        return decoded
+
+
+class SearchResultSetCache:
+    """排序结果列表的短TTL缓存（只保存分块ID和分数）"""
+
+    def __init__(self, ttl_seconds: float, max_bytes: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._cache = LRUCache(max_bytes=max_bytes, name="search_result_sets")
+        self.expired = 0
+
+    def put(self, ranked: list[tuple[str, float]], result_set_id: Optional[str] = None) -> str:
+        """
+        保存排序结果
+
+        Returns:
+            结果集ID
+        """
+        result_set_id = result_set_id or secrets.token_urlsafe(12)
+        self._cache.put(
+            result_set_id,
+            (time.monotonic() + self.ttl_seconds, ranked),
+            size=_RANKED_ENTRY_BYTES * (len(ranked) + 1),
+        )
+        return result_set_id
+
+    def get(self, result_set_id: str) -> Optional[list[tuple[str, float]]]:
+        """读取排序结果，过期或不存在时返回None"""
+        entry = self._cache.get(result_set_id)
+        if entry is None:
+            return None
+
+        expires_at, ranked = entry
+        if time.monotonic() > expires_at:
+            self._cache.pop(result_set_id)
+            self.expired += 1
+            return None
+        return ranked
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取缓存统计信息"""
+        stats = self._cache.get_stats()
+        stats['expired'] = self.expired
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
+
+
+# 全局结果集缓存实例
+search_result_cache = SearchResultSetCache(
+    ttl_seconds=settings.SEARCH_CURSOR_TTL_SECONDS,
+    max_bytes=settings.SEARCH_CURSOR_CACHE_MAX_BYTES,
+)
+
+
+def get_search_result_cache() -> SearchResultSetCache:
+    """获取结果集缓存"""
+    return search_result_cache
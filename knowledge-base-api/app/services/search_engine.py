@@ -2,6 +2,7 @@
 搜索引擎服务
 """
 
+import asyncio
 import time
 from typing import Any, Optional
 
@@ -9,8 +10,13 @@ import logging
 from dataclasses import dataclass
 
 from app.core.config import get_settings
+from app.core.executors import ExecutorBusyError, get_executor_pools
 from app.models.search import SearchType
-from app.services.vector_store import VectorStore
+from app.services.grouping import GroupSpec, aggregate_groups, flatten_groups, take_groups
+from app.services.model_registry import get_model_registry
+from app.services.search_cache import get_search_response_cache, is_cacheable, retrieval_params_key
+from app.services.search_cursor import SearchCursor, get_search_result_cache
+from app.services.vector_store import VectorStore, get_vector_store
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -27,43 +33,541 @@ class SearchConfig:
 class SearchEngine:
     """向量搜索引擎"""
 
-    def __init__(self) -> None:
-        self.vector_store = VectorStore()
+    def __init__(self, vector_store: Optional[VectorStore] = None) -> None:
+        self._vector_store = vector_store
         self.config = SearchConfig()
 
+    @property
+    def vector_store(self) -> VectorStore:
+        """向量存储（默认使用进程内共享实例，首次访问时加载）"""
+        if self._vector_store is None:
+            return get_vector_store()
+        return self._vector_store
+
     def semantic_search(
-        self, query: str, limit: int = 10, filters: Optional[dict[str, Any]] = None
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
     ) -> list[dict[str, Any]]:
         """语义搜索"""
         try:
-            return self.vector_store.search_similar(query, limit, filters)
+            return self.vector_store.search_similar(query, limit, filters, query_embedding)
         except Exception as e:
             logger.error(f"Semantic search failed: {str(e)}")
             return []
 
+    def hybrid_search(
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """混合搜索（全文检索 + 语义检索，倒数排名融合）"""
+        try:
+            candidates = max(limit, settings.HYBRID_CANDIDATE_POOL)
+            vector_results = self.vector_store.search_similar(query, candidates, filters, query_embedding)
+            lexical_results = self.vector_store.search_lexical(query, candidates, filters)
+            return self._fuse_results(vector_results, lexical_results, limit)
+        except Exception as e:
+            logger.error(f"Hybrid search failed: {str(e)}")
+            return []
+
+    async def ahybrid_search(
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """混合搜索（异步，两路检索并发执行，延迟约为较慢一路的耗时）"""
+        candidates = max(limit, settings.HYBRID_CANDIDATE_POOL)
+        vector_results, lexical_results = await asyncio.gather(
+            self.vector_store.asearch_similar(query, candidates, filters, query_embedding),
+            self.vector_store.asearch_lexical(query, candidates, filters),
+        )
+        return self._fuse_results(vector_results, lexical_results, limit)
+
+    def grouped_search(
+        self,
+        query: str,
+        groups: int,
+        group: GroupSpec,
+        filters: Optional[dict[str, Any]] = None,
+        search_type: SearchType = SearchType.SEMANTIC,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        分组检索前groups个组
+
+        语义检索由向量层逐步扩大召回直到组数足够；混合检索对融合后的候选池分组
+        """
+        if search_type == SearchType.HYBRID:
+            results = self.hybrid_search(query, self._hybrid_group_pool(groups, group), filters, query_embedding)
+            return flatten_groups(aggregate_groups(results, group), groups)
+        return self.vector_store.search_grouped(query, groups, group, filters, query_embedding)
+
+    async def agrouped_search(
+        self,
+        query: str,
+        groups: int,
+        group: GroupSpec,
+        filters: Optional[dict[str, Any]] = None,
+        search_type: SearchType = SearchType.SEMANTIC,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """分组检索前groups个组（异步）"""
+        if search_type == SearchType.HYBRID:
+            results = await self.ahybrid_search(query, self._hybrid_group_pool(groups, group), filters, query_embedding)
+            return flatten_groups(aggregate_groups(results, group), groups)
+        return await self.vector_store.asearch_grouped(query, groups, group, filters, query_embedding)
+
+    @staticmethod
+    def _hybrid_group_pool(groups: int, group: GroupSpec) -> int:
+        """混合检索分组时参与融合的候选数量"""
+        return max(groups * group.per_group * settings.GROUPED_SEARCH_INITIAL_FACTOR, settings.HYBRID_CANDIDATE_POOL)
+
+    def _fuse_results(
+        self, vector_results: list[dict[str, Any]], lexical_results: list[dict[str, Any]], limit: int
+    ) -> list[dict[str, Any]]:
+        """
+        倒数排名融合(RRF)
+
+        每个分块的融合分数为 Σ 1 / (k + 排名)，再除以两路都排第一时的最大值归一化到 [0, 1]，
+        使分数阈值过滤对混合检索同样适用
+        """
+        rrf_k = settings.HYBRID_RRF_K
+        max_score = 2.0 / (rrf_k + 1)
+        fused: dict[str, dict[str, Any]] = {}
+        scores: dict[str, float] = {}
+
+        for ranked_results in (vector_results, lexical_results):
+            for rank, result in enumerate(ranked_results, start=1):
+                chunk_id = result['id']
+                fused.setdefault(chunk_id, result)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+
+        ranked_ids = sorted(scores, key=lambda chunk_id: scores[chunk_id], reverse=True)[:limit]
+        return [{**fused[chunk_id], 'score': scores[chunk_id] / max_score} for chunk_id in ranked_ids]
+
+    def _rerank_enabled(self, rerank: Optional[bool]) -> bool:
+        """请求未指定时使用配置的默认值"""
+        return settings.RERANK_ENABLED if rerank is None else rerank
+
+    @staticmethod
+    def _candidate_limit(limit: int, rerank: bool) -> int:
+        """重排时召回更多候选，由交叉编码器从中挑选前limit个"""
+        return max(limit, settings.RERANK_CANDIDATES) if rerank else limit
+
+    @staticmethod
+    def _rerank_deadline() -> float:
+        return time.monotonic() + settings.RERANK_DEADLINE_MS / 1000
+
+    def _apply_rerank(
+        self, results: list[dict[str, Any]], reranked: Optional[list[dict[str, Any]]], limit: int, start: float
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """截取前limit个结果，重排失败或超时时保持原顺序；预算之外的候选按原顺序排在重排结果之后"""
+        rerank_info = {'reranked': reranked is not None, 'rerank_time': round(time.perf_counter() - start, 3)}
+        if reranked is None:
+            return results[:limit], rerank_info
+        return (reranked + results[len(reranked):])[:limit], rerank_info
+
+    def rerank_results(
+        self, query: str, results: list[dict[str, Any]], limit: int
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """
+        使用交叉编码器重排候选结果
+
+        Returns:
+            (前limit个结果, 重排信息)；超过截止时间或重排失败时按原顺序返回
+        """
+        start = time.perf_counter()
+        reranked = None
+        if results:
+            try:
+                reranked = get_model_registry().get_reranker().rerank(
+                    query, results[:settings.RERANK_CANDIDATES], self._rerank_deadline()
+                )
+            except Exception as e:
+                logger.error(f"Rerank failed, keeping vector order: {str(e)}")
+        return self._apply_rerank(results, reranked, limit, start)
+
+    async def arerank_results(
+        self, query: str, results: list[dict[str, Any]], limit: int
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """使用交叉编码器重排候选结果（异步，在推理池中打分）"""
+        start = time.perf_counter()
+        reranked = None
+        if results:
+            try:
+                reranked = await get_executor_pools().inference.run(
+                    get_model_registry().get_reranker().rerank,
+                    query,
+                    results[:settings.RERANK_CANDIDATES],
+                    self._rerank_deadline(),
+                )
+            except Exception as e:
+                # 推理池饱和同样降级为向量检索顺序，而不是拒绝整个搜索请求
+                logger.error(f"Rerank failed, keeping vector order: {str(e)}")
+        return self._apply_rerank(results, reranked, limit, start)
+
     def search(
         self,
         query: str,
         limit: int = 10,
         filters: Optional[dict[str, Any]] = None,
+        search_type: SearchType = SearchType.SEMANTIC,
+        rerank: Optional[bool] = None,
+        group: Optional[GroupSpec] = None,
+    ) -> dict[str, Any]:
+        """
+        搜索接口
+
+        Args:
+            query: 搜索查询
+            limit: 返回结果数量
+            filters: 过滤条件
+            search_type: 搜索类型（语义/混合）
+            rerank: 是否使用交叉编码器重排（None: 使用配置默认值）
+            group: 分组参数（如按文档分组），指定时limit为返回的组数
+
+        Returns:
+            搜索响应
+        """
+        start_time = time.time()
+        results, rerank_info = self._retrieve(query, limit, filters, search_type, rerank, group)
+        return self._build_response(query, results, start_time, search_type, rerank_info)
+
+    def _cache_key(
+        self,
+        generation: Optional[int],
+        query: str,
+        limit: int,
+        filters: Optional[dict[str, Any]],
+        search_type: SearchType,
+        use_rerank: bool,
+        group: Optional[GroupSpec] = None,
+    ) -> Optional[tuple[Any, ...]]:
+        """检索结果缓存键，未启用缓存或无法读取索引代数时返回None"""
+        if not settings.SEARCH_RESPONSE_CACHE_ENABLED or generation is None:
+            return None
+        return get_search_response_cache().make_key(
+            generation, query, limit, filters, search_type.value, use_rerank, group
+        )
+
+    def _store_cached(
+        self,
+        generation: Optional[int],
+        cache_key: Optional[tuple[Any, ...]],
+        semantic_key: Optional[tuple[Any, ...]],
+        query_embedding: Optional[list[float]],
+        value: tuple[list[dict[str, Any]], Optional[dict[str, Any]]],
+    ) -> None:
+        """将检索结果写入文本缓存和语义缓存"""
+        if cache_key is not None:
+            get_search_response_cache().put(cache_key, value)
+        if semantic_key is not None and query_embedding is not None and generation is not None and is_cacheable(value):
+            get_model_registry().get_semantic_query_cache().put(generation, semantic_key, query_embedding, value)
+
+    def _semantic_lookup(
+        self, generation: int, semantic_key: tuple[Any, ...], query_embedding: list[float]
+    ) -> Optional[tuple[list[dict[str, Any]], Optional[dict[str, Any]]]]:
+        """在语义缓存中查找措辞相近、检索参数相同的查询"""
+        hit = get_model_registry().get_semantic_query_cache().get(generation, semantic_key, query_embedding)
+        if hit is None:
+            return None
+        value, similarity = hit
+        logger.debug(f"Semantic cache hit (similarity {similarity:.4f})")
+        return value
+
+    def _retrieve(
+        self,
+        query: str,
+        limit: int,
+        filters: Optional[dict[str, Any]],
+        search_type: SearchType,
+        rerank: Optional[bool],
+        group: Optional[GroupSpec] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+        """
+        检索（可选重排）前limit个结果（指定分组时为前limit个组），返回 (结果, 重排信息)
+
+        索引未变化时，相同请求命中文本缓存；启用语义缓存时，措辞相近的请求命中语义缓存
+        """
+        use_rerank = self._rerank_enabled(rerank)
+        generation = self.vector_store.current_generation()
+        cache_key = self._cache_key(generation, query, limit, filters, search_type, use_rerank, group)
+        if cache_key is not None:
+            cached = get_search_response_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        query_embedding = None
+        semantic_key = None
+        if settings.SEMANTIC_CACHE_ENABLED and generation is not None:
+            try:
+                query_embedding = self.vector_store.encode_query(query)
+            except Exception as e:
+                logger.error(f"Failed to encode query for semantic cache: {str(e)}")
+            if query_embedding is not None:
+                semantic_key = retrieval_params_key(limit, filters, search_type.value, use_rerank, group)
+                cached = self._semantic_lookup(generation, semantic_key, query_embedding)
+                if cached is not None:
+                    return cached
+
+        candidates = self._candidate_limit(limit, use_rerank)
+        if group is not None:
+            try:
+                results = self.grouped_search(query, candidates, group, filters, search_type, query_embedding)
+            except Exception as e:
+                logger.error(f"Grouped search ({search_type.value}) failed: {str(e)}")
+                results = []
+        elif search_type == SearchType.HYBRID:
+            results = self.hybrid_search(query, candidates, filters, query_embedding)
+        else:
+            results = self.semantic_search(query, candidates, filters, query_embedding)
+
+        rerank_info = None
+        if use_rerank:
+            if group is not None:
+                results, rerank_info = self.rerank_results(query, results, len(results))
+                results = take_groups(results, group, limit)
+            else:
+                results, rerank_info = self.rerank_results(query, results, limit)
+
+        self._store_cached(generation, cache_key, semantic_key, query_embedding, (results, rerank_info))
+        return results, rerank_info
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[dict[str, Any]] = None,
+        search_type: SearchType = SearchType.SEMANTIC,
+        rerank: Optional[bool] = None,
+        group: Optional[GroupSpec] = None,
     ) -> dict[str, Any]:
         """
-        语义搜索接口
+        搜索接口（异步，编码和ChromaDB查询均不阻塞事件循环）
 
         Args:
             query: 搜索查询
             limit: 返回结果数量
             filters: 过滤条件
+            search_type: 搜索类型（语义/混合）
+            rerank: 是否使用交叉编码器重排（None: 使用配置默认值）
+            group: 分组参数（如按文档分组），指定时limit为返回的组数
 
         Returns:
             搜索响应
         """
         start_time = time.time()
+        results, rerank_info = await self._aretrieve(query, limit, filters, search_type, rerank, group)
+        return self._build_response(query, results, start_time, search_type, rerank_info)
+
+    async def _aretrieve(
+        self,
+        query: str,
+        limit: int,
+        filters: Optional[dict[str, Any]],
+        search_type: SearchType,
+        rerank: Optional[bool],
+        group: Optional[GroupSpec] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+        """异步检索（可选重排）前limit个结果，缓存规则同 _retrieve"""
+        use_rerank = self._rerank_enabled(rerank)
+        generation = None
+        if settings.SEARCH_RESPONSE_CACHE_ENABLED or settings.SEMANTIC_CACHE_ENABLED:
+            generation = await get_executor_pools().io.run(self.vector_store.current_generation)
+        cache_key = self._cache_key(generation, query, limit, filters, search_type, use_rerank, group)
+        if cache_key is not None:
+            cached = get_search_response_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        query_embedding = None
+        semantic_key = None
+        try:
+            if settings.SEMANTIC_CACHE_ENABLED and generation is not None:
+                query_embedding = await self.vector_store.aencode_query(query)
+                semantic_key = retrieval_params_key(limit, filters, search_type.value, use_rerank, group)
+                cached = self._semantic_lookup(generation, semantic_key, query_embedding)
+                if cached is not None:
+                    return cached
+
+            candidates = self._candidate_limit(limit, use_rerank)
+            if group is not None:
+                results = await self.agrouped_search(query, candidates, group, filters, search_type, query_embedding)
+            elif search_type == SearchType.HYBRID:
+                results = await self.ahybrid_search(query, candidates, filters, query_embedding)
+            else:
+                results = await self.vector_store.asearch_similar(query, candidates, filters, query_embedding)
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Search ({search_type.value}) failed: {str(e)}")
+            results = []
+
+        rerank_info = None
+        if use_rerank:
+            if group is not None:
+                results, rerank_info = await self.arerank_results(query, results, len(results))
+                results = take_groups(results, group, limit)
+            else:
+                results, rerank_info = await self.arerank_results(query, results, limit)
+
+        self._store_cached(generation, cache_key, semantic_key, query_embedding, (results, rerank_info))
+        return results, rerank_info
+
+    async def asearch_page(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        filters: Optional[dict[str, Any]] = None,
+        search_type: SearchType = SearchType.SEMANTIC,
+        rerank: Optional[bool] = None,
+        min_score: float = 0.0,
+        cursor: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        分页搜索接口（游标分页）
+
+        首页检索 SEARCH_CURSOR_WINDOW 个结果并缓存排序后的 (分块ID, 分数)，
+        携带 next_cursor 的后续请求只按ID取回下一页分块，不再编码查询和检索
+
+        Args:
+            query: 搜索查询
+            limit: 每页结果数量
+            offset: 首页偏移量（携带游标时忽略）
+            filters: 过滤条件
+            search_type: 搜索类型（语义/混合）
+            rerank: 是否使用交叉编码器重排（None: 使用配置默认值）
+            min_score: 最小相似度阈值
+            cursor: 上一页返回的 next_cursor（查询、过滤条件、搜索类型、重排和阈值须与首页一致）
+
+        Returns:
+            搜索响应（total为完整排序列表的结果数，另含 next_cursor）
+
+        Raises:
+            InvalidCursorError: 游标无法解析或与请求参数不一致
+        """
+        start_time = time.time()
+        cache = get_search_result_cache()
+
+        if cursor is not None:
+            state = SearchCursor.decode(cursor)
+            state.check_request(query, filters, search_type.value, rerank, min_score)
+            ranked = cache.get(state.result_set_id)
+            if ranked is None:
+                # 缓存过期或由其他工作进程生成：按游标中的参数重新检索
+                ranked, _, _ = await self._aretrieve_ranked(
+                    query, state.offset + limit, state.filters, search_type, state.rerank, state.min_score
+                )
+                cache.put(ranked, state.result_set_id)
+            page = await self.vector_store.ahydrate_results(ranked[state.offset:state.offset + limit])
+            rerank_info = None
+        else:
+            ranked, results, rerank_info = await self._aretrieve_ranked(
+                query, offset + limit, filters, search_type, rerank, min_score
+            )
+            state = SearchCursor(
+                result_set_id=cache.put(ranked),
+                offset=offset,
+                query=query,
+                filters=filters,
+                search_type=search_type.value,
+                rerank=rerank,
+                min_score=min_score,
+            )
+            page = results[offset:offset + limit]
+
+        response = self._build_response(query, page, start_time, search_type, rerank_info)
+        response['total'] = len(ranked)
+        next_offset = state.offset + limit
+        if next_offset < len(ranked):
+            state.offset = next_offset
+            response['next_cursor'] = state.encode()
+        return response
+
+    async def _aretrieve_ranked(
+        self,
+        query: str,
+        min_results: int,
+        filters: Optional[dict[str, Any]],
+        search_type: SearchType,
+        rerank: Optional[bool],
+        min_score: float,
+    ) -> tuple[list[tuple[str, float]], list[dict[str, Any]], Optional[dict[str, Any]]]:
+        """检索分页窗口，返回 (排序后的分块ID与分数, 过滤后的结果, 重排信息)"""
+        window = max(min_results, settings.SEARCH_CURSOR_WINDOW)
+        results, rerank_info = await self._aretrieve(query, window, filters, search_type, rerank)
+        threshold = max(min_score, self.config.min_score_threshold)
+        results = [result for result in results if result['score'] >= threshold]
+        return [(result['id'], result['score']) for result in results], results, rerank_info
+
+    def search_many(self, requests: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        批量语义搜索接口（所有查询一次编码，相同过滤条件合并查询）
+
+        Args:
+            requests: 搜索请求列表，每项包含 query、limit（默认10）、filters（可选）
 
+        Returns:
+            与requests一一对应的搜索响应
+        """
+        start_time = time.time()
+        queries, limits, filters = self._unpack_requests(requests)
         try:
-            # 使用语义搜索
-            results = self.semantic_search(query, limit, filters)
+            results = self.vector_store.search_similar_many(queries, limits, filters)
+        except Exception as e:
+            logger.error(f"Batch semantic search failed: {str(e)}")
+            results = [[] for _ in queries]
+        return [self._build_response(query, query_results, start_time) for query, query_results in zip(queries, results)]
 
+    async def asearch_many(self, requests: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        批量语义搜索接口（异步）
+
+        Args:
+            requests: 搜索请求列表，每项包含 query、limit（默认10）、filters（可选）
+
+        Returns:
+            与requests一一对应的搜索响应
+        """
+        start_time = time.time()
+        queries, limits, filters = self._unpack_requests(requests)
+        try:
+            results = await self.vector_store.asearch_similar_many(queries, limits, filters)
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Batch semantic search failed: {str(e)}")
+            results = [[] for _ in queries]
+        return [self._build_response(query, query_results, start_time) for query, query_results in zip(queries, results)]
+
+    @staticmethod
+    def _unpack_requests(
+        requests: list[dict[str, Any]]
+    ) -> tuple[list[str], list[int], list[Optional[dict[str, Any]]]]:
+        """拆分批量请求为查询、数量和过滤条件列表"""
+        queries = [request['query'] for request in requests]
+        limits = [request.get('limit', 10) for request in requests]
+        filters = [request.get('filters') for request in requests]
+        return queries, limits, filters
+
+    def _build_response(
+        self,
+        query: str,
+        results: list[dict[str, Any]],
+        start_time: float,
+        search_type: SearchType = SearchType.SEMANTIC,
+        rerank_info: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        """过滤低分结果并格式化为标准搜索响应"""
+        try:
             processing_time = time.time() - start_time
 
             # 格式化为标准响应格式，并过滤低分结果
@@ -87,15 +591,20 @@ class SearchEngine:
                     'metadata': result['metadata'],
                     'highlight': [],  # 向量搜索不提供高亮
                 }
+                if 'group_score' in result:
+                    formatted_result['group_score'] = result['group_score']
                 formatted_results.append(formatted_result)
 
-            return {
+            response = {
                 'total': len(formatted_results),
                 'results': formatted_results,
                 'query': query,
-                'search_type': 'semantic',
+                'search_type': search_type.value,
                 'processing_time': round(processing_time, 3),
             }
+            if rerank_info is not None:
+                response.update(rerank_info)
+            return response
 
         except Exception as e:
             logger.error(f"Search failed for query '{query}': {str(e)}")
@@ -103,7 +612,7 @@ class SearchEngine:
                 'total': 0,
                 'results': [],
                 'query': query,
-                'search_type': 'semantic',
+                'search_type': search_type.value,
                 'processing_time': time.time() - start_time,
                 'error': str(e),
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,125 @@
+"""
+语义查询缓存
+
+代理会用多种措辞提出同一个问题（"阿里云ALB和腾讯云CLB对比" / "对比一下腾讯云CLB与阿里云ALB"），
+规范化文本后仍不相同，无法命中按文本键控的检索结果缓存。语义缓存保存最近查询的向量，
+新查询与某条缓存查询的余弦相似度超过阈值、且过滤条件等检索参数完全一致时，直接复用其检索结果。
+
+最近查询数量有限（默认2048条），向量保存在预分配的环形矩阵中，查找是一次矩阵向量乘积，
+在该规模下比维护近似图更快且结果精确。缓存条目属于某个索引代数，代数变化（集合有写入）时全部失效
+"""
+
+import logging
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticQueryCache:
+    """基于查询向量相似度的检索结果缓存（线程安全）"""
+
+    def __init__(self, dimension: int, max_entries: int = 2048, threshold: float = 0.95) -> None:
+        """
+        初始化语义缓存
+
+        Args:
+            dimension: 查询向量维度
+            max_entries: 最多保存的查询数量（环形覆盖最早的条目）
+            threshold: 命中所需的最小余弦相似度
+        """
+        self.dimension = dimension
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((self.max_entries, dimension), dtype=np.float32)
+        self._key_codes = np.full(self.max_entries, -1, dtype=np.int64)
+        self._values: list[Any] = [None] * self.max_entries
+        self._key_to_code: dict[tuple[Any, ...], int] = {}
+        self._size = 0
+        self._next_slot = 0
+        self._generation: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _sync_generation_locked(self, generation: int) -> None:
+        """索引代数变化时清空所有条目"""
+        if generation == self._generation:
+            return
+        if self._size:
+            self.invalidations += 1
+        self._key_codes[:] = -1
+        self._values = [None] * self.max_entries
+        self._key_to_code = {}
+        self._size = 0
+        self._next_slot = 0
+        self._generation = generation
+
+    @staticmethod
+    def _normalize(embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def get(self, generation: int, key: tuple[Any, ...], embedding: Any) -> Optional[tuple[Any, float]]:
+        """
+        查找相似查询的缓存结果
+
+        Args:
+            generation: 当前索引代数
+            key: 检索参数（过滤条件、数量、搜索类型等），必须完全一致
+            embedding: 查询向量
+
+        Returns:
+            (缓存值, 余弦相似度)，未命中时返回None
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            self._sync_generation_locked(generation)
+            code = self._key_to_code.get(key)
+            if code is None or not self._size:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[:self._size] @ query
+            similarities[self._key_codes[:self._size] != code] = -1.0
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return self._values[best], similarity
+
+    def put(self, generation: int, key: tuple[Any, ...], embedding: Any, value: Any) -> None:
+        """写入缓存（满时覆盖最早写入的条目）"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._sync_generation_locked(generation)
+            code = self._key_to_code.setdefault(key, len(self._key_to_code))
+            slot = self._next_slot
+            self._vectors[slot] = vector
+            self._key_codes[slot] = code
+            self._values[slot] = value
+            self._next_slot = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': self._size,
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'generation': self._generation,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
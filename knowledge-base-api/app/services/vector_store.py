@@ -2,49 +2,100 @@
 向量存储服务
 """
 
+import asyncio
+import hashlib
 import logging
 import math
-from typing import Any, Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
 
-import chromadb
-from chromadb.api.models.Collection import Collection
-from chromadb.config import Settings
-from FlagEmbedding import FlagModel
+import numpy as np
 
 from app.core.config import get_settings
+from app.core.executors import ExecutorBusyError, get_executor_pools
+from app.services.exact_index import ExactVectorIndex
+from app.services.grouping import GroupSpec, aggregate_groups, flatten_groups
+from app.services.hnsw_config import apply_search_params, collection_space, distance_to_squared_l2, hnsw_metadata
+from app.services.index_generation import IndexGeneration
+from app.services.lexical_index import LexicalIndex
+from app.services.model_registry import EmbeddingModel, get_model_registry
+from app.services.partitioned_index import PartitionRouter
+from app.services.query_embedding_cache import QueryEmbeddingCache, normalize_query
+
+if TYPE_CHECKING:
+    import chromadb
+    from chromadb.api.models.Collection import Collection
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+def make_chunk_id(document_id: int, chunk_index: int) -> str:
+    """生成分块在向量库中的ID"""
+    return f"doc_{document_id}_chunk_{chunk_index}"
+
+
+def chunk_content_hash(content: str) -> str:
+    """分块内容哈希（保存在分块元数据中，用于更新时判断分块是否变化）"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChunkUpdatePlan:
+    """文档更新时新旧分块的差异（位置均指新分块列表中的下标）"""
+
+    document_id: int
+    ids: list[str]
+    texts: list[str]
+    metadatas: list[dict[str, Any]]
+    changed: list[int] = field(default_factory=list)       # 内容在旧分块中不存在，需要重新编码
+    relabeled: list[int] = field(default_factory=list)     # 同一ID内容未变、元数据变化
+    moved: dict[int, str] = field(default_factory=dict)    # 内容与另一旧分块相同，复用该分块的向量
+    removed_ids: list[str] = field(default_factory=list)   # 新切分中不再存在的分块
+    previous_metadatas: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def changed_texts(self) -> list[str]:
+        return [self.texts[i] for i in self.changed]
+
+    @property
+    def unchanged(self) -> int:
+        return len(self.ids) - len(self.changed) - len(self.relabeled) - len(self.moved)
+
+
+def parse_chunk_id(chunk_id: str) -> Optional[tuple[int, int]]:
+    """解析分块ID，返回 (文档ID, 分块序号)，格式不符时返回None"""
+    prefix, _, rest = chunk_id.partition("doc_")
+    document_part, _, index_part = rest.partition("_chunk_")
+    if prefix or not document_part.isdigit() or not index_part.isdigit():
+        return None
+    return int(document_part), int(index_part)
+
+
 class VectorStore:
     """向量存储管理器"""
 
     def __init__(self) -> None:
-        self.client: Optional[chromadb.ClientAPI] = None
-        self.collection: Optional[Collection] = None
-        self.embedding_model: Optional[FlagModel] = None
+        self.client: Optional["chromadb.ClientAPI"] = None
+        self.collection: Optional["Collection"] = None
+        self.embedding_model: Optional[EmbeddingModel] = None
+        self.exact_index: Optional[ExactVectorIndex] = None
+        self.partition_router: Optional[PartitionRouter] = None
+        self.lexical_index: Optional[LexicalIndex] = None
+        self.generation: Optional[IndexGeneration] = None
         self._initialize()
 
     def _initialize(self) -> None:
         """初始化向量存储"""
         try:
-            # 初始化ChromaDB客户端
-            self.client = chromadb.PersistentClient(
-                path=settings.CHROMA_PERSIST_DIRECTORY,
-                settings=Settings(anonymized_telemetry=False, allow_reset=True),
-            )
+            registry = get_model_registry()
+
+            # 使用注册表中共享的ChromaDB客户端和嵌入模型
+            self.client = registry.get_chroma_client()
+            self.embedding_model = registry.get_embedding_model()
 
-            # 立即加载嵌入模型，确保健康检查能正确识别
-            logger.info("Loading embedding model...")
-            self.embedding_model = FlagModel(
-                settings.EMBEDDING_MODEL, 
-                query_instruction_for_retrieval="为这个句子生成表示以用于检索相关文章："
-            )
-            
             # 获取模型的向量维度
-            test_embedding = self.embedding_model.encode(["test"]).tolist()[0]
-            embedding_dimension = len(test_embedding)
+            embedding_dimension = registry.embedding_dimension
             logger.info(f"Embedding model dimension: {embedding_dimension}")
             
             # 尝试获取现有集合
@@ -71,14 +122,7 @@ class VectorStore:
                                 )
                                 # 删除旧集合并创建新的
                                 self.client.delete_collection("knowledge_base")
-                                self.collection = self.client.create_collection(
-                                    name="knowledge_base", 
-                                    metadata={
-                                        "description": "Knowledge base document chunks",
-                                        "embedding_model": settings.EMBEDDING_MODEL,
-                                        "embedding_dimension": embedding_dimension
-                                    }
-                                )
+                                self.collection = self._create_collection(embedding_dimension)
                                 logger.info(f"Created new collection with dimension {embedding_dimension}")
                     except Exception as check_error:
                         logger.warning(f"Could not check existing dimension: {str(check_error)}. Continuing with existing collection.")
@@ -86,17 +130,36 @@ class VectorStore:
             except Exception as e:
                 # 集合不存在，创建新的
                 if not collection_exists:
-                    self.collection = self.client.create_collection(
-                        name="knowledge_base", 
-                        metadata={
-                            "description": "Knowledge base document chunks",
-                            "embedding_model": settings.EMBEDDING_MODEL,
-                            "embedding_dimension": embedding_dimension
-                        }
-                    )
+                    self.collection = self._create_collection(embedding_dimension)
                     logger.info(f"Created new collection 'knowledge_base' with dimension {embedding_dimension}")
                 else:
                     raise
+
+            # 已存在集合按配置调整ef_search（构建参数不一致时仅告警）
+            if collection_exists and self.collection is not None:
+                apply_search_params(self.collection, "knowledge_base")
+
+            # 进程内精确索引镜像（启动后由 build_exact_index 全量构建）
+            if settings.EXACT_INDEX_ENABLED:
+                self.exact_index = ExactVectorIndex(
+                    directory=settings.EXACT_INDEX_DIR,
+                    dimension=embedding_dimension,
+                    dtype=settings.EXACT_INDEX_DTYPE,
+                )
+
+            # 按 (provider, category) 分区的子索引（与全局集合不一致时由 sync_partitions 补齐）
+            if settings.VECTOR_PARTITIONS_ENABLED and self.collection is not None:
+                self.partition_router = PartitionRouter(self.client)
+                self.partition_router.load(self.collection)
+
+            from app.core.database import engine
+
+            # 索引代数计数器（每次写入后递增，用于检索结果缓存失效）
+            self.generation = IndexGeneration(engine)
+
+            # SQLite FTS5全文索引（混合检索的词法通道）
+            if settings.LEXICAL_INDEX_ENABLED:
+                self.lexical_index = LexicalIndex(engine)
             
             logger.info(f"Vector store initialized successfully with embedding model: {settings.EMBEDDING_MODEL}")
 
@@ -104,20 +167,142 @@ class VectorStore:
             logger.error(f"Failed to initialize vector store: {str(e)}")
             raise
 
+    def _create_collection(self, embedding_dimension: int) -> "Collection":
+        """按配置的HNSW参数创建 knowledge_base 集合"""
+        if self.client is None:
+            raise RuntimeError("Client not available")
+        return self.client.create_collection(
+            name="knowledge_base",
+            metadata={
+                "description": "Knowledge base document chunks",
+                "embedding_model": settings.EMBEDDING_MODEL,
+                "embedding_dimension": embedding_dimension,
+                **hnsw_metadata("knowledge_base"),
+            },
+        )
+
     def _ensure_embedding_model(self) -> None:
-        """惰性加载嵌入模型"""
+        """从注册表获取共享的嵌入模型"""
         if self.embedding_model is None:
-            try:
-                self.embedding_model = FlagModel(
-                    settings.EMBEDDING_MODEL, 
-                    query_instruction_for_retrieval="为这个句子生成表示以用于检索相关文章："
-                )
-                logger.info("Embedding model loaded successfully")
-            except Exception as e:
-                logger.error(
-                    f"Failed to load embedding model '{settings.EMBEDDING_MODEL}': {str(e)}"
-                )
-                raise
+            self.embedding_model = get_model_registry().get_embedding_model()
+
+    def _get_query_cache(self) -> Optional[QueryEmbeddingCache]:
+        """获取查询向量缓存（未启用时返回None）"""
+        if not settings.QUERY_EMBEDDING_CACHE_ENABLED:
+            return None
+        return get_model_registry().get_query_embedding_cache()
+
+    def _encode_query_with_model(self, normalized_query: str) -> np.ndarray:
+        """不经过微批处理器，直接用模型编码单条查询"""
+        self._ensure_embedding_model()
+        if self.embedding_model is None:
+            raise RuntimeError("Embedding model not available")
+        return self.embedding_model.encode([normalized_query])[0]
+
+    def _encode_query(self, query: str) -> list[float]:
+        """
+        生成单条查询的向量
+
+        先查询向量缓存；未命中时经由微批处理器（启用时）合并并发请求编码
+        """
+        normalized_query = normalize_query(query)
+
+        cache = self._get_query_cache()
+        if cache is not None:
+            cached = cache.get(normalized_query)
+            if cached is not None:
+                return cached.tolist()
+
+        if settings.EMBEDDING_BATCHING_ENABLED:
+            embedding = get_model_registry().get_query_batcher().encode(normalized_query)
+        else:
+            embedding = self._encode_query_with_model(normalized_query)
+
+        if cache is not None:
+            cache.put(normalized_query, embedding)
+        return embedding.tolist()
+
+    async def _aencode_query(self, query: str) -> list[float]:
+        """
+        异步生成单条查询的向量
+
+        微批处理器本身运行在独立线程中，直接等待其Future而不占用推理池线程，
+        这样并发查询仍能被合并成批；未启用微批时在推理池中编码
+        """
+        normalized_query = normalize_query(query)
+
+        cache = self._get_query_cache()
+        if cache is not None:
+            cached = cache.get(normalized_query)
+            if cached is not None:
+                return cached.tolist()
+
+        if settings.EMBEDDING_BATCHING_ENABLED:
+            embedding = await asyncio.wrap_future(get_model_registry().get_query_batcher().submit(normalized_query))
+        else:
+            embedding = await get_executor_pools().inference.run(self._encode_query_with_model, normalized_query)
+
+        if cache is not None:
+            cache.put(normalized_query, embedding)
+        return embedding.tolist()
+
+    def _encode_queries(self, queries: list[str]) -> list[list[float]]:
+        """
+        批量生成查询向量
+
+        缓存未命中的查询（去重后）在一次模型encode调用中编码，不经过微批处理器
+        """
+        normalized_queries = [normalize_query(query) for query in queries]
+        embeddings: dict[str, Any] = {}
+
+        cache = self._get_query_cache()
+        if cache is not None:
+            for normalized_query in normalized_queries:
+                cached = cache.get(normalized_query)
+                if cached is not None:
+                    embeddings[normalized_query] = cached
+
+        misses = list(dict.fromkeys(query for query in normalized_queries if query not in embeddings))
+        if misses:
+            self._ensure_embedding_model()
+            if self.embedding_model is None:
+                raise RuntimeError("Embedding model not available")
+            for normalized_query, embedding in zip(misses, self.embedding_model.encode(misses)):
+                embeddings[normalized_query] = embedding
+                if cache is not None:
+                    cache.put(normalized_query, embedding)
+
+        return [embeddings[normalized_query].tolist() for normalized_query in normalized_queries]
+
+    def _encode_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        生成文档分块向量
+
+        启用分块向量缓存时，只有内容哈希未命中的分块才会送入模型编码；
+        编码时按token长度分桶组批，控制padding和单批内存
+        """
+        registry = get_model_registry()
+        encoder = registry.get_document_encoder()
+
+        if not settings.CHUNK_EMBEDDING_CACHE_ENABLED:
+            return encoder.encode(texts).tolist()
+
+        cache = registry.get_chunk_embedding_cache()
+        cached = cache.get_many(texts)
+        miss_positions = [i for i, vector in enumerate(cached) if vector is None]
+
+        if miss_positions:
+            miss_texts = [texts[i] for i in miss_positions]
+            miss_embeddings = encoder.encode(miss_texts)
+            cache.put_many(miss_texts, miss_embeddings)
+            for position, vector in zip(miss_positions, miss_embeddings):
+                cached[position] = vector
+
+        logger.info(
+            f"Encoded {len(texts)} chunks ({len(texts) - len(miss_positions)} from cache, "
+            f"{len(miss_positions)} by model)"
+        )
+        return [vector.tolist() for vector in cached]
 
     def add_document(
         self, document_id: int, chunks: list[dict[str, Any]], metadata: Optional[dict[str, Any]] = None
@@ -138,75 +323,219 @@ class VectorStore:
                 logger.warning(f"No chunks to add for document {document_id}")
                 return True
 
-            # 记录传入的元数据
-            logger.info(f"Adding document {document_id} with metadata: provider='{metadata.get('provider') if metadata else None}', category='{metadata.get('category') if metadata else None}'")
+            texts, ids, metadatas = self._build_chunk_records(document_id, chunks, metadata)
 
-            # 准备数据
-            texts = []
-            ids = []
-            metadatas = []
+            # 生成嵌入向量（内容未变的分块直接使用缓存）
+            embeddings = self._encode_documents(texts)
 
-            for chunk in chunks:
-                chunk_id = f"doc_{document_id}_chunk_{chunk['chunk_index']}"
+            self._write_chunks(ids, texts, embeddings, metadatas)
 
-                # 文本内容
-                texts.append(chunk['content'])
-                ids.append(chunk_id)
+            logger.info(f"Added {len(chunks)} chunks for document {document_id} to vector store")
+            return True
 
-                # 元数据
-                chunk_metadata = {
-                    'document_id': document_id,
-                    'chunk_index': chunk['chunk_index'],
-                    'start_pos': chunk['start_pos'],
-                    'end_pos': chunk['end_pos'],
-                    'word_count': chunk['word_count'],
-                }
+        except Exception as e:
+            logger.error(f"Failed to add document {document_id} to vector store: {str(e)}")
+            return False
 
-                # 添加文档级别的元数据
-                if metadata:
-                    chunk_metadata.update(
-                        {
-                            'title': metadata.get('title', ''),
-                            'provider': metadata.get('provider', ''),
-                            'category': metadata.get('category', ''),
-                            'source_url': metadata.get('source_url', ''),
-                            'filename': metadata.get('filename', ''),
-                        }
-                    )
+    async def aadd_document(
+        self, document_id: int, chunks: list[dict[str, Any]], metadata: Optional[dict[str, Any]] = None
+    ) -> bool:
+        """
+        异步添加文档到向量存储（编码在推理池、写入在I/O池中执行）
 
-                metadatas.append(chunk_metadata)
-            
-            # 记录第一个chunk的元数据用于调试
-            if metadatas:
-                logger.info(f"First chunk metadata: provider='{metadatas[0].get('provider')}', category='{metadatas[0].get('category')}')")
+        Args:
+            document_id: 文档ID
+            chunks: 文档块列表
+            metadata: 文档元数据
 
-            # 生成嵌入向量（惰性加载模型）
-            self._ensure_embedding_model()
-            if self.embedding_model is None:
-                raise RuntimeError("Embedding model not available")
-            embeddings = self.embedding_model.encode(texts).tolist()
+        Returns:
+            是否成功添加
+        """
+        try:
+            if not chunks:
+                logger.warning(f"No chunks to add for document {document_id}")
+                return True
 
-            # 添加到集合
-            if self.collection is None:
-                raise RuntimeError("Collection not available")
-            # 类型转换以兼容ChromaDB的类型要求
-            metadatas_typed = [dict(meta) for meta in metadatas]
-            self.collection.add(
-                embeddings=embeddings, 
-                documents=texts, 
-                metadatas=metadatas_typed,  # type: ignore
-                ids=ids
-            )
+            embeddings = await self.aencode_chunks([chunk['content'] for chunk in chunks])
+            await self.aindex_chunks(document_id, chunks, embeddings, metadata)
 
             logger.info(f"Added {len(chunks)} chunks for document {document_id} to vector store")
             return True
 
+        except ExecutorBusyError:
+            raise
         except Exception as e:
             logger.error(f"Failed to add document {document_id} to vector store: {str(e)}")
             return False
 
+    def encode_chunks(self, texts: list[str]) -> list[list[float]]:
+        """编码分块文本（内容未变的分块直接使用缓存）"""
+        return self._encode_documents(texts)
+
+    def index_documents(
+        self, documents: list[tuple[int, list[dict[str, Any]], list[list[float]], Optional[dict[str, Any]]]]
+    ) -> None:
+        """
+        一次写入多个文档的已编码分块（批量入库使用，写入失败时抛出异常）
+
+        Args:
+            documents: (文档ID, 分块列表, 分块向量, 文档元数据) 列表
+        """
+        all_ids: list[str] = []
+        all_texts: list[str] = []
+        all_embeddings: list[list[float]] = []
+        all_metadatas: list[dict[str, Any]] = []
+        for document_id, chunks, embeddings, metadata in documents:
+            texts, ids, metadatas = self._build_chunk_records(document_id, chunks, metadata)
+            all_ids.extend(ids)
+            all_texts.extend(texts)
+            all_embeddings.extend(embeddings)
+            all_metadatas.extend(metadatas)
+        if all_ids:
+            self._write_chunks(all_ids, all_texts, all_embeddings, all_metadatas)
+
+    async def aencode_chunks(self, texts: list[str]) -> list[list[float]]:
+        """在推理池中编码分块文本（内容未变的分块直接使用缓存）"""
+        return await get_executor_pools().inference.run(self._encode_documents, texts)
+
+    async def aindex_chunks(
+        self,
+        document_id: int,
+        chunks: list[dict[str, Any]],
+        embeddings: list[list[float]],
+        metadata: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """在I/O池中写入已编码的分块（写入失败时抛出异常）"""
+        texts, ids, metadatas = self._build_chunk_records(document_id, chunks, metadata)
+        await get_executor_pools().io.run(self._write_chunks, ids, texts, embeddings, metadatas)
+
+    def _build_chunk_records(
+        self, document_id: int, chunks: list[dict[str, Any]], metadata: Optional[dict[str, Any]]
+    ) -> tuple[list[str], list[str], list[dict[str, Any]]]:
+        """生成分块的文本、ID和元数据"""
+        # 记录传入的元数据
+        logger.info(f"Adding document {document_id} with metadata: provider='{metadata.get('provider') if metadata else None}', category='{metadata.get('category') if metadata else None}'")
+
+        # 准备数据
+        texts = []
+        ids = []
+        metadatas = []
+
+        for chunk in chunks:
+            chunk_id = make_chunk_id(document_id, chunk['chunk_index'])
+
+            # 文本内容
+            texts.append(chunk['content'])
+            ids.append(chunk_id)
+
+            # 元数据
+            chunk_metadata = {
+                'document_id': document_id,
+                'chunk_index': chunk['chunk_index'],
+                'start_pos': chunk['start_pos'],
+                'end_pos': chunk['end_pos'],
+                'word_count': chunk['word_count'],
+                'content_hash': chunk_content_hash(chunk['content']),
+            }
+
+            # 添加文档级别的元数据
+            if metadata:
+                chunk_metadata.update(
+                    {
+                        'title': metadata.get('title', ''),
+                        'provider': metadata.get('provider', ''),
+                        'category': metadata.get('category', ''),
+                        'source_url': metadata.get('source_url', ''),
+                        'filename': metadata.get('filename', ''),
+                    }
+                )
+
+            metadatas.append(chunk_metadata)
+        
+        # 记录第一个chunk的元数据用于调试
+        if metadatas:
+            logger.info(f"First chunk metadata: provider='{metadatas[0].get('provider')}', category='{metadatas[0].get('category')}')")
+
+        return texts, ids, metadatas
+
+    def _write_chunks(
+        self, ids: list[str], texts: list[str], embeddings: list[list[float]], metadatas: list[dict[str, Any]]
+    ) -> None:
+        """将分块写入集合"""
+        if self.collection is None:
+            raise RuntimeError("Collection not available")
+        # 类型转换以兼容ChromaDB的类型要求
+        metadatas_typed = [dict(meta) for meta in metadatas]
+        try:
+            self.collection.add(
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=metadatas_typed,  # type: ignore
+                ids=ids
+            )
+            if self.partition_router is not None:
+                self.partition_router.add(ids, texts, embeddings, metadatas_typed)
+            if self.lexical_index is not None:
+                self.lexical_index.add(ids, texts, metadatas_typed)
+            if self.exact_index is not None:
+                self.exact_index.add(ids, embeddings, metadatas_typed)
+        finally:
+            self._bump_generation()
+
+    def _bump_generation(self) -> None:
+        """写入完成后递增索引代数（部分写入失败时同样递增，宁可多失效一次缓存）"""
+        if self.generation is None:
+            return
+        try:
+            self.generation.bump()
+        except Exception as e:
+            logger.error(f"Failed to bump index generation: {str(e)}")
+
+    def current_generation(self) -> Optional[int]:
+        """当前索引代数，读取失败时返回None（调用方应跳过缓存）"""
+        if self.generation is None:
+            return None
+        try:
+            return self.generation.current()
+        except Exception as e:
+            logger.error(f"Failed to read index generation: {str(e)}")
+            return None
+
+    def build_exact_index(self) -> None:
+        """从集合全量构建进程内精确索引（未启用时不执行）"""
+        if self.exact_index is None or self.collection is None:
+            return
+        self.exact_index.build_from_collection(self.collection)
+
+    def sync_partitions(self) -> None:
+        """分区子索引与全局集合不一致时从全局集合重建（未启用时不执行）"""
+        if self.partition_router is None or self.collection is None or self.partition_router.is_ready():
+            return
+        self.partition_router.backfill(self.collection)
+
+    def sync_lexical_index(self) -> None:
+        """全文索引分块数与集合不一致时从集合重建（未启用时不执行）"""
+        if self.lexical_index is None or self.collection is None:
+            return
+        if self.lexical_index.count() != self.collection.count():
+            self.lexical_index.backfill(self.collection)
+            # 重建期间全文检索结果可能不完整，使缓存的检索结果失效
+            self._bump_generation()
+
+    def encode_query(self, query: str) -> list[float]:
+        """生成查询向量（经由查询向量缓存和微批处理器）"""
+        return self._encode_query(query)
+
+    async def aencode_query(self, query: str) -> list[float]:
+        """异步生成查询向量"""
+        return await self._aencode_query(query)
+
     def search_similar(
-        self, query: str, limit: int = 10, filter_criteria: Optional[dict[str, Any]] = None
+        self,
+        query: str,
+        limit: int = 10,
+        filter_criteria: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
     ) -> list[dict[str, Any]]:
         """
         语义相似度搜索
@@ -215,94 +544,468 @@ class VectorStore:
             query: 查询文本
             limit: 返回结果数量
             filter_criteria: 过滤条件
+            query_embedding: 已生成的查询向量（为空时编码query）
 
         Returns:
             搜索结果列表
         """
         try:
-            # 生成查询向量（惰性加载模型）
-            self._ensure_embedding_model()
-            if self.embedding_model is None:
-                raise RuntimeError("Embedding model not available")
-            query_embedding = self.embedding_model.encode([query]).tolist()
+            # 生成查询向量
+            if query_embedding is None:
+                query_embedding = self._encode_query(query)
+            return self._query_similar(query, query_embedding, limit, filter_criteria)
 
-            # 构建过滤条件
-            where_clause = None
-            if filter_criteria:
-                # 过滤掉None值
-                valid_filters = {key: value for key, value in filter_criteria.items() if value is not None}
-                
-                if len(valid_filters) == 1:
-                    # 单个过滤条件
-                    where_clause = valid_filters
-                elif len(valid_filters) > 1:
-                    # 多个过滤条件，使用$and操作符
-                    where_clause = {
-                        '$and': [{key: value} for key, value in valid_filters.items()]
-                    }
+        except Exception as e:
+            logger.error(f"Failed to search similar documents: {str(e)}")
+            return []
+
+    async def asearch_similar(
+        self,
+        query: str,
+        limit: int = 10,
+        filter_criteria: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        异步语义相似度搜索（查询编码经由微批处理器/推理池，ChromaDB查询在I/O池中执行）
+
+        Args:
+            query: 查询文本
+            limit: 返回结果数量
+            filter_criteria: 过滤条件
+            query_embedding: 已生成的查询向量（为空时编码query）
+
+        Returns:
+            搜索结果列表
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = await self._aencode_query(query)
+            return await get_executor_pools().io.run(
+                self._query_similar, query, query_embedding, limit, filter_criteria
+            )
+
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to search similar documents: {str(e)}")
+            return []
+
+    def search_grouped(
+        self,
+        query: str,
+        groups: int,
+        spec: GroupSpec,
+        filter_criteria: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        分组语义搜索（如每个文档最多返回per_group个分块）
+
+        Args:
+            query: 查询文本
+            groups: 返回的组数
+            spec: 分组参数
+            filter_criteria: 过滤条件
+            query_embedding: 已生成的查询向量（为空时编码query）
+
+        Returns:
+            按组分数排列的分块结果（同组分块相邻，附带 group_score）
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = self._encode_query(query)
+            return self._query_grouped(query, query_embedding, groups, spec, filter_criteria)
+
+        except Exception as e:
+            logger.error(f"Failed to search grouped documents: {str(e)}")
+            return []
+
+    async def asearch_grouped(
+        self,
+        query: str,
+        groups: int,
+        spec: GroupSpec,
+        filter_criteria: Optional[dict[str, Any]] = None,
+        query_embedding: Optional[list[float]] = None,
+    ) -> list[dict[str, Any]]:
+        """异步分组语义搜索（扩大召回的多轮查询都在同一个I/O池任务中执行）"""
+        try:
+            if query_embedding is None:
+                query_embedding = await self._aencode_query(query)
+            return await get_executor_pools().io.run(
+                self._query_grouped, query, query_embedding, groups, spec, filter_criteria
+            )
+
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to search grouped documents: {str(e)}")
+            return []
+
+    def _query_grouped(
+        self,
+        query: str,
+        query_embedding: list[float],
+        groups: int,
+        spec: GroupSpec,
+        filter_criteria: Optional[dict[str, Any]] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        逐步扩大召回的分块数，直到不同的组足够、候选已取尽或达到召回预算
 
-            # 执行搜索
+        少数长文档的分块可能占满前N个结果，每轮召回数量翻倍，上限为 GROUPED_SEARCH_MAX_CANDIDATES
+        """
+        budget = max(settings.GROUPED_SEARCH_MAX_CANDIDATES, groups * spec.per_group)
+        fetch = min(groups * spec.per_group * max(settings.GROUPED_SEARCH_INITIAL_FACTOR, 1), budget)
+        rounds = 0
+        while True:
+            rounds += 1
+            results = self._query_similar(query, query_embedding, fetch, filter_criteria)
+            grouped = aggregate_groups(results, spec)
+            if len(grouped) >= groups or len(results) < fetch or fetch >= budget:
+                break
+            fetch = min(fetch * 2, budget)
+
+        logger.debug(f"Grouped search found {len(grouped)} groups from {len(results)} chunks in {rounds} round(s)")
+        return flatten_groups(grouped, groups)
+
+    def search_similar_many(
+        self, queries: list[str], limits: list[int], filters: list[Optional[dict[str, Any]]]
+    ) -> list[list[dict[str, Any]]]:
+        """
+        批量语义相似度搜索
+
+        所有查询一次编码；过滤条件相同的查询合并为一次多向量查询
+
+        Args:
+            queries: 查询文本列表
+            limits: 与queries对应的返回结果数量
+            filters: 与queries对应的过滤条件
+
+        Returns:
+            与queries一一对应的搜索结果列表
+        """
+        try:
+            query_embeddings = self._encode_queries(queries)
+            results: list[list[dict[str, Any]]] = [[] for _ in queries]
+            for positions, filter_criteria in self._group_by_filters(filters):
+                self._query_group(queries, query_embeddings, limits, positions, filter_criteria, results)
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to batch search similar documents: {str(e)}")
+            return [[] for _ in queries]
+
+    async def asearch_similar_many(
+        self, queries: list[str], limits: list[int], filters: list[Optional[dict[str, Any]]]
+    ) -> list[list[dict[str, Any]]]:
+        """
+        异步批量语义相似度搜索（编码在推理池中一次完成，各过滤分组的查询在I/O池中并发执行）
+
+        Args:
+            queries: 查询文本列表
+            limits: 与queries对应的返回结果数量
+            filters: 与queries对应的过滤条件
+
+        Returns:
+            与queries一一对应的搜索结果列表
+        """
+        pools = get_executor_pools()
+        try:
+            query_embeddings = await pools.inference.run(self._encode_queries, queries)
+            results: list[list[dict[str, Any]]] = [[] for _ in queries]
+            await asyncio.gather(
+                *(
+                    pools.io.run(
+                        self._query_group, queries, query_embeddings, limits, positions, filter_criteria, results
+                    )
+                    for positions, filter_criteria in self._group_by_filters(filters)
+                )
+            )
+            return results
+
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to batch search similar documents: {str(e)}")
+            return [[] for _ in queries]
+
+    @staticmethod
+    def _group_by_filters(
+        filters: list[Optional[dict[str, Any]]]
+    ) -> list[tuple[list[int], dict[str, Any]]]:
+        """按过滤条件对查询位置分组"""
+        groups: dict[tuple[tuple[str, str], ...], tuple[list[int], dict[str, Any]]] = {}
+        for position, filter_criteria in enumerate(filters):
+            valid_filters = {key: value for key, value in (filter_criteria or {}).items() if value is not None}
+            key = tuple(sorted((name, str(value)) for name, value in valid_filters.items()))
+            groups.setdefault(key, ([], valid_filters))[0].append(position)
+        return list(groups.values())
+
+    def _query_group(
+        self,
+        queries: list[str],
+        query_embeddings: list[list[float]],
+        limits: list[int],
+        positions: list[int],
+        filter_criteria: dict[str, Any],
+        results: list[list[dict[str, Any]]],
+    ) -> None:
+        """执行一个过滤分组的多向量查询，按各自的limit截断后写入results对应位置"""
+        group_limit = max(limits[position] for position in positions)
+        group_results = self._query_similar_many(
+            [queries[position] for position in positions],
+            [query_embeddings[position] for position in positions],
+            group_limit,
+            filter_criteria,
+        )
+        for position, query_results in zip(positions, group_results):
+            results[position] = query_results[:limits[position]]
+
+    def _query_similar(
+        self,
+        query: str,
+        query_embedding: list[float],
+        limit: int,
+        filter_criteria: Optional[dict[str, Any]] = None,
+    ) -> list[dict[str, Any]]:
+        """按查询向量检索集合并格式化结果"""
+        return self._query_similar_many([query], [query_embedding], limit, filter_criteria)[0]
+
+    def _query_similar_many(
+        self,
+        queries: list[str],
+        query_embeddings: list[list[float]],
+        limit: int,
+        filter_criteria: Optional[dict[str, Any]] = None,
+    ) -> list[list[dict[str, Any]]]:
+        """按同一过滤条件检索多个查询向量，每个集合只发起一次多向量查询"""
+        # 过滤掉None值
+        valid_filters = {key: value for key, value in (filter_criteria or {}).items() if value is not None}
+
+        # 精确索引就绪且能表达过滤条件时优先使用
+        exact_index = self.exact_index
+        if exact_index is not None and exact_index.is_ready() and exact_index.supports_filter(valid_filters):
+            return [
+                self._query_exact_index(exact_index, query, query_embedding, limit, valid_filters)
+                for query, query_embedding in zip(queries, query_embeddings)
+            ]
+
+        # provider/category过滤路由到分区子索引，否则查询全局集合
+        collections: Optional[list["Collection"]] = None
+        where_clause = None
+        if self.partition_router is not None and valid_filters:
+            collections = self.partition_router.route(valid_filters)
+        if collections is None:
             if self.collection is None:
                 raise RuntimeError("Collection not available")
-            results = self.collection.query(
-                query_embeddings=query_embedding,
+            collections = [self.collection]
+
+            # 构建过滤条件
+            if len(valid_filters) == 1:
+                # 单个过滤条件
+                where_clause = valid_filters
+            elif len(valid_filters) > 1:
+                # 多个过滤条件，使用$and操作符
+                where_clause = {
+                    '$and': [{key: value} for key, value in valid_filters.items()]
+                }
+
+        # 执行搜索，按查询收集各集合的候选结果
+        candidates: list[list[tuple[float, str, Any, Any]]] = [[] for _ in queries]
+        for collection in collections:
+            space = collection_space(collection)
+            results = collection.query(
+                query_embeddings=query_embeddings,
                 n_results=limit,
                 where=where_clause,
                 include=['metadatas', 'documents', 'distances'],
             )
+            for i, ids_list in enumerate(results['ids'] or []):
+                distances = results['distances'][i] if results['distances'] else []
+                candidates[i].extend(
+                    zip(
+                        [distance_to_squared_l2(distance, space) for distance in distances],
+                        ids_list,
+                        results['documents'][i] if results['documents'] else [],
+                        results['metadatas'][i] if results['metadatas'] else [],
+                    )
+                )
 
-            # 格式化结果
-            formatted_results = []
-            
-            # 计算查询长度惩罚因子（调整为更宽松的惩罚）
-            # 短query会被轻微惩罚
-            query_length = len(query.strip())
-            if query_length <= 2:
-                length_penalty = 0.8  # 1-2个字的query，得分减20%
-            elif query_length <= 4:
-                length_penalty = 0.9  # 3-4个字的query，得分减10%
-            else:
-                length_penalty = 1.0  # 5个字以上不惩罚
+        # 多个分区的结果按距离归并，格式化结果
+        formatted = []
+        for query, query_candidates in zip(queries, candidates):
+            if len(collections) > 1:
+                query_candidates = sorted(query_candidates, key=lambda candidate: candidate[0])[:limit]
+            formatted.append(
+                self._format_results(
+                    query,
+                    [chunk_id for _, chunk_id, _, _ in query_candidates],
+                    [document for _, _, document, _ in query_candidates],
+                    [metadata for _, _, _, metadata in query_candidates],
+                    [distance for distance, _, _, _ in query_candidates],
+                )
+            )
+        return formatted
 
-            if results['ids'] and len(results['ids']) > 0:
-                ids_list = results['ids'][0] if results['ids'] else []
-                documents_list = results['documents'][0] if results['documents'] else []
-                metadatas_list = results['metadatas'][0] if results['metadatas'] else []
-                distances_list = results['distances'][0] if results['distances'] else []
-                
-                for i in range(len(ids_list)):
-                    # 将L2距离转换为相似度分数 [0, 1]，距离越小分数越高
-                    # 使用温和的指数衰减函数
-                    # 公式: base_score = exp(-distance^2 * 0.5)
-                    # 使用较小系数0.5使衰减更温和，提高搜索召回率
-                    # 这样：distance=0.0 -> score=1.0 (完全匹配)
-                    #       distance=0.5 -> score=0.88
-                    #       distance=1.0 -> score=0.61
-                    #       distance=1.5 -> score=0.32
-                    #       distance=2.0 -> score=0.14
-                    distance = distances_list[i]
-                    base_score = math.exp(-(distance ** 2) * 0.5)
-                    
-                    # 应用查询长度惩罚
-                    final_score = base_score * length_penalty
-                    
-                    result = {
-                        'id': ids_list[i],
-                        'content': documents_list[i],
-                        'metadata': metadatas_list[i],
-                        'score': final_score,
-                        'document_id': metadatas_list[i].get('document_id') if isinstance(metadatas_list[i], dict) else None,
-                        'chunk_index': metadatas_list[i].get('chunk_index') if isinstance(metadatas_list[i], dict) else None,
-                    }
-                    formatted_results.append(result)
+    def _query_exact_index(
+        self,
+        exact_index: ExactVectorIndex,
+        query: str,
+        query_embedding: list[float],
+        limit: int,
+        filter_criteria: dict[str, Any],
+    ) -> list[dict[str, Any]]:
+        """经由进程内精确索引检索，再按ID从集合取回文本和元数据"""
+        hits = exact_index.search(query_embedding, limit, filter_criteria)
+        if not hits:
+            return self._format_results(query, [], [], [], [])
+
+        found = self._get_chunks_by_ids([chunk_id for chunk_id, _ in hits])
+
+        # 索引与集合之间短暂不一致时，丢弃集合中已不存在的分块
+        hits = [(chunk_id, distance) for chunk_id, distance in hits if chunk_id in found]
+        return self._format_results(
+            query,
+            [chunk_id for chunk_id, _ in hits],
+            [found[chunk_id][0] for chunk_id, _ in hits],
+            [found[chunk_id][1] for chunk_id, _ in hits],
+            [distance for _, distance in hits],
+        )
+
+    def _get_chunks_by_ids(self, chunk_ids: list[str]) -> dict[str, tuple[Any, Any]]:
+        """按分块ID从集合取回文本和元数据"""
+        if self.collection is None:
+            raise RuntimeError("Collection not available")
+        records = self.collection.get(ids=chunk_ids, include=['metadatas', 'documents'])
+        return {
+            chunk_id: (document, metadata)
+            for chunk_id, document, metadata in zip(
+                records['ids'] or [], records['documents'] or [], records['metadatas'] or []
+            )
+        }
+
+    def hydrate_results(self, ranked: list[tuple[str, float]]) -> list[dict[str, Any]]:
+        """
+        按分块ID取回文本和元数据，组装为检索结果
+
+        Args:
+            ranked: 已排序的 (分块ID, 分数) 列表
 
-            logger.info(f"Found {len(formatted_results)} similar results for query (length: {query_length}, penalty: {length_penalty})")
-            return formatted_results
+        Returns:
+            保持原顺序的结果列表（已不存在的分块被跳过）
+        """
+        if not ranked:
+            return []
+
+        found = self._get_chunks_by_ids([chunk_id for chunk_id, _ in ranked])
+        results = []
+        for chunk_id, score in ranked:
+            if chunk_id not in found:
+                continue
+            document, metadata = found[chunk_id]
+            results.append(
+                {
+                    'id': chunk_id,
+                    'content': document,
+                    'metadata': metadata,
+                    'score': score,
+                    'document_id': metadata.get('document_id') if isinstance(metadata, dict) else None,
+                    'chunk_index': metadata.get('chunk_index') if isinstance(metadata, dict) else None,
+                }
+            )
+        return results
+
+    async def ahydrate_results(self, ranked: list[tuple[str, float]]) -> list[dict[str, Any]]:
+        """异步取回分块（在I/O池中执行）"""
+        return await get_executor_pools().io.run(self.hydrate_results, ranked)
+
+    def search_lexical(
+        self, query: str, limit: int = 10, filter_criteria: Optional[dict[str, Any]] = None
+    ) -> list[dict[str, Any]]:
+        """
+        全文检索（未启用全文索引或过滤条件无法表达时返回空列表）
+
+        Args:
+            query: 查询文本
+            limit: 返回结果数量
+            filter_criteria: 过滤条件
+
+        Returns:
+            按bm25相关度排序的结果列表（score为bm25分数，越小越相关）
+        """
+        valid_filters = {key: value for key, value in (filter_criteria or {}).items() if value is not None}
+        if self.lexical_index is None or not self.lexical_index.supports_filter(valid_filters):
+            return []
+
+        try:
+            hits = self.lexical_index.search(query, limit, valid_filters)
+            if not hits:
+                return []
+
+            return self.hydrate_results(hits)
 
         except Exception as e:
-            logger.error(f"Failed to search similar documents: {str(e)}")
+            logger.error(f"Failed to search lexical index: {str(e)}")
             return []
 
+    async def asearch_lexical(
+        self, query: str, limit: int = 10, filter_criteria: Optional[dict[str, Any]] = None
+    ) -> list[dict[str, Any]]:
+        """异步全文检索（在I/O池中执行）"""
+        return await get_executor_pools().io.run(self.search_lexical, query, limit, filter_criteria)
+
+    def _format_results(
+        self,
+        query: str,
+        ids_list: list[str],
+        documents_list: list[Any],
+        metadatas_list: list[Any],
+        distances_list: list[float],
+    ) -> list[dict[str, Any]]:
+        """将检索得到的分块和距离格式化为带分数的结果"""
+        formatted_results = []
+        
+        # 计算查询长度惩罚因子（调整为更宽松的惩罚）
+        # 短query会被轻微惩罚
+        query_length = len(query.strip())
+        if query_length <= 2:
+            length_penalty = 0.8  # 1-2个字的query，得分减20%
+        elif query_length <= 4:
+            length_penalty = 0.9  # 3-4个字的query，得分减10%
+        else:
+            length_penalty = 1.0  # 5个字以上不惩罚
+
+        for i in range(len(ids_list)):
+            # 将L2距离转换为相似度分数 [0, 1]，距离越小分数越高
+            # 使用温和的指数衰减函数
+            # 公式: base_score = exp(-distance^2 * 0.5)
+            # 使用较小系数0.5使衰减更温和，提高搜索召回率
+            # 这样：distance=0.0 -> score=1.0 (完全匹配)
+            #       distance=0.5 -> score=0.88
+            #       distance=1.0 -> score=0.61
+            #       distance=1.5 -> score=0.32
+            #       distance=2.0 -> score=0.14
+            distance = distances_list[i]
+            base_score = math.exp(-(distance ** 2) * 0.5)
+            
+            # 应用查询长度惩罚
+            final_score = base_score * length_penalty
+            
+            result = {
+                'id': ids_list[i],
+                'content': documents_list[i],
+                'metadata': metadatas_list[i],
+                'score': final_score,
+                'document_id': metadatas_list[i].get('document_id') if isinstance(metadatas_list[i], dict) else None,
+                'chunk_index': metadatas_list[i].get('chunk_index') if isinstance(metadatas_list[i], dict) else None,
+            }
+            formatted_results.append(result)
+
+        logger.info(f"Found {len(formatted_results)} similar results for query (length: {query_length}, penalty: {length_penalty})")
+        return formatted_results
+
     def get_document_chunks(self, document_id: int) -> list[dict[str, Any]]:
         """
         获取文档的所有块
@@ -343,6 +1046,10 @@ class VectorStore:
             logger.error(f"Failed to get chunks for document {document_id}: {str(e)}")
             return []
 
+    async def aget_document_chunks(self, document_id: int) -> list[dict[str, Any]]:
+        """异步获取文档的所有块（在I/O池中执行）"""
+        return await get_executor_pools().io.run(self.get_document_chunks, document_id)
+
     def delete_document(self, document_id: int) -> bool:
         """
         删除文档的所有向量
@@ -364,18 +1071,228 @@ class VectorStore:
                 self.collection.delete(ids=results['ids'])
                 logger.info(f"Deleted {len(results['ids'])} chunks for document {document_id}")
 
+                if self.partition_router is not None:
+                    self.partition_router.delete(results['ids'], [dict(meta or {}) for meta in results['metadatas'] or []])
+
+            if self.lexical_index is not None:
+                self.lexical_index.remove_document(document_id)
+            if self.exact_index is not None:
+                self.exact_index.remove_document(document_id)
+
             return True
 
         except Exception as e:
             logger.error(f"Failed to delete document {document_id} from vector store: {str(e)}")
             return False
 
+        finally:
+            self._bump_generation()
+
+    def delete_documents(self, document_ids: list[int]) -> int:
+        """
+        批量删除多个文档的所有向量（失败时抛出异常）
+
+        Args:
+            document_ids: 文档ID列表
+
+        Returns:
+            删除的分块数量
+        """
+        if not document_ids:
+            return 0
+        if self.collection is None:
+            raise RuntimeError("Collection not available")
+        try:
+            results = self.collection.get(
+                where={"document_id": {"$in": list(document_ids)}}, include=['metadatas']
+            )
+            if results['ids']:
+                self.collection.delete(ids=results['ids'])
+                if self.partition_router is not None:
+                    self.partition_router.delete(results['ids'], [dict(meta or {}) for meta in results['metadatas'] or []])
+
+            for document_id in document_ids:
+                if self.lexical_index is not None:
+                    self.lexical_index.remove_document(document_id)
+                if self.exact_index is not None:
+                    self.exact_index.remove_document(document_id)
+
+            logger.info(f"Deleted {len(results['ids'])} chunks for {len(document_ids)} documents")
+            return len(results['ids'])
+
+        finally:
+            self._bump_generation()
+
+    def get_indexed_document_ids(self, page_size: int = 5000) -> set[int]:
+        """向量库中存在分块的文档ID（分页读取分块ID并解析）"""
+        if self.collection is None:
+            raise RuntimeError("Collection not available")
+        document_ids: set[int] = set()
+        offset = 0
+        while True:
+            results = self.collection.get(include=[], limit=page_size, offset=offset)
+            for chunk_id in results['ids']:
+                parsed = parse_chunk_id(chunk_id)
+                if parsed is not None:
+                    document_ids.add(parsed[0])
+            if len(results['ids']) < page_size:
+                return document_ids
+            offset += page_size
+
+    async def adelete_document(self, document_id: int) -> bool:
+        """异步删除文档的所有向量（在I/O池中执行）"""
+        return await get_executor_pools().io.run(self.delete_document, document_id)
+
+    def plan_update(
+        self,
+        document_id: int,
+        chunks: list[dict[str, Any]],
+        metadata: Optional[dict[str, Any]] = None,
+        stored_chunks: Optional[list[dict[str, Any]]] = None,
+        reencode: bool = False,
+    ) -> ChunkUpdatePlan:
+        """
+        按分块内容哈希比较已存储的分块和新的切分结果
+
+        分块ID由 (文档ID, 分块序号) 决定。先按内容哈希匹配新旧分块，再按新序号分配ID:
+        同一ID内容未变的分块保留原向量；内容在其他位置的旧分块中出现过（如前面插入了段落导致后续分块后移）
+        的分块复用该旧分块的向量；只有内容在旧分块中不存在的分块需要重新编码
+
+        Args:
+            document_id: 文档ID
+            chunks: 新的文档块列表
+            metadata: 文档元数据
+            stored_chunks: 已读取的 get_document_chunks 结果（省略时从集合读取）
+            reencode: 为True时所有分块都重新编码（如更换了嵌入模型）
+
+        Returns:
+            更新计划
+        """
+        if stored_chunks is None:
+            stored_chunks = self.get_document_chunks(document_id)
+        texts, ids, metadatas = self._build_chunk_records(document_id, chunks, metadata)
+        plan = ChunkUpdatePlan(
+            document_id=document_id,
+            ids=ids,
+            texts=texts,
+            metadatas=metadatas,
+            previous_metadatas={chunk['id']: dict(chunk['metadata'] or {}) for chunk in stored_chunks},
+        )
+
+        # 旧分块: 分块ID -> 内容哈希，内容哈希 -> 分块ID（相同内容保留第一个）
+        stored_hashes: dict[str, str] = {}
+        ids_by_hash: dict[str, str] = {}
+        for chunk in stored_chunks:
+            content_hash = plan.previous_metadatas[chunk['id']].get('content_hash') or chunk_content_hash(chunk['content'] or '')
+            stored_hashes[chunk['id']] = content_hash
+            ids_by_hash.setdefault(content_hash, chunk['id'])
+
+        for position, (chunk_id, chunk_metadata) in enumerate(zip(ids, metadatas)):
+            content_hash = chunk_metadata['content_hash']
+            if reencode:
+                plan.changed.append(position)
+            elif stored_hashes.get(chunk_id) == content_hash:
+                if plan.previous_metadatas[chunk_id] != chunk_metadata:
+                    plan.relabeled.append(position)
+            elif content_hash in ids_by_hash:
+                plan.moved[position] = ids_by_hash[content_hash]
+            else:
+                plan.changed.append(position)
+
+        new_ids = set(ids)
+        plan.removed_ids = [chunk['id'] for chunk in stored_chunks if chunk['id'] not in new_ids]
+        return plan
+
+    def apply_update(self, plan: ChunkUpdatePlan, embeddings: list[list[float]]) -> None:
+        """
+        执行更新计划（写入失败时抛出异常）
+
+        Args:
+            plan: plan_update 生成的计划
+            embeddings: 与 plan.changed 对应的新向量
+        """
+        if self.collection is None:
+            raise RuntimeError("Collection not available")
+        try:
+            # 复用的向量须在覆盖写入之前读取（来源分块可能正是被覆盖的分块）
+            relabeled_ids = [plan.ids[i] for i in plan.relabeled]
+            fetch_ids = set(plan.moved.values())
+            if self.partition_router is not None or self.exact_index is not None:
+                fetch_ids.update(relabeled_ids)
+            stored_embeddings: dict[str, list[float]] = {}
+            if fetch_ids:
+                results = self.collection.get(ids=list(fetch_ids), include=['embeddings'])
+                stored_embeddings = {
+                    chunk_id: [float(value) for value in embedding]
+                    for chunk_id, embedding in zip(results['ids'], results['embeddings'])
+                }
+
+            if plan.changed or plan.moved:
+                positions = plan.changed + sorted(plan.moved)
+                ids = [plan.ids[i] for i in positions]
+                metadatas = [dict(plan.metadatas[i]) for i in positions]
+                texts = [plan.texts[i] for i in positions]
+                vectors = list(embeddings) + [stored_embeddings[plan.moved[i]] for i in sorted(plan.moved)]
+                self.collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)  # type: ignore
+                self._sync_chunk_indexes(plan, ids, texts, vectors, metadatas)
+
+            if plan.relabeled:
+                metadatas = [dict(plan.metadatas[i]) for i in plan.relabeled]
+                texts = [plan.texts[i] for i in plan.relabeled]
+                # 一次调用批量更新元数据，向量保持不变
+                self.collection.update(ids=relabeled_ids, metadatas=metadatas)  # type: ignore
+                vectors = [stored_embeddings[chunk_id] for chunk_id in relabeled_ids] if stored_embeddings else []
+                self._sync_chunk_indexes(plan, relabeled_ids, texts, vectors, metadatas)
+
+            if plan.removed_ids:
+                self.collection.delete(ids=plan.removed_ids)
+                if self.partition_router is not None:
+                    self.partition_router.delete(
+                        plan.removed_ids, [plan.previous_metadatas[chunk_id] for chunk_id in plan.removed_ids]
+                    )
+                if self.lexical_index is not None:
+                    self.lexical_index.remove_ids(plan.removed_ids)
+                if self.exact_index is not None:
+                    self.exact_index.remove_ids(plan.removed_ids)
+
+            logger.info(
+                f"Updated document {plan.document_id}: {plan.unchanged} chunks unchanged, "
+                f"{len(plan.changed)} embedded, {len(plan.moved)} moved, "
+                f"{len(plan.relabeled)} metadata updated, {len(plan.removed_ids)} removed"
+            )
+
+        finally:
+            if plan.changed or plan.moved or plan.relabeled or plan.removed_ids:
+                self._bump_generation()
+
+    def _sync_chunk_indexes(
+        self,
+        plan: ChunkUpdatePlan,
+        ids: list[str],
+        texts: list[str],
+        embeddings: list[list[float]],
+        metadatas: list[dict[str, Any]],
+    ) -> None:
+        """同步分区、词法和精确索引中被覆盖的分块（各索引按分块ID覆盖写入）"""
+        if self.partition_router is not None:
+            # 分区按 (provider, category) 路由，先从旧分区删除
+            previous = [chunk_id for chunk_id in ids if chunk_id in plan.previous_metadatas]
+            if previous:
+                self.partition_router.delete(previous, [plan.previous_metadatas[chunk_id] for chunk_id in previous])
+            self.partition_router.add(ids, texts, embeddings, metadatas)
+        if self.lexical_index is not None:
+            self.lexical_index.add(ids, texts, metadatas)
+        if self.exact_index is not None:
+            self.exact_index.add(ids, embeddings, metadatas)
+
     def update_document(
         self, document_id: int, chunks: list[dict[str, Any]], metadata: Optional[dict[str, Any]] = None
     ) -> bool:
         """
         更新文档向量
 
+        只重新编码内容变化和新增的分块，内容未变的分块保留原向量，多余的分块被删除
+
         Args:
             document_id: 文档ID
             chunks: 新的文档块列表
@@ -385,12 +1302,106 @@ class VectorStore:
             是否成功更新
         """
         try:
-            # 先删除旧的向量
-            self.delete_document(document_id)
+            plan = self.plan_update(document_id, chunks, metadata)
+            embeddings = self._encode_documents(plan.changed_texts) if plan.changed else []
+            self.apply_update(plan, embeddings)
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to update document {document_id} in vector store: {str(e)}")
+            return False
+
+    def update_document_metadata(self, document_id: int, metadata: dict[str, Any]) -> bool:
+        """
+        更新文档所有分块的文档级元数据（复用已有向量，不重新解析和编码）
+
+        分块内容不变，更新计划中只有元数据变化的分块，由 apply_update 批量更新集合并同步各子索引
+
+        Args:
+            document_id: 文档ID
+            metadata: 新的文档级元数据
+
+        Returns:
+            是否成功更新
+        """
+        try:
+            stored_chunks = self.get_document_chunks(document_id)
+            if not stored_chunks:
+                return False
+
+            chunks = [
+                {
+                    'chunk_index': chunk['metadata']['chunk_index'],
+                    'content': chunk['content'] or '',
+                    'start_pos': chunk['metadata'].get('start_pos', 0),
+                    'end_pos': chunk['metadata'].get('end_pos', 0),
+                    'word_count': chunk['metadata'].get('word_count', 0),
+                }
+                for chunk in stored_chunks
+            ]
+            plan = self.plan_update(document_id, chunks, metadata, stored_chunks=stored_chunks)
+            if plan.changed:
+                raise RuntimeError(f"{len(plan.changed)} stored chunks have no matching content hash")
+            self.apply_update(plan, [])
+            return True
 
-            # 添加新的向量
-            return self.add_document(document_id, chunks, metadata)
+        except Exception as e:
+            logger.error(f"Failed to update metadata of document {document_id}: {str(e)}")
+            return False
+
+    def copy_document(self, source_id: int, target_id: int, metadata: dict[str, Any]) -> int:
+        """
+        以源文档已存储的分块和向量写入目标文档（内容相同的文件登记到新路径时使用，不重新编码）
+
+        目标文档已有分块时按内容哈希原地更新，多余的分块被删除；源文档保持不变
+
+        Args:
+            source_id: 源文档ID
+            target_id: 目标文档ID
+            metadata: 目标文档的文档级元数据
+
+        Returns:
+            写入的分块数量（写入失败时抛出异常）
+        """
+        if self.collection is None:
+            raise RuntimeError("Collection not available")
+        results = self.collection.get(
+            where={"document_id": source_id}, include=['documents', 'metadatas', 'embeddings']
+        )
+        if not results['ids']:
+            raise RuntimeError(f"Document {source_id} has no stored chunks")
+
+        chunks = []
+        embeddings_by_hash: dict[str, list[float]] = {}
+        for content, meta, embedding in zip(results['documents'], results['metadatas'], results['embeddings']):
+            content = content or ''
+            chunks.append({
+                'chunk_index': meta['chunk_index'],
+                'content': content,
+                'start_pos': meta.get('start_pos', 0),
+                'end_pos': meta.get('end_pos', 0),
+                'word_count': meta.get('word_count', 0),
+            })
+            embeddings_by_hash[chunk_content_hash(content)] = [float(value) for value in embedding]
+        chunks.sort(key=lambda chunk: chunk['chunk_index'])
+
+        plan = self.plan_update(target_id, chunks, metadata)
+        self.apply_update(plan, [embeddings_by_hash[plan.metadatas[i]['content_hash']] for i in plan.changed])
+        return len(chunks)
 
+    async def aupdate_document(
+        self, document_id: int, chunks: list[dict[str, Any]], metadata: Optional[dict[str, Any]] = None
+    ) -> bool:
+        """异步更新文档向量（比较和写入在I/O池中执行，编码在推理池中执行）"""
+        pools = get_executor_pools()
+        try:
+            plan = await pools.io.run(self.plan_update, document_id, chunks, metadata)
+            embeddings = await self.aencode_chunks(plan.changed_texts) if plan.changed else []
+            await pools.io.run(self.apply_update, plan, embeddings)
+            return True
+
+        except ExecutorBusyError:
+            raise
         except Exception as e:
             logger.error(f"Failed to update document {document_id} in vector store: {str(e)}")
             return False
@@ -441,7 +1452,7 @@ class VectorStore:
                 'categories': list(categories),
                 'provider_distribution': provider_percentages,
                 'category_distribution': category_counts,
-                'embedding_model': settings.EMBEDDING_MODEL,
+                'embedding_model': get_model_registry().embedding_model_id,
                 'collection_name': self.collection.name,
             }
 
@@ -449,18 +1460,34 @@ class VectorStore:
             logger.error(f"Failed to get collection stats: {str(e)}")
             return {}
 
+    async def aget_collection_stats(self) -> dict[str, Any]:
+        """异步获取集合统计信息（在I/O池中执行）"""
+        return await get_executor_pools().io.run(self.get_collection_stats)
+
     def reset_collection(self) -> bool:
         """重置集合（删除所有数据）"""
         try:
             if self.client is None:
                 raise RuntimeError("Client not available")
             self.client.delete_collection("knowledge_base")
-            self.collection = self.client.create_collection(
-                name="knowledge_base", metadata={"description": "Knowledge base document chunks"}
-            )
+            self.collection = self._create_collection(get_model_registry().embedding_dimension)
+            if self.partition_router is not None:
+                self.partition_router.reset()
+            if self.lexical_index is not None:
+                self.lexical_index.clear()
+            if self.exact_index is not None:
+                self.exact_index.clear()
             logger.info("Vector store collection reset successfully")
             return True
 
         except Exception as e:
             logger.error(f"Failed to reset collection: {str(e)}")
             return False
+
+        finally:
+            self._bump_generation()
+
+
+def get_vector_store() -> VectorStore:
+    """获取进程内共享的VectorStore实例"""
+    return get_model_registry().get_vector_store()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+独立的入库任务工作进程
+
+与API进程共享SQLite任务队列和ChromaDB目录，每个进程各自加载嵌入模型并领取任务。
+入库负载较大时可关闭API进程内的工作者（INGEST_WORKER_ENABLED=False），由这里的进程专门处理上传
+
+注意: 精确索引(EXACT_INDEX_ENABLED)是各API进程内的镜像，不会感知其他进程写入的分块
+
+用法: python run_ingest_worker.py --processes 2 [--concurrency 4] [--threads-per-process 2]
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+
+from app.core.prefork import configure_fork_safety, default_threads_per_worker, set_inference_threads
+
+# 必须在导入torch/tokenizers之前调用
+configure_fork_safety()
+
+logger = logging.getLogger("ingest_worker")
+
+
+def _run_worker_process(concurrency: int, threads: int, log_level: str) -> None:
+    """工作进程入口: 加载模型后持续领取并处理任务，收到SIGTERM/SIGINT后处理完当前任务退出"""
+    logging.basicConfig(level=log_level.upper(), format="%(asctime)s [%(process)d] %(message)s")
+    set_inference_threads(threads)
+
+    from app.core.database import init_database
+    from app.core.executors import get_executor_pools
+    from app.services.ingest_jobs import IngestWorker, get_ingest_job_queue
+    from app.services.model_registry import get_model_registry
+
+    init_database()
+    registry = get_model_registry()
+    if not registry.load_and_warm_up():
+        sys.exit(1)
+
+    worker = IngestWorker(get_ingest_job_queue(), concurrency=concurrency)
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, lambda: asyncio.ensure_future(worker.stop()))
+        await worker.run()
+
+    try:
+        asyncio.run(main())
+    finally:
+        registry.shutdown()
+        get_executor_pools().shutdown(wait=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="入库任务工作进程")
+    parser.add_argument("--processes", type=int, default=1, help="工作进程数")
+    parser.add_argument("--concurrency", type=int, default=0, help="每个进程同时处理的任务数（0: 使用配置值）")
+    parser.add_argument(
+        "--threads-per-process", type=int, default=0, help="每个进程的推理线程数（0: CPU核数 / 进程数）"
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(message)s")
+    processes = max(1, args.processes)
+    threads = args.threads_per_process or default_threads_per_worker(processes)
+
+    context = multiprocessing.get_context("spawn")
+    children = [
+        context.Process(
+            target=_run_worker_process,
+            args=(args.concurrency, threads, args.log_level),
+            name=f"ingest-worker-{index}",
+        )
+        for index in range(processes)
+    ]
+    for child in children:
+        child.start()
+        logger.info(f"Started {child.name} (pid {child.pid})")
+
+    def _handle_stop(signum: int, frame: object) -> None:
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+
+    for child in children:
+        child.join()
+    logger.info("All ingest workers exited")
+
+
+if __name__ == "__main__":
+    main()
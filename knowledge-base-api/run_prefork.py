@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+知识库API生产环境多进程启动脚本
+主进程加载一次嵌入模型后fork多个工作进程，模型权重以写时复制方式共享
+
+用法: python run_prefork.py --workers 4 [--threads-per-worker 2] [--port 8000]
+"""
+
+import argparse
+import logging
+import os
+
+from app.core.prefork import PreforkServer, configure_fork_safety, default_threads_per_worker
+
+# 必须在导入torch/tokenizers之前调用
+configure_fork_safety()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="知识库API pre-fork多进程启动")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument(
+        "--threads-per-worker", type=int, default=0, help="每个工作进程的推理线程数（0: CPU核数 / 工作进程数）"
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(message)s")
+
+    server = PreforkServer(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker or default_threads_per_worker(args.workers),
+        log_level=args.log_level,
+    )
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+嵌入推理后端对比脚本
+
+对比 FlagModel(PyTorch) 与 ONNX Runtime (fp32 / int8) 后端:
+- 一致性: 与FlagModel输出的逐条余弦相似度（要求 >= 0.99）
+- 单条查询延迟 p50/p99
+- 批量编码吞吐量（条/秒）
+- 加载模型后的常驻内存(RSS)
+
+每个后端在独立子进程中运行，保证RSS互不干扰
+用法: python scripts/benchmark_embedding_backends.py --threads 4
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+PARITY_THRESHOLD = 0.99
+
+SAMPLE_TEXTS = [
+    "负载均衡对比",
+    "阿里云ALB",
+    "腾讯云CLB支持哪些监听协议",
+    "NAT网关的计费方式是怎样的？",
+    "弹性公网IP可以绑定到哪些云资源上，带宽上限是多少",
+    "专线接入需要经过哪些步骤，物理专线和专用通道有什么区别",
+    "云联网支持跨地域、跨账号的私有网络互通，适用于多地域部署的业务场景。",
+    "应用型负载均衡ALB面向七层应用，支持HTTP、HTTPS和QUIC协议，"
+    "提供基于内容的高级路由功能，可以根据域名、路径、请求头等将请求转发到不同的后端服务器组。",
+]
+
+
+def read_rss_mb() -> float:
+    """读取当前进程常驻内存（MB）"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_texts(limit: int) -> list[str]:
+    """从文档目录取样文本，不足时使用内置样例"""
+    from app.core.config import get_settings
+    from app.services.document_processor import DocumentProcessor
+
+    texts: list[str] = []
+    documents_path = Path(get_settings().DOCUMENTS_PATH)
+    if documents_path.exists():
+        processor = DocumentProcessor()
+        for md_file in sorted(documents_path.rglob("*.md")):
+            try:
+                texts.extend(chunk['content'] for chunk in processor.process_file(str(md_file))['chunks'])
+            except Exception:
+                continue
+            if len(texts) >= limit:
+                break
+    if len(texts) < len(SAMPLE_TEXTS):
+        texts.extend(SAMPLE_TEXTS)
+    return texts[:limit]
+
+
+def run_backend(backend: str, quantize: bool, threads: int, texts: list[str], rounds: int, queue) -> None:
+    """在子进程中加载指定后端并测量"""
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    rss_before = read_rss_mb()
+
+    if backend == "onnx":
+        from app.services.onnx_embedder import OnnxEmbeddingModel
+
+        model = OnnxEmbeddingModel(
+            settings.EMBEDDING_MODEL,
+            onnx_dir=settings.EMBEDDING_ONNX_DIR,
+            quantize=quantize,
+            num_threads=threads,
+        )
+    else:
+        import torch
+        from FlagEmbedding import FlagModel
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        model = FlagModel(settings.EMBEDDING_MODEL)
+
+    # 预热
+    model.encode(texts[:8])
+    rss_loaded = read_rss_mb()
+
+    # 单条查询延迟
+    latencies = []
+    for _ in range(rounds):
+        for text in SAMPLE_TEXTS:
+            start = time.perf_counter()
+            model.encode([text])
+            latencies.append(time.perf_counter() - start)
+
+    # 批量吞吐
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=32)
+    batch_elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    queue.put({
+        "embeddings": np.asarray(embeddings, dtype=np.float32),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "throughput": len(texts) / batch_elapsed,
+        "rss_mb": rss_loaded,
+        "model_rss_mb": rss_loaded - rss_before,
+    })
+
+
+def measure(backend: str, quantize: bool, threads: int, texts: list[str], rounds: int) -> dict:
+    """启动子进程测量一个后端"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_backend, args=(backend, quantize, threads, texts, rounds, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="嵌入推理后端一致性与性能对比")
+    parser.add_argument("--threads", type=int, default=0, help="推理线程数（0: 默认）")
+    parser.add_argument("--texts", type=int, default=256, help="批量吞吐测试文本数")
+    parser.add_argument("--rounds", type=int, default=20, help="单条延迟测试轮数")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    print(f"📊 测试文本: {len(texts)} 条，线程数: {args.threads or '默认'}")
+
+    variants = [
+        ("FlagModel (PyTorch)", "flag", False),
+        ("ONNX fp32", "onnx", False),
+        ("ONNX int8", "onnx", True),
+    ]
+    results = {}
+    for label, backend, quantize in variants:
+        print(f"⏳ 测量 {label} ...")
+        results[label] = measure(backend, quantize, args.threads, texts, args.rounds)
+
+    reference = results["FlagModel (PyTorch)"]["embeddings"]
+    print()
+    print(f"{'后端':<22} {'p50(ms)':>9} {'p99(ms)':>9} {'吞吐(条/s)':>11} {'RSS(MB)':>9} {'模型RSS':>9} {'最小cos':>8} {'平均cos':>8}")
+    parity_ok = True
+    for label, result in results.items():
+        embeddings = result["embeddings"]
+        cosines = np.sum(reference * embeddings, axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(embeddings, axis=1)
+        )
+        if cosines.min() < PARITY_THRESHOLD:
+            parity_ok = False
+        print(
+            f"{label:<22} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['throughput']:>11.1f} "
+            f"{result['rss_mb']:>9.0f} {result['model_rss_mb']:>9.0f} {cosines.min():>8.4f} {cosines.mean():>8.4f}"
+        )
+
+    print()
+    if parity_ok:
+        print(f"✅ 一致性检查通过（所有后端逐条余弦相似度 >= {PARITY_THRESHOLD}）")
+    else:
+        print(f"❌ 一致性检查失败（存在余弦相似度 < {PARITY_THRESHOLD} 的样本）")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
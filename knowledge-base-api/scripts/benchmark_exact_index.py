@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+精确向量索引与ChromaDB检索对比脚本
+
+在临时目录中用合成向量（带聚类结构，维度与bge-small-zh一致）分别构建ChromaDB集合和
+进程内精确索引，对比不同规模下的召回率和延迟:
+- recall@k: 以NumPy暴力检索结果为基准
+- 延迟 p50/p99: 无过滤、单条件过滤(provider)、双条件过滤(provider + category)
+
+用法: python scripts/benchmark_exact_index.py --sizes 10000 100000 1000000 --queries 200
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from app.services.exact_index import ExactVectorIndex
+from scripts.benchmark_search_load import percentile
+
+PROVIDERS = ["阿里云", "腾讯云", "华为云", "百度云", "AWS"]
+CATEGORIES = ["负载均衡", "NAT网关", "弹性IP", "专线", "云联网", "VPN", "CDN", "DNS", "对象存储", "数据库"]
+
+# 过滤场景: 名称 -> 过滤条件
+FILTER_CASES = {
+    "none": {},
+    "provider": {"provider": PROVIDERS[1]},
+    "provider+category": {"provider": PROVIDERS[1], "category": CATEGORIES[3]},
+}
+
+
+def make_dataset(size: int, dimension: int, seed: int) -> tuple[np.ndarray, list[dict]]:
+    """生成归一化的聚类向量和分块元数据"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, size // 500), dimension)).astype(np.float32)
+    assignment = rng.integers(0, len(centers), size)
+    vectors = centers[assignment] + 0.35 * rng.standard_normal((size, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    metadatas = [
+        {
+            "document_id": i // 20,
+            "chunk_index": i % 20,
+            "provider": PROVIDERS[int(rng.integers(len(PROVIDERS)))],
+            "category": CATEGORIES[int(rng.integers(len(CATEGORIES)))],
+            "filename": f"doc_{i // 20}.md",
+        }
+        for i in range(size)
+    ]
+    return vectors, metadatas
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """在数据点附近扰动生成查询向量"""
+    rng = np.random.default_rng(seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), count)] + 0.1 * rng.standard_normal(
+        (count, vectors.shape[1])
+    ).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def ground_truth(vectors: np.ndarray, mask: np.ndarray, query: np.ndarray, k: int) -> set[int]:
+    """NumPy暴力检索的真实top-k行号"""
+    rows = np.flatnonzero(mask)
+    distances = np.sum((vectors[rows] - query) ** 2, axis=1)
+    return set(rows[np.argsort(distances)[:k]].tolist())
+
+
+def build_where(filters: dict) -> dict | None:
+    """与VectorStore一致的where子句构造"""
+    if len(filters) == 1:
+        return filters
+    if len(filters) > 1:
+        return {"$and": [{key: value} for key, value in filters.items()]}
+    return None
+
+
+def run_size(size: int, args: argparse.Namespace, workdir: Path) -> None:
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    vectors, metadatas = make_dataset(size, args.dimension, args.seed)
+    queries = make_queries(vectors, args.queries, args.seed)
+    ids = [f"doc_{meta['document_id']}_chunk_{meta['chunk_index']}" for meta in metadatas]
+    row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    # 构建ChromaDB集合
+    start = time.perf_counter()
+    client = chromadb.PersistentClient(
+        path=str(workdir / f"chroma_{size}"), settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    collection = client.create_collection(name="knowledge_base")
+    for offset in range(0, size, args.batch_size):
+        collection.add(
+            ids=ids[offset:offset + args.batch_size],
+            embeddings=vectors[offset:offset + args.batch_size].tolist(),
+            metadatas=metadatas[offset:offset + args.batch_size],
+        )
+    chroma_build = time.perf_counter() - start
+
+    # 构建精确索引（与服务中一致，从集合全量镜像）
+    start = time.perf_counter()
+    index = ExactVectorIndex(directory=str(workdir / "exact"), dimension=args.dimension, dtype=args.dtype)
+    index.build_from_collection(collection)
+    exact_build = time.perf_counter() - start
+
+    print(f"\n📦 {size} 分块: ChromaDB构建 {chroma_build:.1f}s, 精确索引构建 {exact_build:.1f}s "
+          f"({index.get_stats()['matrix_bytes'] / 1024 / 1024:.0f} MB {args.dtype})")
+    print(f"{'过滤':<18} {'引擎':<8} {'recall@' + str(args.k):>10} {'p50(ms)':>9} {'p99(ms)':>9}")
+
+    for case, filters in FILTER_CASES.items():
+        mask = np.ones(size, dtype=bool)
+        for key, value in filters.items():
+            mask &= np.array([meta[key] == value for meta in metadatas])
+        truths = [ground_truth(vectors, mask, query, args.k) for query in queries]
+
+        for engine in ("chroma", "exact"):
+            latencies = []
+            recalls = []
+            for query, truth in zip(queries, truths):
+                start = time.perf_counter()
+                if engine == "chroma":
+                    result = collection.query(
+                        query_embeddings=[query.tolist()], n_results=args.k, where=build_where(filters),
+                        include=["distances"],
+                    )
+                    found = result["ids"][0]
+                else:
+                    found = [chunk_id for chunk_id, _ in index.search(query, args.k, filters)]
+                latencies.append(time.perf_counter() - start)
+                if truth:
+                    recalls.append(len({row_of[chunk_id] for chunk_id in found} & truth) / len(truth))
+
+            recall = sum(recalls) / len(recalls) if recalls else 0.0
+            print(
+                f"{case:<18} {engine:<8} {recall:>10.4f} {percentile(latencies, 50) * 1000:>9.2f} "
+                f"{percentile(latencies, 99) * 1000:>9.2f}"
+            )
+
+    del client
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="精确向量索引与ChromaDB检索对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--batch-size", type=int, default=5000, help="ChromaDB单次写入分块数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_exact_"))
+    try:
+        for size in args.sizes:
+            run_size(size, args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+HNSW参数召回率/延迟扫描脚本
+
+在临时目录中用合成向量（带聚类结构，维度与bge-small-zh一致）按参数组合构建ChromaDB集合，
+以NumPy暴力检索结果为基准，输出每组参数的:
+- 构建耗时（受 M、ef_construction、batch_size、sync_threshold 影响）
+- recall@k 与查询延迟 p50/p99（每个构建依次调整 ef_search）
+
+ChromaDB在进程内缓存已加载的HNSW索引，ef_search 的修改只在索引重新加载后生效，
+因此每个 ef_search 取值都会清空客户端缓存、重新打开集合后再测量（与服务启动时的调整方式一致）
+
+结果用于选择 Settings 中的 HNSW_* 配置（或 HNSW_COLLECTION_OVERRIDES）
+
+用法: python scripts/benchmark_hnsw.py --size 100000 --m 16 32 --ef-construction 100 200 --ef-search 10 50 100 200
+"""
+
+import argparse
+import itertools
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from app.services.hnsw_config import SPACES
+from scripts.benchmark_exact_index import FILTER_CASES, build_where, make_dataset, make_queries
+from scripts.benchmark_search_load import percentile
+
+
+def ground_truth(vectors: np.ndarray, mask: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    """NumPy暴力检索的真实top-k行号（向量已归一化，l2/cosine/ip 三种空间的排序一致）"""
+    rows = np.flatnonzero(mask)
+    similarities = queries @ vectors[rows].T
+    k = min(k, len(rows))
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    return [set(rows[row_top].tolist()) for row_top in top]
+
+
+def build_collection(client, name: str, metadata: dict, ids: list[str], vectors: np.ndarray, metadatas: list[dict], write_batch: int):
+    """按HNSW参数创建集合并写入数据，返回 (集合, 构建耗时)"""
+    start = time.perf_counter()
+    collection = client.create_collection(name=name, metadata=metadata)
+    for offset in range(0, len(ids), write_batch):
+        collection.add(
+            ids=ids[offset:offset + write_batch],
+            embeddings=vectors[offset:offset + write_batch].tolist(),
+            metadatas=metadatas[offset:offset + write_batch],
+        )
+    # 第一次查询会等待未同步的写入进入HNSW图，计入构建时间
+    collection.query(query_embeddings=[vectors[0].tolist()], n_results=1, include=[])
+    return collection, time.perf_counter() - start
+
+
+def reopen_with_ef_search(path: Path, name: str, ef_search: int):
+    """清空客户端缓存后重新打开集合并设置 ef_search"""
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+    from chromadb.config import Settings as ChromaSettings
+
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.PersistentClient(path=str(path), settings=ChromaSettings(anonymized_telemetry=False))
+    collection = client.get_collection(name=name)
+    collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+    return client, collection
+
+
+def measure(collection, queries: np.ndarray, truths: list[set[int]], row_of: dict[str, int], k: int, where: dict | None) -> tuple[float, float, float]:
+    """返回 (recall@k, p50秒, p99秒)"""
+    latencies = []
+    recalls = []
+    for query, truth in zip(queries, truths):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=["distances"])
+        latencies.append(time.perf_counter() - start)
+        if truth:
+            found = {row_of[chunk_id] for chunk_id in result["ids"][0]}
+            recalls.append(len(found & truth) / len(truth))
+    recall = sum(recalls) / len(recalls) if recalls else 0.0
+    return recall, percentile(latencies, 50), percentile(latencies, 99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HNSW参数召回率/延迟扫描")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--space", nargs="+", default=["l2"], choices=SPACES)
+    parser.add_argument("--m", type=int, nargs="+", default=[16])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[100])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--batch-size", type=int, default=None, help="hnsw:batch_size（默认使用ChromaDB默认值）")
+    parser.add_argument("--sync-threshold", type=int, default=None, help="hnsw:sync_threshold（默认使用ChromaDB默认值）")
+    parser.add_argument("--filter", default="none", choices=list(FILTER_CASES), help="查询时使用的过滤场景")
+    parser.add_argument("--write-batch", type=int, default=5000, help="ChromaDB单次写入分块数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    vectors, metadatas = make_dataset(args.size, args.dimension, args.seed)
+    queries = make_queries(vectors, args.queries, args.seed)
+    ids = [f"doc_{meta['document_id']}_chunk_{meta['chunk_index']}" for meta in metadatas]
+    row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    filters = FILTER_CASES[args.filter]
+    mask = np.ones(args.size, dtype=bool)
+    for key, value in filters.items():
+        mask &= np.array([meta[key] == value for meta in metadatas])
+    truths = ground_truth(vectors, mask, queries, args.k)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_hnsw_"))
+    try:
+        client = chromadb.PersistentClient(path=str(workdir), settings=ChromaSettings(anonymized_telemetry=False))
+        print(f"📦 {args.size} 分块, {args.queries} 条查询, 过滤: {args.filter} ({int(mask.sum())} 个候选)")
+        print(
+            f"{'space':<7} {'M':>4} {'ef_c':>5} {'ef_s':>5} {'构建(s)':>8} "
+            f"{'recall@' + str(args.k):>10} {'p50(ms)':>9} {'p99(ms)':>9}"
+        )
+
+        for number, (space, m, ef_construction) in enumerate(itertools.product(args.space, args.m, args.ef_construction)):
+            metadata = {"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": ef_construction}
+            if args.batch_size is not None:
+                metadata["hnsw:batch_size"] = args.batch_size
+            if args.sync_threshold is not None:
+                metadata["hnsw:sync_threshold"] = args.sync_threshold
+
+            name = f"bench_{number}"
+            _, build_time = build_collection(client, name, metadata, ids, vectors, metadatas, args.write_batch)
+            for ef_search in args.ef_search:
+                client, collection = reopen_with_ef_search(workdir, name, ef_search)
+                # 首次查询会从磁盘加载索引，不计入延迟
+                collection.query(query_embeddings=[queries[0].tolist()], n_results=1, include=[])
+                recall, p50, p99 = measure(collection, queries, truths, row_of, args.k, build_where(filters))
+                print(
+                    f"{space:<7} {m:>4} {ef_construction:>5} {ef_search:>5} {build_time:>8.1f} "
+                    f"{recall:>10.4f} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f}"
+                )
+            client.delete_collection(name)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+pre-fork多进程扩展性压测脚本
+
+依次以 1..N 个工作进程启动 run_prefork.py（每个工作进程线程数 = CPU核数 / 工作进程数），
+等待 /readyz 就绪后以固定并发压测搜索接口，输出吞吐量、延迟分位数和总常驻内存，
+用于验证吞吐随工作进程数的扩展情况以及模型权重的写时复制共享效果
+
+用法: python scripts/benchmark_prefork_scaling.py --workers 1 2 4 --concurrency 32 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.benchmark_search_load import DEFAULT_QUERIES, percentile
+
+
+def read_tree_rss_mb(root_pid: int) -> tuple[float, float]:
+    """
+    读取进程树的内存占用（MB）
+
+    Returns:
+        (RSS之和, PSS之和)；PSS按共享页面平摊，能反映写时复制共享的真实占用
+    """
+    pids = [root_pid]
+    try:
+        children = Path(f"/proc/{root_pid}/task/{root_pid}/children").read_text().split()
+        pids.extend(int(pid) for pid in children)
+    except OSError:
+        pass
+
+    rss = pss = 0.0
+    for pid in pids:
+        try:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Rss:"):
+                    rss += int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    pss += int(line.split()[1]) / 1024
+        except OSError:
+            continue
+    return rss, pss
+
+
+def wait_until_ready(base_url: str, timeout: float, consecutive: int) -> None:
+    """
+    轮询 /readyz 直到服务就绪
+
+    每次轮询使用新连接，由内核分发到不同工作进程；连续多次就绪才视为所有工作进程都已就绪
+    """
+    deadline = time.time() + timeout
+    successes = 0
+    while time.time() < deadline:
+        try:
+            ready = httpx.get(f"{base_url}/readyz", timeout=2.0).status_code == 200
+        except httpx.HTTPError:
+            ready = False
+        successes = successes + 1 if ready else 0
+        if successes >= consecutive:
+            return
+        time.sleep(0.2 if ready else 1.0)
+    raise TimeoutError(f"Service at {base_url} not ready after {timeout}s")
+
+
+async def run_closed_loop(base_url: str, path: str, concurrency: int, duration: float) -> dict:
+    """固定并发的闭环压测"""
+    latencies: list[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        start_time = time.perf_counter()
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() - start_time < duration:
+                # 附加随机后缀，避免查询向量缓存掩盖推理开销
+                params = {"query": f"{random.choice(DEFAULT_QUERIES)} {random.randint(0, 10**6)}", "limit": 10}
+                request_start = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - request_start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main() -> None:
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="pre-fork工作进程数扩展性压测")
+    parser.add_argument("--workers", type=int, nargs="+", default=[n for n in (1, 2, 4, 8) if n <= cpu_count])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--path", default="/api/v1/knowledge/search")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发客户端数")
+    parser.add_argument("--duration", type=float, default=20.0, help="每档压测时长（秒）")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"📊 CPU核数: {cpu_count}，并发: {args.concurrency}，每档 {args.duration:.0f}s")
+    print(
+        f"{'进程数':>6} {'线程/进程':>9} {'吞吐/s':>9} {'加速比':>7} {'p50(ms)':>9} {'p99(ms)':>9} "
+        f"{'错误':>6} {'RSS(MB)':>9} {'PSS(MB)':>9}"
+    )
+
+    baseline = None
+    for workers in args.workers:
+        threads = max(1, cpu_count // workers)
+        process = subprocess.Popen(
+            [
+                sys.executable, "run_prefork.py",
+                "--host", "127.0.0.1",
+                "--port", str(args.port),
+                "--workers", str(workers),
+                "--threads-per-worker", str(threads),
+                "--log-level", "warning",
+            ],
+            cwd=project_root,
+        )
+        try:
+            wait_until_ready(base_url, args.startup_timeout, consecutive=workers * 5)
+            result = asyncio.run(run_closed_loop(base_url, args.path, args.concurrency, args.duration))
+            rss, pss = read_tree_rss_mb(process.pid)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+
+        baseline = baseline or result["throughput"]
+        speedup = result["throughput"] / baseline if baseline else 0.0
+        print(
+            f"{workers:>6} {threads:>9} {result['throughput']:>9.1f} {speedup:>7.2f} {result['p50_ms']:>9.1f} "
+            f"{result['p99_ms']:>9.1f} {result['errors']:>6} {rss:>9.0f} {pss:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+搜索接口压测脚本
+
+以固定RPS向运行中的服务发送搜索请求，统计吞吐量和延迟分位数
+用法: python scripts/benchmark_search_load.py --rps 50 100 200 --duration 20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+DEFAULT_QUERIES = [
+    "负载均衡对比",
+    "阿里云ALB",
+    "腾讯云CLB",
+    "NAT网关计费方式",
+    "弹性IP带宽上限",
+    "专线接入流程",
+    "云联网跨地域互通",
+    "VPN网关配置步骤",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(base_url: str, path: str, rps: int, duration: float) -> dict:
+    """以指定RPS发送请求"""
+    latencies: list[float] = []
+    errors = 0
+    interval = 1.0 / rps
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+
+        async def one_request() -> None:
+            nonlocal errors
+            params = {"query": random.choice(DEFAULT_QUERIES), "limit": 10}
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                if response.status_code != 200:
+                    errors += 1
+                    return
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+        tasks = []
+        start_time = time.perf_counter()
+        next_send = start_time
+        while time.perf_counter() - start_time < duration:
+            tasks.append(asyncio.create_task(one_request()))
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start_time
+
+    return {
+        "target_rps": rps,
+        "sent": len(tasks),
+        "ok": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="搜索接口压测")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/v1/knowledge/search")
+    parser.add_argument("--rps", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--duration", type=float, default=20.0, help="每档压测时长（秒）")
+    args = parser.parse_args()
+
+    print(f"{'目标RPS':>8} {'发送':>7} {'成功':>7} {'错误':>6} {'吞吐/s':>9} {'p50(ms)':>9} {'p99(ms)':>9}")
+    for rps in args.rps:
+        result = asyncio.run(run_load(args.base_url, args.path, rps, args.duration))
+        print(
+            f"{result['target_rps']:>8} {result['sent']:>7} {result['ok']:>7} {result['errors']:>6} "
+            f"{result['throughput']:>9.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
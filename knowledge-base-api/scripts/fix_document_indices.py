@@ -13,7 +13,7 @@ sys.path.insert(0, str(project_root))
 from app.core.database import get_db_context
 from app.models.document import Document
 from app.services.document_processor import DocumentProcessor
-from app.services.vector_store import VectorStore
+from app.services.vector_store import get_vector_store
 
 
 def fix_document_indices():
@@ -25,7 +25,7 @@ def fix_document_indices():
         # 初始化服务
         print("📦 初始化服务...")
         document_processor = DocumentProcessor()
-        vector_store = VectorStore()
+        vector_store = get_vector_store()
         
         with get_db_context() as db:
             # 查询所有未索引的文档
@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 """
 初始化数据脚本
+
+通过批量入库流水线（解析进程池 -> 批量嵌入 -> 批量写入）导入文档目录，
+文档记录以文件路径为唯一标识，重复运行时替换已有文档
+
+用法: python scripts/init_data.py [--pattern "*.md"] [--workers 4] [--reset]
 """
-import asyncio
+import argparse
 import sys
 from pathlib import Path
 
@@ -11,84 +16,84 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from app.core.config import get_settings
-from app.services.document_processor import DocumentProcessor
-from app.services.search_engine import SearchEngine
-from app.services.vector_store import VectorStore
+from app.core.database import init_database
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.model_registry import get_model_registry
+from app.services.vector_store import get_vector_store
 
 settings = get_settings()
 
 
-async def main():
+def _print_progress(stats: dict) -> None:
+    write = stats['write']
+    print(
+        f"  已写入 {write['files']} 个文档 / {write['chunks']} 个文本块"
+        f" ({stats['elapsed_seconds']:.1f}s)"
+    )
+
+
+def main():
     """初始化数据"""
-    print("开始初始化知识库数据...")
+    parser = argparse.ArgumentParser(description="批量导入文档目录")
+    parser.add_argument("--path", default=settings.DOCUMENTS_PATH, help="文档目录")
+    parser.add_argument("--pattern", default="*.md", help="文件匹配模式")
+    parser.add_argument("--workers", type=int, default=0, help="解析进程数（0: 使用配置值）")
+    parser.add_argument("--reset", action="store_true", help="导入前清空向量存储")
+    args = parser.parse_args()
 
-    # 初始化服务
-    document_processor = DocumentProcessor()
-    vector_store = VectorStore()
-    search_engine = SearchEngine()
+    print("开始初始化知识库数据...")
 
     # 检查文档目录
-    documents_path = Path(settings.DOCUMENTS_PATH)
+    documents_path = Path(args.path)
     if not documents_path.exists():
         print(f"文档目录不存在: {documents_path}")
         return
 
-    # 查找所有Markdown文件
-    md_files = list(documents_path.glob("*.md"))
-    if not md_files:
-        print("未找到Markdown文件")
+    files = sorted(documents_path.glob(args.pattern))
+    if not files:
+        print(f"未找到匹配 {args.pattern} 的文件")
         return
 
-    print(f"找到 {len(md_files)} 个Markdown文件")
-
-    # 重置向量存储
-    print("重置向量存储...")
-    vector_store.reset_collection()
-
-    # 处理每个文档
-    processed_count = 0
-    failed_count = 0
-
-    for i, file_path in enumerate(md_files):
-        try:
-            print(f"处理文件 ({i+1}/{len(md_files)}): {file_path.name}")
-
-            # 处理文档
-            doc_data = document_processor.process_file(str(file_path))
-
-            # 添加到向量存储
-            document_id = i + 1
-            vector_success = vector_store.add_document(
-                document_id=document_id,
-                chunks=doc_data['chunks'],
-                metadata=doc_data.get('metadata', {}),
-            )
+    print(f"找到 {len(files)} 个文件")
 
-            # 添加到搜索索引
-            _ = search_engine.index_document(document_id=document_id, document_data=doc_data)
+    init_database()
+    registry = get_model_registry()
+    if not registry.load_and_warm_up():
+        print("嵌入模型加载失败")
+        sys.exit(1)
 
-            if vector_success:
-                processed_count += 1
-                print(f"  ✓ 成功处理: {len(doc_data['chunks'])} 个文本块")
-            else:
-                failed_count += 1
-                print("  ✗ 处理失败")
+    vector_store = get_vector_store()
+    if args.reset:
+        print("重置向量存储...")
+        vector_store.reset_collection()
 
-        except Exception as e:
-            failed_count += 1
-            print(f"  ✗ 处理失败: {str(e)}")
+    try:
+        pipeline = IngestPipeline(parse_workers=args.workers or None)
+        stats = pipeline.run(files, on_progress=_print_progress)
+    finally:
+        registry.shutdown()
 
     print("\n初始化完成:")
-    print(f"  成功处理: {processed_count} 个文档")
-    print(f"  处理失败: {failed_count} 个文档")
+    print(f"  成功处理: {stats['write']['files']} 个文档")
+    print(f"  处理失败: {len(files) - stats['write']['files']} 个文档")
+    print(f"  总耗时: {stats['elapsed_seconds']:.2f}s（解析进程数 {stats['parse_workers']}）")
+
+    print("\n各阶段吞吐:")
+    for stage in ('parse', 'embed', 'write'):
+        stage_stats = stats[stage]
+        print(
+            f"  {stage:<6} {stage_stats['files_per_sec']:>8.2f} files/sec"
+            f"  {stage_stats['chunks_per_sec']:>10.2f} chunks/sec"
+            f"  (忙碌 {stage_stats['busy_seconds']:.2f}s)"
+        )
 
     # 显示统计信息
-    stats = vector_store.get_collection_stats()
+    collection_stats = vector_store.get_collection_stats()
     print("\n向量存储统计:")
-    print(f"  总文本块数: {stats.get('total_chunks', 0)}")
-    print(f"  云服务提供商: {', '.join(stats.get('providers', []))}")
-    print(f"  文档分类: {', '.join(stats.get('categories', []))}")
+    print(f"  总文本块数: {collection_stats.get('total_chunks', 0)}")
+    print(f"  云服务提供商: {', '.join(collection_stats.get('providers', []))}")
+    print(f"  文档分类: {', '.join(collection_stats.get('categories', []))}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()